@@ -383,14 +383,14 @@ class PowerTimer(timer.Timer):
 				w.state += 1
 
 		try:
-			self.timer_list.remove(w)
+			self.removeTimerEntry(w)
 		except:
 			print '[PowerManager]: Remove list failed'
 
 		# did this timer reached the last state?
 		if w.state < PowerTimerEntry.StateEnded:
 			# no, sort it into active list
-			insort(self.timer_list, w)
+			self.insertTimerEntry(w)
 		else:
 			# yes. Process repeated, and re-add.
 			if w.repeated:
@@ -17,7 +17,7 @@ import NavigationInstance
 from ServiceReference import ServiceReference
 
 from time import localtime, strftime, ctime, time
-from bisect import insort
+from bisect import insort, bisect_left, bisect_right
 import os
 
 # ok, for descriptions etc we have:
@@ -553,8 +553,122 @@ def createTimer(xml):
 
 	return entry
 
+# per-service interval index over the waiting and running record timers.
+# isInTimer() is called for every visible event on every EPG repaint, so
+# instead of scanning the whole timer_list it only looks at the timers of
+# the requested service (or of its subservices) that overlap the event.
+# the index is updated with the timer list and remembers the
+# timer_generation it matches, a change of the timer list it did not see
+# makes isInTimer() rebuild it.
+class RecordTimerIndexBucket:
+	def __init__(self):
+		self.keys = [ ]		# sorted (begin, id(entry)) of single timers
+		self.timers = [ ]	# entries, parallel to keys
+		self.maxlength = 0	# longest single timer, bounds the search window
+		self.repeated = [ ]	# repeating timers, expanded at lookup time
+
+	def add(self, entry):
+		if entry.repeated:
+			self.repeated.append(entry)
+			return None
+		key = (entry.begin, id(entry))
+		pos = bisect_left(self.keys, key)
+		self.keys.insert(pos, key)
+		self.timers.insert(pos, entry)
+		if entry.end - entry.begin > self.maxlength:
+			self.maxlength = entry.end - entry.begin
+		return key
+
+	def remove(self, entry, key):
+		if key is None:
+			self.repeated.remove(entry)
+			return
+		pos = bisect_left(self.keys, key)
+		del self.keys[pos]
+		del self.timers[pos]
+		if not self.timers:
+			self.maxlength = 0
+
+	def overlapping(self, begin, end):
+		# a single timer x overlaps when x.begin <= end and x.end >= begin
+		lo = bisect_left(self.keys, (begin - self.maxlength, ))
+		hi = bisect_right(self.keys, (end, ))
+		while hi < len(self.keys) and self.keys[hi][0] <= end:
+			hi += 1
+		return [x for x in self.timers[lo:hi] if x.end >= begin] + self.repeated
+
+	def __len__(self):
+		return len(self.timers) + len(self.repeated)
+
+class RecordTimerIndex:
+	def __init__(self):
+		self.services = { }	# service reference string -> bucket
+		self.parents = { }	# parent compare string of subservice timers -> bucket
+		self.entries = { }	# id(entry) -> (entry, [(bucket, key), ...], parentref)
+		self.generation = None	# timer_generation of the timer list the index matches
+
+	def __len__(self):
+		return len(self.entries)
+
+	def clear(self):
+		self.services = { }
+		self.parents = { }
+		self.entries = { }
+
+	def rebuild(self, timer_list):
+		self.clear()
+		for x in timer_list:
+			self.add(x)
+
+	def add(self, entry):
+		self.remove(entry)
+		sref = entry.service_ref.ref
+		refstr = sref.toString()
+		bucket = self.services.get(refstr)
+		if bucket is None:
+			bucket = self.services[refstr] = RecordTimerIndexBucket()
+		slots = [(bucket, bucket.add(entry))]
+		parentref = None
+		parent_sid = sref.getUnsignedData(5)
+		parent_tsid = sref.getUnsignedData(6)
+		if parent_sid and parent_tsid: # subservice, also index it below its parent service
+			parentref = eServiceReference(refstr)
+			parentref.setUnsignedData(1, parent_sid)
+			parentref.setUnsignedData(2, parent_tsid)
+			parentref.setUnsignedData(5, 0)
+			parentref.setUnsignedData(6, 0)
+			parentstr = parentref.toCompareString()
+			if parentstr != refstr:
+				bucket = self.parents.get(parentstr)
+				if bucket is None:
+					bucket = self.parents[parentstr] = RecordTimerIndexBucket()
+				slots.append((bucket, bucket.add(entry)))
+		self.entries[id(entry)] = (entry, slots, parentref)
+
+	def remove(self, entry):
+		item = self.entries.pop(id(entry), None)
+		if item is not None:
+			for bucket, key in item[1]:
+				bucket.remove(entry, key)
+
+	def lookup(self, refstr, begin, end):
+		# returns (entry, linked) tuples in timer_list order. linked
+		# is set for timers on a subservice of refstr, these still need a
+		# linkage check against the event.
+		result = [ ]
+		bucket = self.services.get(refstr)
+		if bucket:
+			result += [(x, False) for x in bucket.overlapping(begin, end)]
+		bucket = self.parents.get(refstr)
+		if bucket:
+			result += [(x, True) for x in bucket.overlapping(begin, end)]
+		if len(result) > 1:
+			result.sort(key = lambda x: x[0].activation_key)
+		return result
+
 class RecordTimer(timer.Timer):
 	def __init__(self):
+		self.timer_index = RecordTimerIndex()
 		timer.Timer.__init__(self)
 
 		self.Filename = Directories.resolveFilename(Directories.SCOPE_CONFIG, "timers.xml")
@@ -577,14 +691,17 @@ class RecordTimer(timer.Timer):
 				w.state += 1
 
 		try:
-			self.timer_list.remove(w)
+			self.removeTimerEntry(w)
 		except:
 			print '[RecordTimer]: Remove list failed'
 
 		# did this timer reached the last state?
 		if w.state < RecordTimerEntry.StateEnded:
 			# no, sort it into active list
-			insort(self.timer_list, w)
+			self.insertTimerEntry(w)
+			# activate() may have moved begin or end
+			self.timer_index.add(w)
+			self.timer_index.generation = self.timer_generation
 		else:
 			# yes. Process repeated, and re-add.
 			if w.repeated:
@@ -592,11 +709,26 @@ class RecordTimer(timer.Timer):
 				w.state = RecordTimerEntry.StateWaiting
 				self.addTimerEntry(w)
 			else:
+				self.timer_index.remove(w)
+				self.timer_index.generation = self.timer_generation
 				# Remove old timers as set in config
 				self.cleanupDaily(config.recording.keep_timers.getValue())
 				insort(self.processed_timers, w)
 		self.stateChanged(w)
 
+	def addTimerEntry(self, entry, noRecalc=0):
+		self.timer_index.remove(entry)
+		timer.Timer.addTimerEntry(self, entry, noRecalc)
+		if entry.state != RecordTimerEntry.StateEnded:
+			self.timer_index.add(entry)
+		self.timer_index.generation = self.timer_generation
+
+	def timeChanged(self, entry):
+		# indexed again by addTimerEntry with the new begin and end
+		self.timer_index.remove(entry)
+		timer.Timer.timeChanged(self, entry)
+		self.timer_index.generation = self.timer_generation
+
 	def isRecTimerWakeup(self):
 		return wasRecTimerWakeup
 
@@ -634,14 +766,10 @@ class RecordTimer(timer.Timer):
 		root = doc.getroot()
 
 		# put out a message when at least one timer overlaps
-		checkit = True
-		for timer in root.findall("timer"):
-			newTimer = createTimer(timer)
-			if (self.record(newTimer, True, dosave=False) is not None) and (checkit == True):
-				from Tools.Notifications import AddPopup
-				from Screens.MessageBox import MessageBox
-				AddPopup(_("Timer overlap in timers.xml detected!\nPlease recheck it!"), type = MessageBox.TYPE_ERROR, timeout = 0, id = "TimerLoadFailed")
-				checkit = False # at moment it is enough when the message is displayed one time
+		if not self.recordBulk([createTimer(timer) for timer in root.findall("timer")]):
+			from Tools.Notifications import AddPopup
+			from Screens.MessageBox import MessageBox
+			AddPopup(_("Timer overlap in timers.xml detected!\nPlease recheck it!"), type = MessageBox.TYPE_ERROR, timeout = 0, id = "TimerLoadFailed")
 
 	def saveTimer(self):
 		list = []
@@ -763,40 +891,54 @@ class RecordTimer(timer.Timer):
 			self.saveTimer()
 		return None
 
+	# adds a whole list of timers (as read from timers.xml) at once.
+	# instead of one TimerSanityCheck per timer, all timers are added first
+	# and checked in a single pass. returns False when timers overlap.
+	def recordBulk(self, entries):
+		entries.sort(key = lambda x: x.begin)
+		seen = set()
+		for entry in entries:
+			ref = entry.service_ref.ref
+			if ref.flags & eServiceReference.isGroup:
+				key = (entry.begin, ref.getPath())
+			else:
+				key = (entry.begin, ) + tuple(ref.getUnsignedData(x) for x in (1, 2, 3, 4))
+			if key in seen and ref.valid():
+				print "ignore double timer"
+				continue
+			seen.add(key)
+			entry.timeChanged()
+			entry.Timer = self
+			self.addTimerEntry(entry, noRecalc=1)
+		conflictfree = TimerSanityCheck(self.timer_list).check()
+		if not conflictfree:
+			print "timer conflict detected!"
+		self.calcNextActivation()
+		return conflictfree
+
 	def isInTimer(self, eventid, begin, duration, service):
 		time_match = 0
 		type = 0
 		bt = None
 		end = begin + duration
 		refstr = str(service)
-		for x in self.timer_list:
-			check = x.service_ref.ref.toString() == refstr
-			if not check:
+		self.getTimerKeys()
+		if self.timer_index.generation != self.timer_generation:
+			# timer_list was modified behind our back, resync the index
+			self.timer_index.rebuild(self.timer_list)
+			self.timer_index.generation = self.timer_generation
+		for x, linked in self.timer_index.lookup(refstr, begin, end):
+			check = True
+			if linked: # check whether the event links to the subservice
+				check = False
 				sref = x.service_ref.ref
-				parent_sid = sref.getUnsignedData(5)
-				parent_tsid = sref.getUnsignedData(6)
-				if parent_sid and parent_tsid: # check for subservice
-					sid = sref.getUnsignedData(1)
-					tsid = sref.getUnsignedData(2)
-					sref.setUnsignedData(1, parent_sid)
-					sref.setUnsignedData(2, parent_tsid)
-					sref.setUnsignedData(5, 0)
-					sref.setUnsignedData(6, 0)
-					check = sref.toCompareString() == refstr
-					num = 0
-					if check:
-						check = False
-						event = eEPGCache.getInstance().lookupEventId(sref, eventid)
-						num = event and event.getNumOfLinkageServices() or 0
-					sref.setUnsignedData(1, sid)
-					sref.setUnsignedData(2, tsid)
-					sref.setUnsignedData(5, parent_sid)
-					sref.setUnsignedData(6, parent_tsid)
-					for cnt in range(num):
-						subservice = event.getLinkageService(sref, cnt)
-						if sref.toCompareString() == subservice.toCompareString():
-							check = True
-							break
+				event = eEPGCache.getInstance().lookupEventId(self.timer_index.entries[id(x)][2], eventid)
+				num = event and event.getNumOfLinkageServices() or 0
+				for cnt in range(num):
+					subservice = event.getLinkageService(sref, cnt)
+					if sref.toCompareString() == subservice.toCompareString():
+						check = True
+						break
 			if check:
 				if x.repeated != 0:
 					if bt is None:
@@ -878,6 +1020,8 @@ class RecordTimer(timer.Timer):
 					self.timeChanged(x)
 		# now the timer should be in the processed_timers list. remove it from there.
 		self.processed_timers.remove(entry)
+		self.timer_index.remove(entry)
+		self.timer_index.generation = self.timer_generation
 		self.saveTimer()
 
 	def shutdown(self):
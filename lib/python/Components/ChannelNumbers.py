@@ -0,0 +1,206 @@
+import os
+from enigma import eServiceCenter, eServiceReference
+from Components.config import config
+from Tools.Directories import resolveFilename, SCOPE_CONFIG
+
+# index of the channel numbers of the bouquets, shared by the number zap
+# of the infobar, the EPG and the channel list.
+#
+# every bouquet is listed once, a lookup is a dict access. as the numbers
+# are given by enigma (renumbered on every change of a bouquet), an entry
+# is checked against the file of its bouquet (which is written on every
+# change) and bouquetChanged() is called by the bouquet editor. a changed
+# bouquet is listed again, the bouquets behind it only have their numbers
+# shifted, which is found out from their first numbered entry.
+
+def bouquetFilename(bouquet):
+	path = bouquet.getPath()
+	pos = path.find('FROM BOUQUET "')
+	if pos == -1:
+		return None
+	name = path[pos+14:]
+	return resolveFilename(SCOPE_CONFIG, name[:name.find('"')])
+
+def fileStamp(filename):
+	try:
+		st = os.stat(filename)
+		return (st.st_mtime, st.st_size)
+	except (OSError, TypeError):
+		return None
+
+def isPlayable(service):
+	return not (service.flags & (eServiceReference.isMarker|eServiceReference.isDirectory)) or (service.flags & eServiceReference.isNumberedMarker)
+
+def firstNumber(bouquet):
+	servicelist = eServiceCenter.getInstance().list(bouquet)
+	if servicelist is not None:
+		service = servicelist.getNext()
+		while service.valid():
+			number = service.getChannelNum()
+			if number > 0:
+				return number
+			service = servicelist.getNext()
+	return None
+
+class BouquetNumbers:
+	"""the numbered entries of one bouquet"""
+	def __init__(self, bouquet):
+		self.bouquet = bouquet
+		self.filename = bouquetFilename(bouquet)
+		self.stamp = fileStamp(self.filename)
+		self.services = { }	# number -> first entry with it
+		self.first = None
+		self.children = [ ]	# the bouquets in it
+		servicelist = eServiceCenter.getInstance().list(bouquet)
+		if servicelist is not None:
+			service = servicelist.getNext()
+			while service.valid():
+				if service.flags & eServiceReference.isDirectory:
+					self.children.append(service)
+				number = service.getChannelNum()
+				if number > 0 and number not in self.services:
+					self.services[number] = service
+					if self.first is None:
+						self.first = number
+				service = servicelist.getNext()
+
+	def valid(self):
+		return self.stamp == fileStamp(self.filename)
+
+	def shift(self, first):
+		if first is None or self.first is None or first == self.first:
+			return
+		delta = first - self.first
+		self.services = dict([(number + delta, service) for (number, service) in self.services.iteritems()])
+		self.first = first
+
+class ChannelNumbers:
+	def __init__(self):
+		self.bouquets = { }	# bouquet -> BouquetNumbers
+		self.roots = { }	# root bouquet -> number -> (service, bouquet), the first bouquet wins
+		self.parents = { }	# bouquet -> the root bouquet it is in
+		self.alternative = None
+		self.lookups = 0
+		self.rebuilds = 0
+
+	def bouquetChanged(self, bouquet = None):
+		"""forgets the numbers of bouquet (all of them if None)"""
+		if bouquet is None:
+			self.bouquets.clear()
+			self.roots.clear()
+			self.parents.clear()
+			return
+		key = bouquet.toString()
+		self.bouquets.pop(key, None)
+		self.roots.pop(key, None)
+		root = self.parents.get(key)
+		if root is not None:
+			self.roots.pop(root, None)
+
+	def checkMode(self):
+		alternative = config.usage.alternative_number_mode.getValue()
+		if alternative != self.alternative:
+			self.alternative = alternative
+			self.bouquetChanged()
+
+	def getNumbers(self, bouquet):
+		key = bouquet.toString()
+		numbers = self.bouquets.get(key)
+		if numbers is None or not numbers.valid():
+			self.rebuilds += 1
+			numbers = self.bouquets[key] = BouquetNumbers(bouquet)
+		return numbers
+
+	def refresh(self, root):
+		"""brings the bouquets of root up to date, returns the
+		number -> (service, bouquet) index of root"""
+		self.checkMode()
+		rootkey = root.toString()
+		rootnumbers = self.bouquets.get(rootkey)
+		index = self.roots.get(rootkey)
+		if rootnumbers is None or not rootnumbers.valid():
+			self.rebuilds += 1
+			rootnumbers = self.bouquets[rootkey] = BouquetNumbers(root)
+			index = None
+		changed = index is None
+		for bouquet in rootnumbers.children:
+			key = bouquet.toString()
+			self.parents[key] = rootkey
+			numbers = self.bouquets.get(key)
+			if numbers is None or not numbers.valid():
+				self.rebuilds += 1
+				self.bouquets[key] = BouquetNumbers(bouquet)
+				changed = True
+			elif changed and not self.alternative:
+				# the numbers behind a changed bouquet move
+				numbers.shift(firstNumber(bouquet))
+		if changed:
+			index = { }
+			for bouquet in rootnumbers.children:
+				for (number, service) in self.bouquets[bouquet.toString()].services.iteritems():
+					if number not in index:
+						index[number] = (service, bouquet)
+			self.roots[rootkey] = index
+		return index
+
+	def lookup(self, bouquet, number):
+		self.lookups += 1
+		return self.getNumbers(bouquet).services.get(number)
+
+	def refreshParent(self, bouquet):
+		root = self.parents.get(bouquet.toString())
+		if root is not None:
+			self.refresh(eServiceReference(root))
+		else:
+			self.checkMode()
+
+	def getBouquets(self, root):
+		self.refresh(root)
+		return self.bouquets[root.toString()].children
+
+	def getService(self, bouquet, number):
+		"""the entry of bouquet with the number, None if there is none"""
+		self.refreshParent(bouquet)
+		return self.lookup(bouquet, number)
+
+	def getFirstNumber(self, bouquet):
+		"""the first number in bouquet, None if it has no numbered entry"""
+		self.refreshParent(bouquet)
+		return self.getNumbers(bouquet).first
+
+	def searchNumber(self, number, root, bouquet_root, firstBouquetOnly = False):
+		"""looks for number in root, then (multibouquet) in the bouquets of
+		bouquet_root like the number zap always did. returns (service, bouquet)"""
+		multibouquet = config.usage.multibouquet.value
+		if multibouquet:
+			index = self.refresh(bouquet_root)
+		else:
+			self.checkMode()
+		bouquet = root
+		service = None
+		if not firstBouquetOnly:
+			service = self.lookup(root, number)
+		if multibouquet and not service:
+			bouquets = self.bouquets[bouquet_root.toString()].children
+			if self.alternative or firstBouquetOnly:
+				found = None
+				if bouquets:
+					service = self.lookup(bouquets[0], number)
+					found = service and (service, bouquets[0])
+					bouquet = bouquets[0]
+			else:
+				self.lookups += 1
+				found = index.get(number)
+				# the search through all bouquets ended without result
+				bouquet = eServiceReference()
+			if found:
+				service, bouquet = found
+				if not isPlayable(service):
+					service = None
+		return service, bouquet
+
+	def getStats(self):
+		"""returns (lookups, bouquet listings)"""
+		return self.lookups, self.rebuilds
+
+channelNumbers = ChannelNumbers()
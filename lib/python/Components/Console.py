@@ -1,14 +1,19 @@
 from enigma import eConsoleAppContainer
 from Tools.BoundFunction import boundFunction
+from Components.OutputBuffer import OutputBuffer
 
 class Console(object):
 	def __init__(self):
 		self.appContainers = {}
 		self.appResults = {}
+		self.appBuffers = {}
 		self.callbacks = {}
 		self.extra_args = {}
 
-	def ePopen(self, cmd, callback=None, extra_args=[]):
+	# lineCallback(line) gets the output line by line while the command runs,
+	# the callback then only gets the output with keep=True. maxsize limits
+	# the output passed to the callback to its last maxsize bytes.
+	def ePopen(self, cmd, callback=None, extra_args=[], lineCallback=None, keep=True, maxsize=0):
 		name = cmd
 		i = 0
 		while self.appContainers.has_key(name):
@@ -16,6 +21,7 @@ class Console(object):
 			i += 1
 #		print "[ePopen] command:", cmd
 		self.appResults[name] = ""
+		self.appBuffers[name] = OutputBuffer(lineCallback, keep, maxsize)
 		self.extra_args[name] = extra_args
 		self.callbacks[name] = callback
 		self.appContainers[name] = eConsoleAppContainer()
@@ -27,10 +33,13 @@ class Console(object):
 		if retval:
 			self.finishedCB(name, retval)
 
+	# the output of batch commands is only logged
+	BATCH_MAXSIZE = 64 * 1024
+
 	def eBatch(self, cmds, callback, extra_args=[], debug=False):
 		self.debug = debug
 		cmd = cmds.pop(0)
-		self.ePopen(cmd, self.eBatchCB, [cmds, callback, extra_args])
+		self.ePopen(cmd, self.eBatchCB, [cmds, callback, extra_args], maxsize=self.BATCH_MAXSIZE)
 
 	def eBatchCB(self, data, retval, _extra_args):
 		(cmds, callback, extra_args) = _extra_args
@@ -38,17 +47,19 @@ class Console(object):
 			print '[eBatch] retval=%s, cmds left=%d, data:\n%s' % (retval, len(cmds), data)
 		if len(cmds):
 			cmd = cmds.pop(0)
-			self.ePopen(cmd, self.eBatchCB, [cmds, callback, extra_args])
+			self.ePopen(cmd, self.eBatchCB, [cmds, callback, extra_args], maxsize=self.BATCH_MAXSIZE)
 		else:
 			callback(extra_args)
 
 	def dataAvailCB(self, name, data):
-		self.appResults[name] += data
+		self.appBuffers[name].write(data)
 
 	def finishedCB(self, name, retval):
 		del self.appContainers[name].dataAvail[:]
 		del self.appContainers[name].appClosed[:]
-		data = self.appResults[name]
+		buffer = self.appBuffers.pop(name)
+		buffer.flush()
+		data = self.appResults[name] = buffer.getvalue()
 		extra_args = self.extra_args[name]
 		del self.appContainers[name]
 		del self.extra_args[name]
@@ -1,7 +1,7 @@
 from Components.Converter.Converter import Converter
 from Components.Element import cached
 from Components.config import config
-from Tools.GetEcmInfo import GetEcmInfo
+from Tools.GetEcmInfo import GetEcmInfo, ecmInfo, ECM_CHANGED
 from Poll import Poll
 
 
@@ -17,10 +17,30 @@ class CryptoInfo(Poll, Converter, object):
 		else:
 			self.visible = False
 		self.textvalue = ""
+		# changes of ecm.info are pushed, only the age of the ecm
+		# changes by itself
 		self.poll_interval = 1000
-		self.poll_enabled = True
+		self.poll_enabled = type == "ecminterval0"
 		self.ecmdata = GetEcmInfo()
 
+	def ecmChanged(self, record):
+		self.changed((self.CHANGED_SPECIFIC, ECM_CHANGED))
+
+	def doSuspend(self, suspended):
+		if suspended:
+			ecmInfo.removeListener(self.ecmChanged)
+		else:
+			ecmInfo.addListener(self.ecmChanged)
+			if not self.poll_enabled:
+				# it may have changed while we were hidden
+				self.ecmChanged(ecmInfo.record)
+		Poll.doSuspend(self, suspended)
+
+	def destroy(self):
+		ecmInfo.removeListener(self.ecmChanged)
+		Poll.destroy(self)
+		Converter.destroy(self)
+
 	@cached
 	def getText(self):
 		if int(config.usage.show_cryptoinfo.getValue()) < 1:
@@ -5,6 +5,7 @@
 from enigma import iServiceInformation
 from Components.Converter.Converter import Converter
 from Components.Element import cached
+from Tools.GetEcmInfo import ecmInfo, ECM_CHANGED
 from Poll import Poll
 
 
@@ -14,8 +15,11 @@ class EGExtraInfo(Poll, Converter, object):
 		Poll.__init__(self)
 
 		self.type = type
+		# everything but the cam name is updated when ecm.info changes
 		self.poll_interval = 1000
-		self.poll_enabled = True
+		self.poll_enabled = type == "CamName"
+		self.ecm_record = None
+		self.ecm_data = None
 		self.caid_data = (
 			("0x1700", "0x17ff", "Beta",    "B" ),
 			( "0x600",  "0x6ff", "Irdeto",  "I" ),
@@ -29,10 +33,38 @@ class EGExtraInfo(Poll, Converter, object):
 			("0x2600", "0x2600", "Biss",    "BI")
 		)
 
+	def ecmChanged(self, record):
+		self.changed((self.CHANGED_SPECIFIC, ECM_CHANGED))
+
+	def doSuspend(self, suspended):
+		if not self.poll_enabled:
+			if suspended:
+				ecmInfo.removeListener(self.ecmChanged)
+			else:
+				ecmInfo.addListener(self.ecmChanged)
+				# it may have changed while we were hidden
+				self.ecmChanged(ecmInfo.record)
+		Poll.doSuspend(self, suspended)
+
+	def destroy(self):
+		ecmInfo.removeListener(self.ecmChanged)
+		Poll.destroy(self)
+		Converter.destroy(self)
+
 	def GetEcmInfo(self):
+		# parsed once per change of ecm.info, the result is shared
+		record = ecmInfo.getRecord()
+		if record is not self.ecm_record:
+			self.ecm_record = record
+			self.ecm_data = self.parseEcmInfo(record)
+		return self.ecm_data
+
+	def parseEcmInfo(self, record):
 		data = {}
 		try:
-			ecm = open('/tmp/ecm.info', 'rb').readlines()
+			if record.mtime is None:
+				raise IOError("no ecm.info")
+			ecm = list(record.lines)
 			info = {}
 			for line in ecm:
 				d = line.split(':', 1)
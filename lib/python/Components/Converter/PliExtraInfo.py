@@ -5,7 +5,7 @@ from Components.Converter.Converter import Converter
 from Components.Element import cached
 from Components.config import config
 from Tools.Transponder import ConvertToHumanReadable
-from Tools.GetEcmInfo import GetEcmInfo
+from Tools.GetEcmInfo import GetEcmInfo, ecmInfo, ECM_CHANGED
 from Poll import Poll
 
 def addspace(text):
@@ -18,8 +18,11 @@ class PliExtraInfo(Poll, Converter, object):
 		Converter.__init__(self, type)
 		Poll.__init__(self)
 		self.type = type
+		# the crypto types are updated when ecm.info changes, only the
+		# video information is polled
+		self.ecm_listener = type.startswith("Crypto") or type == "All"
 		self.poll_interval = 1000
-		self.poll_enabled = True
+		self.poll_enabled = type in ("ResolutionString", "VideoCodec", "All", "ServiceInfo")
 		self.caid_data = (
 			( "0x100",  "0x1ff", "Seca",     "S",  True  ),
 			( "0x500",  "0x5ff", "Via",      "V",  True  ),
@@ -814,6 +817,25 @@ class PliExtraInfo(Poll, Converter, object):
 
 	boolean = property(getBool)
 
+	def ecmChanged(self, record):
+		self.changed((self.CHANGED_SPECIFIC, ECM_CHANGED))
+
+	def doSuspend(self, suspended):
+		if self.ecm_listener:
+			if suspended:
+				ecmInfo.removeListener(self.ecmChanged)
+			else:
+				ecmInfo.addListener(self.ecmChanged)
+				if not self.poll_enabled:
+					# it may have changed while we were hidden
+					self.ecmChanged(ecmInfo.record)
+		Poll.doSuspend(self, suspended)
+
+	def destroy(self):
+		ecmInfo.removeListener(self.ecmChanged)
+		Poll.destroy(self)
+		Converter.destroy(self)
+
 	def changed(self, what):
 		if what[0] == self.CHANGED_SPECIFIC:
 			self.updateFEdata = False
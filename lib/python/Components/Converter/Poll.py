@@ -1,18 +1,121 @@
 from enigma import eTimer
+from time import time
+from traceback import print_exc
+
+# all pollers share one timer.
+#
+# pollers are grouped by their interval, the ticks of a group are aligned
+# to the multiples of the interval (so a 500 ms and a 1000 ms poller poll
+# together every second, a one minute poller on the full minute). a group
+# due within SLACK of a tick polls early and shares it, all pollers of one
+# tick are polled in the same timer callback, so their changes reach the
+# screen in one repaint instead of one wakeup per converter.
+# pollScheduler.getStats() tells the wakeups and polls per interval.
+
+class PollScheduler:
+	SLACK = 50	# ms
+
+	def __init__(self):
+		self.timer = None
+		self.groups = { }	# interval -> [pollers]
+		self.due = { }		# interval -> time (ms) of its next tick
+		self.stats = { }	# interval -> [wakeups, polls]
+		self.wakeups = 0
+		self.ticking = False
+
+	def nextTick(self, interval, now):
+		return now - now % interval + interval
+
+	def add(self, poller, interval):
+		group = self.groups.setdefault(interval, [ ])
+		if poller in group:
+			return
+		group.append(poller)
+		if interval not in self.due:
+			self.due[interval] = self.nextTick(interval, time() * 1000)
+			self.stats.setdefault(interval, [0, 0])
+			self.schedule()
+
+	def remove(self, poller, interval):
+		group = self.groups.get(interval)
+		if group is not None and poller in group:
+			group.remove(poller)
+			if not group:
+				del self.groups[interval]
+				del self.due[interval]
+				self.schedule()
+
+	def schedule(self):
+		if self.ticking:
+			return
+		if not self.due:
+			if self.timer is not None:
+				self.timer.stop()
+			return
+		if self.timer is None:
+			self.timer = eTimer()
+			self.timer.callback.append(self.tick)
+		now = time() * 1000
+		for interval, due in self.due.items():
+			if due - now > interval:
+				# the clock was set back
+				self.due[interval] = self.nextTick(interval, now)
+		self.timer.start(max(0, int(min(self.due.values()) - now)), True)
+
+	def tick(self):
+		self.ticking = True
+		self.wakeups += 1
+		try:
+			now = time() * 1000
+			for interval in sorted(self.due):
+				due = self.due.get(interval)
+				if due is None or due - now > min(self.SLACK, interval / 10):
+					continue
+				due += interval
+				if due <= now:
+					# missed ticks are not made up for
+					due = self.nextTick(interval, now)
+				self.due[interval] = due
+				stats = self.stats[interval]
+				stats[0] += 1
+				group = self.groups[interval]
+				for poller in group[:]:
+					if poller in group:
+						stats[1] += 1
+						try:
+							poller.poll()
+						except Exception:
+							print_exc()
+		finally:
+			self.ticking = False
+			self.schedule()
+
+	def getStats(self):
+		"""returns the timer wakeups and {interval: (pollers, ticks, polls)}"""
+		return self.wakeups, dict([(interval, (len(self.groups.get(interval, ())), stats[0], stats[1])) for (interval, stats) in self.stats.items()])
+
+pollScheduler = PollScheduler()
 
 class Poll(object):
 	def __init__(self):
-		self.__poll_timer = eTimer()
-		self.__poll_timer.callback.append(self.poll)
 		self.__interval = 1000
 		self.__enabled = False
+		self.__scheduled = None	# the interval we are polled with
+
+	def __schedule(self, interval):
+		if self.__scheduled is not None:
+			pollScheduler.remove(self, self.__scheduled)
+		self.__scheduled = interval
+		if interval is not None:
+			pollScheduler.add(self, interval)
 
 	def __setInterval(self, interval):
 		self.__interval = interval
 		if self.__enabled:
-			self.__poll_timer.start(self.__interval)
+			if self.__scheduled != interval:
+				self.__schedule(interval)
 		else:
-			self.__poll_timer.stop()
+			self.__schedule(None)
 
 	def __setEnable(self, enabled):
 		self.__enabled = enabled
@@ -27,10 +130,10 @@ class Poll(object):
 	def doSuspend(self, suspended):
 		if self.__enabled:
 			if suspended:
-				self.__poll_timer.stop()
+				self.__schedule(None)
 			else:
 				self.poll()
 				self.poll_enabled = True
 
 	def destroy(self):
-		self.__poll_timer.callback.remove(self.poll)
+		self.__schedule(None)
@@ -1,25 +1,61 @@
 from Components.Converter.StringList import StringList
+from time import time
+
+# the evaluated templates are shared by all converters with the same
+# template text (ignoring the indentation of its lines), so screens using
+# a template which was seen before do not evaluate it again. the shared
+# templates (and their fonts) must not be modified.
+
+templateCache = { }		# normalized template text -> (template, seconds the evaluation took)
+templateNames = None		# what templates can use
+templateEvaluations = 0
+templateEvaluationsAvoided = 0
+templateTimeSaved = 0.0
+
+def getTemplateNames():
+	global templateNames
+	if templateNames is None:
+		from enigma import eListboxPythonMultiContent, gFont, RT_HALIGN_LEFT, RT_HALIGN_CENTER, RT_HALIGN_RIGHT, RT_VALIGN_TOP, RT_VALIGN_CENTER, RT_VALIGN_BOTTOM, RT_WRAP
+		from Components.MultiContent import MultiContentEntryText, MultiContentEntryPixmap, MultiContentEntryPixmapAlphaTest, MultiContentEntryPixmapAlphaBlend, MultiContentTemplateColor, MultiContentEntryProgress
+		templateNames = locals()
+	return templateNames
+
+def evalTemplate(args):
+	template = eval(args, {}, dict(getTemplateNames()))
+	assert "fonts" in template
+	assert "itemHeight" in template
+	assert "template" in template or "templates" in template
+	assert "template" in template or "default" in template["templates"] # we need to have a default template
+
+	if not "template" in template: # default template can be ["template"] or ["templates"]["default"]
+		template["template"] = template["templates"]["default"][1]
+		template["itemHeight"] = template["template"][0]
+	return template
+
+def getTemplate(args):
+	global templateEvaluations, templateEvaluationsAvoided, templateTimeSaved
+	key = '\n'.join([line.strip() for line in args.splitlines() if line.strip()])
+	cached = templateCache.get(key)
+	if cached is not None:
+		templateEvaluationsAvoided += 1
+		templateTimeSaved += cached[1]
+		return cached[0]
+	start = time()
+	template = evalTemplate(args)
+	templateEvaluations += 1
+	templateCache[key] = (template, time() - start)
+	return template
+
+def getTemplateCacheStats():
+	"""returns (evaluations, evaluations avoided, seconds saved)"""
+	return templateEvaluations, templateEvaluationsAvoided, templateTimeSaved
 
 class TemplatedMultiContent(StringList):
 	"""Turns a python tuple list into a multi-content list which can be used in a listbox renderer."""
 	def __init__(self, args):
 		StringList.__init__(self, args)
-		from enigma import eListboxPythonMultiContent, gFont, RT_HALIGN_LEFT, RT_HALIGN_CENTER, RT_HALIGN_RIGHT, RT_VALIGN_TOP, RT_VALIGN_CENTER, RT_VALIGN_BOTTOM, RT_WRAP
-		from Components.MultiContent import MultiContentEntryText, MultiContentEntryPixmap, MultiContentEntryPixmapAlphaTest, MultiContentEntryPixmapAlphaBlend, MultiContentTemplateColor, MultiContentEntryProgress
-		l = locals()
-		del l["self"] # cleanup locals a bit
-		del l["args"]
-
 		self.active_style = None
-		self.template = eval(args, {}, l)
-		assert "fonts" in self.template
-		assert "itemHeight" in self.template
-		assert "template" in self.template or "templates" in self.template
-		assert "template" in self.template or "default" in self.template["templates"] # we need to have a default template
-
-		if not "template" in self.template: # default template can be ["template"] or ["templates"]["default"]
-			self.template["template"] = self.template["templates"]["default"][1]
-			self.template["itemHeight"] = self.template["template"][0]
+		self.template = getTemplate(args)
 
 	def changed(self, what):
 		if not self.content:
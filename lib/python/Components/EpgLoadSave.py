@@ -40,6 +40,7 @@ class EpgCacheLoadCheckPoller:
 
 	def createLoadCheckJob(self):
 		job = Components.Task.Job(_("EPG Cache Check"))
+		job.resources = [ Components.Task.diskResource(config.misc.epgcache_filename.getValue()) ]
 		if config.epg.cacheloadsched.getValue():
 			task = Components.Task.PythonTask(job, _("Reloading EPG Cache..."))
 			task.work = self.JobEpgCacheLoad
@@ -79,6 +80,7 @@ class EpgCacheSaveCheckPoller:
 
 	def createSaveCheckJob(self):
 		job = Components.Task.Job(_("EPG Cache Check"))
+		job.resources = [ Components.Task.diskResource(config.misc.epgcache_filename.getValue()) ]
 		if config.epg.cachesavesched.getValue():
 			task = Components.Task.PythonTask(job, _("Saving EPG Cache..."))
 			task.work = self.JobEpgCacheSave
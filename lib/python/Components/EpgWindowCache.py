@@ -0,0 +1,129 @@
+from time import time
+from enigma import eEPGCache, eTimer
+
+# cache of the time windows of the graphical multi EPGs (the one of
+# EpgSelection and the GraphMultiEPG plugin).
+#
+# a window is the result of one lookupEvent for all services of a bouquet
+# between time_base and time_base + time_epoch, grouped into rows
+# (service, service_name, events). the last windows are kept (LRU), so
+# paging back and forth, jumping days or switching between bouquets does
+# not repeat the lookup. after a fill the next window of the same bouquet
+# is looked up when the box is idle (no further paging for a moment).
+#
+# the epg cache gives no notification of new data, so a window expires
+# after WINDOW_TTL seconds and invalidate() drops all windows (after a zap,
+# when new data is expected). timers are not part of a window, their state
+# is looked up when a row is drawn, so the screens repaint the list (not
+# refill it) when they add or remove a timer. mergeRows() is only used for
+# a refill of the window on screen, another window is set as a whole.
+
+MAX_WINDOWS = 16
+WINDOW_TTL = 60
+PREFETCH_DELAY = 1500	# ms without a fill before the next window is looked up
+
+def groupEvents(epg_data):
+	"""the records of an 'XRnITBD' lookup as rows (service, service_name,
+	events), events being [(event_id, event_title, begin_time, duration)]
+	or None"""
+	rows = [ ]
+	tmp_list = None
+	service = ""
+	sname = ""
+	for x in epg_data:
+		if service != x[0]:
+			if tmp_list is not None:
+				rows.append((service, sname, tmp_list[0][0] is not None and tmp_list or None))
+			service = x[0]
+			sname = x[1]
+			tmp_list = [ ]
+		tmp_list.append((x[2], x[3], x[4], x[5])) #(event_id, event_title, begin_time, duration)
+	if tmp_list:
+		rows.append((service, sname, tmp_list[0][0] is not None and tmp_list or None))
+	return rows
+
+def mergeRows(current, rows):
+	"""replaces the rows (service, service_name, events, picon) of current
+	whose events differ from rows, keeping their picons. returns the indexes
+	of the replaced rows, None (and current unchanged) if the services differ"""
+	if len(current) != len(rows):
+		return None
+	for idx in range(len(rows)):
+		if current[idx][0] != rows[idx][0]:
+			return None
+	changed = [ ]
+	for idx in range(len(rows)):
+		old = current[idx]
+		service, sname, events = rows[idx]
+		if old[2] is not events and (old[2] != events or old[1] != sname):
+			current[idx] = (service, sname, events, old[3])
+			changed.append(idx)
+	return changed
+
+class EpgWindowCache:
+	def __init__(self):
+		self.windows = { }	# (refs, time_base, time_epoch) -> (time, rows)
+		self.order = [ ]	# keys, least recently used first
+		self.prefetchTimer = None
+		self.prefetchKey = None
+		self.hits = 0
+		self.misses = 0
+
+	def lookup(self, refs, time_base, time_epoch):
+		epgcache = eEPGCache.getInstance()
+		if epgcache is None:
+			return [ ]
+		test = [ (ref, 0, time_base, time_epoch) for ref in refs ]
+		test.insert(0, 'XRnITBD') #return record, service ref, service name, event id, event title, begin time, duration
+		return groupEvents(epgcache.lookupEvent(test))
+
+	def store(self, key, rows):
+		if key in self.windows:
+			self.order.remove(key)
+		self.windows[key] = (time(), rows)
+		self.order.append(key)
+		while len(self.order) > MAX_WINDOWS:
+			del self.windows[self.order.pop(0)]
+
+	def get(self, refs, time_base, time_epoch):
+		"""the rows of the services refs (a tuple of service reference
+		strings) in the window starting at time_base (time_epoch minutes)"""
+		key = (refs, int(time_base), time_epoch)
+		window = self.windows.get(key)
+		if window is not None and time() - window[0] < WINDOW_TTL:
+			self.hits += 1
+			self.order.remove(key)
+			self.order.append(key)
+			rows = window[1]
+		else:
+			self.misses += 1
+			rows = self.lookup(refs, time_base, time_epoch)
+			self.store(key, rows)
+		self.schedulePrefetch((refs, int(time_base) + time_epoch * 60, time_epoch))
+		return rows
+
+	def schedulePrefetch(self, key):
+		if self.prefetchTimer is None:
+			self.prefetchTimer = eTimer()
+			self.prefetchTimer.callback.append(self.prefetch)
+		self.prefetchKey = key
+		self.prefetchTimer.start(PREFETCH_DELAY, True)
+
+	def prefetch(self):
+		key = self.prefetchKey
+		self.prefetchKey = None
+		if key is None:
+			return
+		window = self.windows.get(key)
+		if window is None or time() - window[0] >= WINDOW_TTL / 2:
+			self.store(key, self.lookup(*key))
+
+	def invalidate(self):
+		self.windows.clear()
+		del self.order[:]
+
+	def getStats(self):
+		"""returns (hits, misses, windows)"""
+		return self.hits, self.misses, len(self.windows)
+
+epgWindowCache = EpgWindowCache()
@@ -1,6 +1,7 @@
 import os
 from enigma import eConsoleAppContainer
 from Components.Harddisk import harddiskmanager
+from Components.OutputBuffer import OutputBuffer
 
 opkgDestinations = []
 opkgStatusPath = ''
@@ -62,7 +63,7 @@ class IpkgComponent:
 	def __init__(self, ipkg = 'opkg'):
 		self.ipkg = ipkg
 		self.cmd = eConsoleAppContainer()
-		self.cache = None
+		self.output = OutputBuffer(self.cmdLine, keep = False)
 		self.callbackList = []
 		self.setCurrentCommand()
 
@@ -74,6 +75,7 @@ class IpkgComponent:
 
 	def runCmd(self, cmd):
 		print "executing", self.ipkg, cmd
+		self.output.clear()
 		self.cmd.appClosed.append(self.cmdFinished)
 		self.cmd.dataAvail.append(self.cmdData)
 		if self.cmd.execute(self.ipkg + " " + cmd):
@@ -103,28 +105,17 @@ class IpkgComponent:
 		self.setCurrentCommand(cmd)
 
 	def cmdFinished(self, retval):
+		self.output.flush()
 		self.callCallbacks(self.EVENT_DONE)
 		self.cmd.appClosed.remove(self.cmdFinished)
 		self.cmd.dataAvail.remove(self.cmdData)
 
 	def cmdData(self, data):
-# 		print "data:", data
-		if self.cache is None:
-			self.cache = data
-		else:
-			self.cache += data
-
-		if '\n' in data:
-			splitcache = self.cache.split('\n')
-			if self.cache[-1] == '\n':
-				iteration = splitcache
-				self.cache = None
-			else:
-				iteration = splitcache[:-1]
-				self.cache = splitcache[-1]
-			for mydata in iteration:
-				if mydata != '':
-					self.parseLine(mydata)
+		self.output.write(data)
+
+	def cmdLine(self, line):
+		if line != '':
+			self.parseLine(line)
 
 	def parseLine(self, data):
 		if self.currentCommand in (self.CMD_LIST, self.CMD_UPGRADE_LIST):
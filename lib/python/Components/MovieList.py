@@ -4,11 +4,11 @@ from ServiceReference import ServiceReference
 from Components.MultiContent import MultiContentEntryText, MultiContentEntryPixmapAlphaTest, MultiContentEntryProgress
 from Components.config import config
 import os
-import struct
 import random
 from Tools.LoadPixmap import LoadPixmap
 from Tools.Directories import SCOPE_ACTIVE_SKIN, resolveFilename
 from Screens.LocationBox import defaultInhibitDirs
+from Components.MovieListCache import movieListCache, readCuts, cutsParser, CachedMovieInfo
 import NavigationInstance
 import skin
 
@@ -20,8 +20,6 @@ IMAGE_EXTENSIONS = frozenset((".jpg", ".png", ".gif", ".bmp"))
 MOVIE_EXTENSIONS = frozenset((".mpg", ".vob", ".wav", ".m4v", ".mkv", ".avi", ".divx", ".dat", ".flv", ".mp4", ".mov", ".wmv"))
 KNOWN_EXTENSIONS = MOVIE_EXTENSIONS.union(IMAGE_EXTENSIONS, DVD_EXTENSIONS, AUDIO_EXTENSIONS)
 
-cutsParser = struct.Struct('>QI') # big-endian, 64-bit PTS and 32-bit type
-
 class MovieListData:
 	pass
 
@@ -54,20 +52,17 @@ def lastPlayPosFromCache(ref):
 def moviePlayState(cutsFileName, ref, length):
 	'''Returns None, 0..100 for percentage'''
 	try:
-		# read the cuts file first
-		f = open(cutsFileName, 'rb')
-		lastCut = None
-		cutPTS = None
-		while 1:
-			data = f.read(cutsParser.size)
-			if len(data) < cutsParser.size:
-				break
-			cut, cutType = cutsParser.unpack(data)
-			if cutType == 3: # undocumented, but 3 appears to be the stop
-				cutPTS = cut
-			else:
-				lastCut = cut
-		f.close()
+		cuts = readCuts(cutsFileName)
+	except:
+		cuts = None
+	return cutsPlayState(cuts, ref, length)
+
+def cutsPlayState(cuts, ref, length):
+	'''Returns None, 0..100 for percentage, cuts as returned by readCuts'''
+	try:
+		if cuts is None:
+			raise IOError("no cuts")
+		lastCut, cutPTS = cuts
 		# See what we have in RAM (it might help)
 		last = lastPlayPosFromCache(ref)
 		if last:
@@ -325,7 +320,10 @@ class MovieList(GUIComponent):
 			elif (self.playInBackground or self.playInForeground) and serviceref == (self.playInBackground or self.playInForeground):
 				data.icon = self.iconMoviePlay
 			else:
-				data.part = moviePlayState(pathName + '.cuts', serviceref, data.len)
+				if isinstance(info, CachedMovieInfo):
+					data.part = cutsPlayState(info.directory.getCuts(serviceref), serviceref, data.len)
+				else:
+					data.part = moviePlayState(pathName + '.cuts', serviceref, data.len)
 				if switch == 'i':
 					if data.part is not None and data.part > 0:
 						data.icon = self.iconPart[data.part // 25]
@@ -421,6 +419,7 @@ class MovieList(GUIComponent):
 		self.setFontsize()
 
 	def preWidgetRemove(self, instance):
+		movieListCache.save()
 		instance.setContent(None)
 		instance.selectionChanged.get().remove(self.selectionChanged)
 
@@ -464,6 +463,8 @@ class MovieList(GUIComponent):
 		realtags = set()
 		tags = {}
 		rootPath = os.path.normpath(root.getPath());
+		cache = movieListCache.getDirectory(rootPath)
+		names = set()
 		parent = None
 		# Don't navigate above the "root"
 		if len(rootPath) > 1 and (os.path.realpath(rootPath) != config.movielist.root.getValue()):
@@ -481,7 +482,11 @@ class MovieList(GUIComponent):
 			serviceref = reflist.getNext()
 			if not serviceref.valid():
 				break
-			info = serviceHandler.info(serviceref)
+			if serviceref.flags & eServiceReference.mustDescent:
+				info = serviceHandler.info(serviceref)
+			else:
+				names.add(os.path.basename(serviceref.getPath()))
+				info = cache.getInfo(serviceref, serviceHandler)
 			if info is None:
 				info = justStubInfo
 			begin = info.getInfo(serviceref, iServiceInformation.sTimeCreate)
@@ -523,6 +528,9 @@ class MovieList(GUIComponent):
 
 			self.list.append((serviceref, info, begin, -1))
 
+		cache.prune(names)
+		cache.save()
+
 		self.firstFileEntry = numberOfDirs
 		self.parentDirectory = 0
 		if self.sort_type == MovieList.SORT_ALPHANUMERIC:
@@ -0,0 +1,210 @@
+import os
+import marshal
+import struct
+from hashlib import md5
+from collections import OrderedDict
+from enigma import eServiceCenter, iServiceInformation
+from Tools.Directories import resolveFilename, SCOPE_CONFIG
+
+# per directory cache of the recording metadata shown in the movie list.
+#
+# for every file the name, tags, description, creation time, length and
+# the parsed .cuts file are kept, keyed by (mtime, size) of the file and
+# its .meta file (resp. of the .cuts file for the play position). a reload
+# of a known directory only stats the files, only changed files are read
+# through the service handler again.
+#
+# the caches are stored in a central directory (not in the recording
+# folders, which may be read only and should not get extra files), one
+# file per recording directory, and are only written when changed.
+
+CACHE_VERSION = 1
+cutsParser = struct.Struct('>QI') # big-endian, 64-bit PTS and 32-bit type
+
+# entry fields
+STAMP, NAME, TAGS, BEGIN, DESCRIPTION, LENGTH, CUTS = range(7)
+
+def fileStamp(path):
+	try:
+		st = os.stat(path)
+		return (st.st_mtime, st.st_size)
+	except OSError:
+		return None
+
+def readCuts(cutsFileName):
+	'''Returns (last cut, stop position) of a .cuts file, raises IOError'''
+	f = open(cutsFileName, 'rb')
+	lastCut = None
+	cutPTS = None
+	try:
+		while 1:
+			data = f.read(cutsParser.size)
+			if len(data) < cutsParser.size:
+				break
+			cut, cutType = cutsParser.unpack(data)
+			if cutType == 3: # undocumented, but 3 appears to be the stop
+				cutPTS = cut
+			else:
+				lastCut = cut
+	finally:
+		f.close()
+	return (lastCut, cutPTS)
+
+class CachedMovieInfo:
+	# iStaticServiceInformation, answered from the cache where possible.
+	# everything else goes to the real service information, which is only
+	# requested when needed.
+	def __init__(self, directory, entry, serviceref):
+		self.directory = directory
+		self.entry = entry
+		self.serviceref = serviceref
+		self.info = None
+
+	def __getattr__(self, name):
+		if self.info is None:
+			self.info = eServiceCenter.getInstance().info(self.serviceref)
+			if self.info is None:
+				raise AttributeError(name)
+		return getattr(self.info, name)
+
+	def getName(self, serviceref):
+		return self.entry[NAME]
+
+	def getInfo(self, serviceref, w):
+		if w == iServiceInformation.sTimeCreate:
+			return self.entry[BEGIN]
+		return self.__getattr__("getInfo")(serviceref, w)
+
+	def getInfoString(self, serviceref, w):
+		if w == iServiceInformation.sTags:
+			return self.entry[TAGS]
+		if w == iServiceInformation.sDescription:
+			return self.entry[DESCRIPTION]
+		return self.__getattr__("getInfoString")(serviceref, w)
+
+	def getLength(self, serviceref):
+		if self.entry[LENGTH] is None:
+			self.entry[LENGTH] = self.__getattr__("getLength")(serviceref)
+			self.directory.dirty = True
+		return self.entry[LENGTH]
+
+class MovieDirectoryCache:
+	def __init__(self, path, filename):
+		self.path = path
+		self.filename = filename
+		self.entries = {}	# file name -> entry list
+		self.dirty = False
+		self.load()
+
+	def load(self):
+		try:
+			f = open(self.filename, 'rb')
+			try:
+				version, path, entries = marshal.load(f)
+			finally:
+				f.close()
+			if version == CACHE_VERSION and path == self.path:
+				self.entries = dict((name, list(entry)) for (name, entry) in entries.iteritems())
+		except (IOError, EOFError, ValueError, TypeError):
+			pass
+
+	def save(self):
+		if not self.dirty:
+			return
+		self.dirty = False
+		try:
+			f = open(self.filename + ".writing", 'wb')
+			marshal.dump((CACHE_VERSION, self.path, dict((name, tuple(entry)) for (name, entry) in self.entries.iteritems())), f)
+			f.close()
+			os.rename(self.filename + ".writing", self.filename)
+		except (IOError, OSError), e:
+			print "[MovieListCache] failed to write", self.filename, e
+
+	def stamp(self, pathName):
+		return (fileStamp(pathName), fileStamp(pathName + '.meta'))
+
+	def getInfo(self, serviceref, serviceHandler):
+		# returns the (possibly cached) information, None for files the
+		# service handler knows nothing about
+		pathName = serviceref.getPath()
+		name = os.path.basename(pathName)
+		stamp = self.stamp(pathName)
+		entry = self.entries.get(name)
+		if entry is None or entry[STAMP] != stamp or stamp[0] is None:
+			info = serviceHandler.info(serviceref)
+			if info is None:
+				self.entries.pop(name, None)
+				return None
+			cuts = entry and entry[CUTS]
+			entry = [stamp,
+				info.getName(serviceref),
+				info.getInfoString(serviceref, iServiceInformation.sTags),
+				info.getInfo(serviceref, iServiceInformation.sTimeCreate),
+				info.getInfoString(serviceref, iServiceInformation.sDescription),
+				None, cuts]
+			self.entries[name] = entry
+			self.dirty = True
+			result = CachedMovieInfo(self, entry, serviceref)
+			result.info = info
+			return result
+		return CachedMovieInfo(self, entry, serviceref)
+
+	def getCuts(self, serviceref):
+		# returns (last cut, stop position) of the .cuts file, None if
+		# there is none
+		pathName = serviceref.getPath()
+		name = os.path.basename(pathName)
+		cutsFileName = pathName + '.cuts'
+		stamp = fileStamp(cutsFileName)
+		entry = self.entries.get(name)
+		if entry is not None and entry[CUTS] is not None and entry[CUTS][0] == stamp:
+			return entry[CUTS][1]
+		try:
+			cuts = readCuts(cutsFileName)
+		except:
+			cuts = None
+		if entry is not None and stamp is not None:
+			entry[CUTS] = (stamp, cuts)
+			self.dirty = True
+		return cuts
+
+	def prune(self, names):
+		# forget the files which are gone
+		for name in [name for name in self.entries if name not in names]:
+			del self.entries[name]
+			self.dirty = True
+
+class MovieListCache:
+	# number of directories kept in memory
+	MaxDirectories = 8
+
+	def __init__(self, path = None):
+		self.path = path or resolveFilename(SCOPE_CONFIG, "moviecache/")
+		self.directories = OrderedDict()
+
+	def getDirectory(self, path):
+		path = os.path.join(os.path.normpath(path), '')
+		directory = self.directories.pop(path, None)
+		if directory is None:
+			if not os.path.isdir(self.path):
+				try:
+					os.makedirs(self.path)
+				except OSError:
+					pass
+			directory = MovieDirectoryCache(path, os.path.join(self.path, md5(path).hexdigest()))
+		self.directories[path] = directory
+		while len(self.directories) > self.MaxDirectories:
+			self.directories.popitem(last = False)[1].save()
+		return directory
+
+	def save(self):
+		for directory in self.directories.itervalues():
+			directory.save()
+
+	def invalidate(self, path = None):
+		if path is None:
+			self.directories.clear()
+		else:
+			self.directories.pop(os.path.join(os.path.normpath(path), ''), None)
+
+movieListCache = MovieListCache()
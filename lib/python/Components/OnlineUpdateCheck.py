@@ -38,6 +38,8 @@ class OnlineUpdateCheckPoller:
 
 	def createCheckJob(self):
 		job = Components.Task.Job(_("OnlineVersionCheck"))
+		job.resources = [ "network" ]
+		job.priority = job.PRIORITY_LOW
 		task = Components.Task.PythonTask(job, _("Checking for Updates..."))
 		task.work = self.JobStart
 		task.weighting = 1
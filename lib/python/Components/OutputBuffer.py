@@ -0,0 +1,75 @@
+# collects the output of a child process in linear time.
+#
+# the output is kept as a list of chunks and only joined when asked for,
+# line splitting only looks at the new data. optionally
+# - lineCallback(line) is called for every complete line (without the
+#   line end) as soon as it arrives, the last unterminated line on flush(),
+# - keep = False does not collect the output at all (for callers which
+#   only process lines),
+# - maxsize limits the collected output to its last maxsize bytes (for
+#   commands whose output is only logged).
+
+class OutputBuffer:
+	def __init__(self, lineCallback = None, keep = True, maxsize = 0):
+		self.lineCallback = lineCallback
+		self.keep = keep
+		self.maxsize = maxsize
+		self.chunks = [ ]
+		self.size = 0
+		self.truncated = False
+		self.partial = [ ]	# pieces of the current unterminated line
+
+	def write(self, data):
+		if not data:
+			return
+		if self.keep:
+			self.chunks.append(data)
+			self.size += len(data)
+			if self.maxsize and self.size > self.maxsize:
+				self.truncate()
+		if self.lineCallback is not None:
+			self.splitLines(data)
+
+	def truncate(self):
+		self.truncated = True
+		while self.size - len(self.chunks[0]) >= self.maxsize:
+			self.size -= len(self.chunks.pop(0))
+		if self.size > self.maxsize:
+			self.chunks[0] = self.chunks[0][self.size - self.maxsize:]
+			self.size = self.maxsize
+
+	def splitLines(self, data):
+		start = 0
+		end = data.find('\n')
+		while end != -1:
+			if self.partial:
+				self.partial.append(data[start:end])
+				line = ''.join(self.partial)
+				self.partial = [ ]
+			else:
+				line = data[start:end]
+			self.lineCallback(line)
+			start = end + 1
+			end = data.find('\n', start)
+		if start < len(data):
+			self.partial.append(data[start:])
+
+	def flush(self):
+		if self.partial:
+			line = ''.join(self.partial)
+			self.partial = [ ]
+			if self.lineCallback is not None:
+				self.lineCallback(line)
+
+	def getvalue(self):
+		if len(self.chunks) > 1:
+			self.chunks = [ ''.join(self.chunks) ]
+		if self.chunks:
+			return self.chunks[0]
+		return ""
+
+	def clear(self):
+		self.chunks = [ ]
+		self.size = 0
+		self.truncated = False
+		self.partial = [ ]
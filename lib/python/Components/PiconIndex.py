@@ -0,0 +1,123 @@
+import os
+from time import time
+from Components.Harddisk import harddiskmanager
+from Tools.Inotify import inotify, IN_DIRECTORY_CHANGES, IN_CREATE, IN_MOVED_TO, IN_IGNORED
+
+# one in-memory index of the picon directories, shared by all picon
+# renderers. every directory is listed once, afterwards lookups do not
+# touch the file system. the index is kept up to date by inotify (where
+# available) and by rescanning on partition add/remove events.
+#
+# a missing directory is looked for again when something is created in its
+# nearest existing parent directory (mkdir, an ftp upload). without inotify
+# it is looked for again after MISSING_TTL seconds.
+
+MISSING_TTL = 60
+
+class PiconIndex:
+	def __init__(self):
+		self.dirs = {}		# directory (with trailing /) -> set of picon names, None if missing
+		self.missing = {}	# missing directory -> time it was looked for, unless its parent is watched
+		self.parents = {}	# watched parent directory -> missing directories below it
+		self.on_change = [ ]	# called with the directory whose content changed
+		harddiskmanager.on_partition_list_change.append(self.partitionListChanged)
+
+	def scan(self, path):
+		try:
+			names = set([fn[:-4] for fn in os.listdir(path) if fn.endswith('.png')])
+		except OSError:
+			names = None
+		self.dirs[path] = names
+		self.missing.pop(path, None)
+		if names is not None:
+			inotify.addWatch(path, IN_DIRECTORY_CHANGES, self.directoryChanged)
+		elif not self.watchParent(path):
+			self.missing[path] = time()
+		return names
+
+	def watchParent(self, path):
+		parent = os.path.dirname(path.rstrip('/'))
+		while parent and parent != '/' and not os.path.isdir(parent):
+			parent = os.path.dirname(parent)
+		if not parent:
+			return False
+		parent = os.path.join(parent, '')
+		if not inotify.addWatch(parent, IN_CREATE | IN_MOVED_TO, self.parentChanged):
+			return False
+		self.parents.setdefault(parent, set()).add(path)
+		return True
+
+	def getNames(self, path):
+		if path in self.dirs:
+			if path in self.missing and time() - self.missing[path] >= MISSING_TTL:
+				return self.scan(path)
+			return self.dirs[path]
+		return self.scan(path)
+
+	def exists(self, path):
+		return self.getNames(path) is not None
+
+	def hasPicons(self, path):
+		return bool(self.getNames(path))
+
+	def lookup(self, path, serviceName):
+		names = self.getNames(path)
+		if names is not None and serviceName in names:
+			return path + serviceName + ".png"
+		return ""
+
+	def find(self, paths, serviceName):
+		for path in paths:
+			pngname = self.lookup(path, serviceName)
+			if pngname:
+				return pngname
+		return ""
+
+	def rescan(self, prefix = "/"):
+		for path in self.dirs.keys():
+			if path.startswith(prefix):
+				inotify.removeWatch(path, self.directoryChanged)
+				self.scan(path)
+				self.changed(path)
+
+	def parentChanged(self, parent, name, mask):
+		paths = self.parents.get(parent)
+		if paths is None:
+			return
+		if mask & IN_IGNORED:
+			# the parent went away, look for the next existing one
+			found = paths
+		else:
+			below = os.path.join(parent, name, '')
+			found = set([path for path in paths if path.startswith(below)])
+		if not found:
+			return
+		paths -= found
+		if not paths:
+			del self.parents[parent]
+			inotify.removeWatch(parent, self.parentChanged)
+		for path in found:
+			if self.scan(path) is not None:
+				self.changed(path)
+
+	def changed(self, path):
+		for f in self.on_change:
+			f(path)
+
+	def directoryChanged(self, path, name, mask):
+		names = self.dirs.get(path)
+		if names is None or not name or not name.endswith('.png'):
+			# the directory itself went away or moved, read it again
+			self.scan(path)
+		elif os.path.exists(path + name):
+			names.add(name[:-4])
+		else:
+			names.discard(name[:-4])
+		self.changed(path)
+
+	def partitionListChanged(self, why, part):
+		mountpoint = part.mountpoint
+		if mountpoint:
+			self.rescan(os.path.join(mountpoint, ''))
+
+piconIndex = PiconIndex()
@@ -1,12 +1,105 @@
 import os
+import sys
+import marshal
 from shutil import rmtree
 from bisect import insort
-from Tools.Directories import fileExists
+from hashlib import md5
+from enigma import getBoxType
+from Tools.Directories import fileExists, resolveFilename, SCOPE_CONFIG
 from Tools.Import import my_import
-from Tools.Profile import profile
+from Tools.Profile import profile, profile_span
 from Plugins.Plugin import PluginDescriptor
 import keymapparser
 
+# plugins which only hook into places where they are called (menus, lists)
+# are not imported at boot if their descriptors are in the plugin cache.
+# they are imported on the first call of one of their descriptors. plugins
+# which add config entries when they are imported (config.plugins.X, with
+# its notifiers) are always imported at boot.
+LAZY_WHERE = frozenset((
+	PluginDescriptor.WHERE_EXTENSIONSMENU,
+	PluginDescriptor.WHERE_MAINMENU,
+	PluginDescriptor.WHERE_PLUGINMENU,
+	PluginDescriptor.WHERE_MOVIELIST,
+	PluginDescriptor.WHERE_MENU,
+	PluginDescriptor.WHERE_EVENTINFO,
+	PluginDescriptor.WHERE_AUDIOMENU,
+	PluginDescriptor.WHERE_TELETEXT,
+	PluginDescriptor.WHERE_FILESCAN,
+	PluginDescriptor.WHERE_VIXMENU,
+))
+
+PLUGIN_CACHE_VERSION = 1
+
+def pluginStamp(path):
+	stamp = [ ]
+	for fn in ('', 'plugin.py', 'plugin.pyc', 'plugin.pyo'):
+		try:
+			stamp.append(os.stat(os.path.join(path, fn)).st_mtime)
+		except OSError:
+			stamp.append(None)
+	return tuple(stamp)
+
+def pluginCacheKey():
+	# descriptors may depend on the plugin settings and on the hardware
+	# (box type, tuners), and are translated
+	from Components.config import config
+	from Components.Language import language
+	values = { }
+	config.flatten_this("config.plugins", config.plugins.saved_value, values)
+	try:
+		nims = open("/proc/bus/nim_sockets").read()
+	except IOError:
+		nims = None
+	return md5(repr((language.getLanguage(), getBoxType(), nims, sorted(values.items())))).hexdigest()
+
+def configEntries():
+	# the names of the config entries two levels down (config.plugins.X)
+	from Components.config import config, ConfigSubsection
+	names = set()
+	for (name, item) in config.content.items.items():
+		names.add(name)
+		if isinstance(item, ConfigSubsection):
+			names.update([name + "." + sub for sub in item.content.items])
+	return names
+
+def describePlugins(plugins):
+	# returns the cacheable data of the descriptors of one plugin, None if
+	# the plugin has to be imported at boot
+	result = [ ]
+	for p in plugins:
+		if not p.where or not LAZY_WHERE.issuperset(p.where):
+			return None
+		if p.wakeupfnc is not None or p._icon is not None:
+			return None
+		try:
+			argnames = p.getArgNames()
+		except TypeError:
+			return None
+		result.append((p.name, p.description, p.where, p.iconstr, p.weight, p.needsRestart, p.internal, argnames))
+	return result
+
+class LazyPluginCall:
+	def __init__(self, component, path, index, argnames):
+		self.component = component
+		self.path = path
+		self.index = index
+		self.argnames = argnames
+		self.fnc = None
+
+	def __call__(self, *args, **kwargs):
+		if self.fnc is None:
+			self.component.loadLazyPlugin(self.path)
+			if self.fnc is None:
+				return None
+		return self.fnc(*args, **kwargs)
+
+	def __eq__(self, other):
+		return isinstance(other, LazyPluginCall) and self.path == other.path and self.index == other.index
+
+	def __ne__(self, other):
+		return not self == other
+
 class PluginComponent:
 	firstRun = True
 	restartRequired = False
@@ -15,6 +108,8 @@ class PluginComponent:
 		self.plugins = {}
 		self.pluginList = [ ]
 		self.installedPluginList = [ ]
+		self.lazyPlugins = {}		# path -> descriptors of not yet imported plugins
+		self.cacheFile = resolveFilename(SCOPE_CONFIG, "plugins.cache")
 		self.setPluginPrefix("Plugins.")
 		self.resetWarnings()
 
@@ -38,9 +133,105 @@ class PluginComponent:
 			if x == PluginDescriptor.WHERE_AUTOSTART:
 				plugin(reason=1)
 
+	def loadPluginCache(self, key):
+		try:
+			f = open(self.cacheFile, "rb")
+			try:
+				version, cachekey, entries = marshal.load(f)
+			finally:
+				f.close()
+			if version == PLUGIN_CACHE_VERSION and cachekey == key:
+				return entries
+		except (IOError, EOFError, ValueError, TypeError):
+			pass
+		return { }
+
+	def savePluginCache(self, key, entries):
+		try:
+			f = open(self.cacheFile + ".writing", "wb")
+			marshal.dump((PLUGIN_CACHE_VERSION, key, entries), f)
+			f.close()
+			os.rename(self.cacheFile + ".writing", self.cacheFile)
+		except (IOError, OSError, ValueError), e:
+			print "[PluginComponent] failed to write", self.cacheFile, e
+
+	def importPlugin(self, c, pluginname, path, added_config = None):
+		try:
+			with profile_span("plugin " + c + "/" + pluginname):
+				name = '.'.join(["Plugins", c, pluginname, "plugin"])
+				if added_config is not None:
+					if name in sys.modules:
+						# imported before, what it adds is unknown
+						added_config.append(name)
+					before = configEntries()
+				plugin = my_import(name)
+				if added_config is not None:
+					added_config.extend(configEntries() - before)
+				plugins = plugin.Plugins(path=path)
+		except Exception, exc:
+			print "Plugin ", c + "/" + pluginname, "failed to load:", exc
+			# supress errors due to missing plugin.py* files (badly removed plugin)
+			for fn in ('plugin.py', 'plugin.pyc', 'plugin.pyo'):
+				if os.path.exists(os.path.join(path, fn)):
+					self.warnings.append( (c + "/" + pluginname, str(exc)) )
+					from traceback import print_exc
+					print_exc()
+					break
+			else:
+				print "Plugin probably removed, but not cleanly in", path
+				print "trying to remove:", path
+				rmtree(path)
+			return None
+
+		# allow single entry not to be a list
+		if not isinstance(plugins, list):
+			plugins = [ plugins ]
+
+		for p in plugins:
+			p.path = path
+			p.updateIcon(path)
+		return plugins
+
+	def readKeymap(self, c, pluginname, path):
+		keymap = os.path.join(path, "keymap.xml")
+		if fileExists(keymap):
+			try:
+				keymapparser.readKeymap(keymap)
+			except Exception, exc:
+				print "keymap for plugin %s/%s failed to load: " % (c, pluginname), exc
+				self.warnings.append( (c + "/" + pluginname, str(exc)) )
+
+	def loadLazyPlugin(self, path):
+		"""imports a plugin which was only known from the plugin cache"""
+		lazy = self.lazyPlugins.pop(path, None)
+		if lazy is None:
+			return
+		c, pluginname = path.split(os.sep)[-2:]
+		profile('plugin ' + pluginname)
+		plugins = self.importPlugin(c, pluginname, path)
+		if plugins is None or len(plugins) != len(lazy):
+			print "Plugin", c + "/" + pluginname, "does not match the plugin cache, removed"
+			for p in lazy:
+				if p in self.pluginList:
+					self.removePlugin(p)
+			try:
+				os.unlink(self.cacheFile)
+			except OSError:
+				pass
+			return
+		self.readKeymap(c, pluginname, path)
+		for (p, real) in zip(lazy, plugins):
+			p.__call__.fnc = real.__call__
+			p.__call__ = real.__call__
+
 	def readPluginList(self, directory):
 		"""enumerates plugins"""
 		new_plugins = []
+		# the plugin cache is only used at boot, a later call (after
+		# installing or removing plugins) imports everything as before
+		key = pluginCacheKey()
+		cache = self.firstRun and self.loadPluginCache(key) or { }
+		entries = { }
 		for c in os.listdir(directory):
 			directory_category = os.path.join(directory, c)
 			if not os.path.isdir(directory_category):
@@ -48,41 +239,37 @@ class PluginComponent:
 			for pluginname in os.listdir(directory_category):
 				path = os.path.join(directory_category, pluginname)
 				if os.path.isdir(path):
+						stamp = pluginStamp(path)
+						cached = cache.get(path)
+						if cached is not None and cached[0] == stamp:
+							lazy = [ ]
+							for index, (name, description, where, icon, weight, needsRestart, internal, argnames) in enumerate(cached[1]):
+								p = PluginDescriptor(name = name, where = list(where), description = description, icon = icon, weight = weight, needsRestart = needsRestart, internal = internal)
+								p.__call__ = LazyPluginCall(self, path, index, argnames)
+								p.updateIcon(path)
+								lazy.append(p)
+							self.lazyPlugins[path] = lazy
+							new_plugins += lazy
+							entries[path] = cached
+							continue
+
 						profile('plugin '+pluginname)
-						try:
-							plugin = my_import('.'.join(["Plugins", c, pluginname, "plugin"]))
-							plugins = plugin.Plugins(path=path)
-						except Exception, exc:
-							print "Plugin ", c + "/" + pluginname, "failed to load:", exc
-							# supress errors due to missing plugin.py* files (badly removed plugin)
-							for fn in ('plugin.py', 'plugin.pyc', 'plugin.pyo'):
-								if os.path.exists(os.path.join(path, fn)):
-									self.warnings.append( (c + "/" + pluginname, str(exc)) )
-									from traceback import print_exc
-									print_exc()
-									break
-							else:
-								print "Plugin probably removed, but not cleanly in", path
-								print "trying to remove:", path
-								rmtree(path)
+						added_config = [ ]
+						plugins = self.importPlugin(c, pluginname, path, added_config)
+						if plugins is None:
 							continue
+						new_plugins += plugins
+						self.lazyPlugins.pop(path, None)
 
-						# allow single entry not to be a list
-						if not isinstance(plugins, list):
-							plugins = [ plugins ]
+						if not added_config:
+							description = describePlugins(plugins)
+							if description is not None:
+								entries[path] = (stamp, description)
 
-						for p in plugins:
-							p.path = path
-							p.updateIcon(path)
-							new_plugins.append(p)
+						self.readKeymap(c, pluginname, path)
 
-						keymap = os.path.join(path, "keymap.xml")
-						if fileExists(keymap):
-							try:
-								keymapparser.readKeymap(keymap)
-							except Exception, exc:
-								print "keymap for plugin %s/%s failed to load: " % (c, pluginname), exc
-								self.warnings.append( (c + "/" + pluginname, str(exc)) )
+		if entries != cache:
+			self.savePluginCache(key, entries)
 
 		# build a diff between the old list of plugins and the new one
 		# internally, the "fnc" argument will be compared with __eq__
@@ -129,7 +316,7 @@ class PluginComponent:
 	def getPluginsForMenu(self, menuid):
 		res = [ ]
 		for p in self.getPlugins(PluginDescriptor.WHERE_MENU):
-			res += p(menuid)
+			res += p(menuid) or [ ]
 		return res
 
 	def clearPluginList(self):
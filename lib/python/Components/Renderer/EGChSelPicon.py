@@ -3,6 +3,7 @@ import os
 from Renderer import Renderer
 from enigma import ePixmap
 from Tools.Directories import fileExists, SCOPE_SKIN_IMAGE, SCOPE_CURRENT_SKIN, resolveFilename
+from Components.PiconIndex import piconIndex
 
 class EGChSelPicon(Renderer):
 	searchPaths = ('/%s/', '/media/usb/%s/', '/media/usb2/%s/', '/media/usb3/%s/', '/media/card/%s/', '/media/cf/%s/', '/etc/%s/', '/usr/share/enigma2/%s/')
@@ -12,6 +13,7 @@ class EGChSelPicon(Renderer):
 		self.path = "picon"
 		self.nameCache = { }
 		self.pngname = ""
+		piconIndex.on_change.append(self.piconsChanged)
 
 	def applySkin(self, desktop, parent):
 		attribs = [ ]
@@ -57,8 +59,16 @@ class EGChSelPicon(Renderer):
 
 
 	def findPicon(self, serviceName):
-		for path in self.searchPaths:
-			pngname = (path % self.path) + serviceName + ".png"
-			if fileExists(pngname):
-				return pngname
-		return ""
+		return piconIndex.find([path % self.path for path in self.searchPaths], serviceName)
+
+	def destroy(self):
+		if self.piconsChanged in piconIndex.on_change:
+			piconIndex.on_change.remove(self.piconsChanged)
+		Renderer.destroy(self)
+
+	def piconsChanged(self, path):
+		if path in [p % self.path for p in self.searchPaths]:
+			# cached names may point to picons that are gone now
+			self.nameCache.clear()
+			if self.source is not None:
+				self.changed((self.CHANGED_DEFAULT,))
@@ -2,6 +2,7 @@
 from Renderer import Renderer
 from enigma import ePixmap, iServiceInformation, iPlayableService, iPlayableServicePtr
 from Tools.Directories import fileExists, SCOPE_SKIN_IMAGE, SCOPE_CURRENT_SKIN, resolveFilename
+from Components.PiconIndex import piconIndex
 import os
 
 class EGPicon(Renderer):
@@ -12,6 +13,7 @@ class EGPicon(Renderer):
 		self.path = "picon"
 		self.nameCache = { }
 		self.pngname = ""
+		piconIndex.on_change.append(self.piconsChanged)
 
 	def getServiceInfoValue(self, info, what, ref=None):
 		v = ref and info.getInfo(ref, what) or info.getInfo(what)
@@ -78,8 +80,16 @@ class EGPicon(Renderer):
 
 			
 	def findPicon(self, serviceName):
-		for path in self.searchPaths:
-			pngname = (path % self.path) + serviceName + ".png"
-			if fileExists(pngname):
-				return pngname
-		return ""
+		return piconIndex.find([path % self.path for path in self.searchPaths], serviceName)
+
+	def destroy(self):
+		if self.piconsChanged in piconIndex.on_change:
+			piconIndex.on_change.remove(self.piconsChanged)
+		Renderer.destroy(self)
+
+	def piconsChanged(self, path):
+		if path in [p % self.path for p in self.searchPaths]:
+			# cached names may point to picons that are gone now
+			self.nameCache.clear()
+			if self.source is not None:
+				self.changed((self.CHANGED_DEFAULT,))
@@ -4,6 +4,7 @@ from enigma import ePixmap
 from Tools.Alternatives import GetWithAlternative
 from Tools.Directories import pathExists, SCOPE_ACTIVE_SKIN, resolveFilename
 from Components.Harddisk import harddiskmanager
+from Components.PiconIndex import piconIndex
 from PIL import Image
 from enigma import getBoxType
 
@@ -25,12 +26,9 @@ def onMountpointAdded(mountpoint):
 			path = os.path.join(mountpoint, 'lcd_picon') + '/'
 		else:
 			path = os.path.join(mountpoint, 'picon') + '/'
-		if os.path.isdir(path) and path not in searchPaths:
-			for fn in os.listdir(path):
-				if fn.endswith('.png'):
-					print "[LcdPicon] adding path:", path
-					searchPaths.append(path)
-					break
+		if path not in searchPaths and piconIndex.hasPicons(path):
+			print "[LcdPicon] adding path:", path
+			searchPaths.append(path)
 	except Exception, ex:
 		print "[LcdPicon] Failed to investigate %s:" % mountpoint, ex
 
@@ -52,32 +50,29 @@ def onPartitionChange(why, part):
 	elif why == 'remove':
 		onMountpointRemoved(part.mountpoint)
 
+def onPiconsChanged(path):
+	global searchPaths
+	# a picon directory that showed up after a mountpoint was added
+	if getBoxType() == 'vuultimo':
+		name = 'lcd_picon'
+	else:
+		name = 'picon'
+	if path not in searchPaths and os.path.basename(path[:-1]) == name and piconIndex.hasPicons(path):
+		print "[LcdPicon] adding path:", path
+		searchPaths.append(path)
+
 def findLcdPicon(serviceName):
 	global lastLcdPiconPath
 	if lastLcdPiconPath is not None:
-		pngname = lastLcdPiconPath + serviceName + ".png"
-		if pathExists(pngname):
-			return pngname
-		else:
-			return ""
+		return piconIndex.lookup(lastLcdPiconPath, serviceName)
 	else:
 		global searchPaths
-		pngname = ""
 		for path in searchPaths:
-			if pathExists(path) and not path.startswith('/media/net'):
-				pngname = path + serviceName + ".png"
-				if pathExists(pngname):
-					lastLcdPiconPath = path
-					break
-			elif pathExists(path):
-				pngname = path + serviceName + ".png"
-				if pathExists(pngname):
-					lastLcdPiconPath = path
-					break
-		if pathExists(pngname):
-			return pngname
-		else:
-			return ""
+			pngname = piconIndex.lookup(path, serviceName)
+			if pngname:
+				lastLcdPiconPath = path
+				return pngname
+		return ""
 
 def getLcdPiconName(serviceName):
 	#remove the path and name fields, and replace ':' by '_'
@@ -126,12 +121,13 @@ class LcdPicon(Renderer):
 					pngname = resolveFilename(SCOPE_ACTIVE_SKIN, "picon_default.png")
 		if os.path.getsize(pngname):
 			self.defaultpngname = pngname
+		piconIndex.on_change.append(self.piconsChanged)
 
 	def addPath(self, value):
-		if pathExists(value):
+		if not value.endswith('/'):
+			value += '/'
+		if piconIndex.exists(value):
 			global searchPaths
-			if not value.endswith('/'):
-				value += '/'
 			if value not in searchPaths:
 				searchPaths.append(value)
 
@@ -167,5 +163,15 @@ class LcdPicon(Renderer):
 					self.instance.hide()
 				self.pngname = pngname
 
+	def destroy(self):
+		if self.piconsChanged in piconIndex.on_change:
+			piconIndex.on_change.remove(self.piconsChanged)
+		Renderer.destroy(self)
+
+	def piconsChanged(self, path):
+		if path in searchPaths and self.source is not None:
+			self.changed((self.CHANGED_DEFAULT,))
+
 harddiskmanager.on_partition_list_change.append(onPartitionChange)
+piconIndex.on_change.append(onPiconsChanged)
 initLcdPiconPaths()
@@ -4,6 +4,7 @@ from enigma import ePixmap
 from Tools.Alternatives import GetWithAlternative
 from Tools.Directories import pathExists, SCOPE_ACTIVE_SKIN, resolveFilename
 from Components.Harddisk import harddiskmanager
+from Components.PiconIndex import piconIndex
 
 searchPaths = []
 lastPiconPath = None
@@ -20,12 +21,9 @@ def onMountpointAdded(mountpoint):
 	global searchPaths
 	try:
 		path = os.path.join(mountpoint, 'picon') + '/'
-		if os.path.isdir(path) and path not in searchPaths:
-			for fn in os.listdir(path):
-				if fn.endswith('.png'):
-					print "[Picon] adding path:", path
-					searchPaths.append(path)
-					break
+		if path not in searchPaths and piconIndex.hasPicons(path):
+			print "[Picon] adding path:", path
+			searchPaths.append(path)
 	except Exception, ex:
 		print "[Picon] Failed to investigate %s:" % mountpoint, ex
 
@@ -44,19 +42,25 @@ def onPartitionChange(why, part):
 	elif why == 'remove':
 		onMountpointRemoved(part.mountpoint)
 
+def onPiconsChanged(path):
+	global searchPaths
+	# a picon directory that showed up after a mountpoint was added
+	if path not in searchPaths and os.path.basename(path[:-1]) == 'picon' and piconIndex.hasPicons(path):
+		print "[Picon] adding path:", path
+		searchPaths.append(path)
+
 def findPicon(serviceName):
 	global lastPiconPath
 	if lastPiconPath is not None:
-		pngname = lastPiconPath + serviceName + ".png"
-		if pathExists(pngname):
+		pngname = piconIndex.lookup(lastPiconPath, serviceName)
+		if pngname:
 			return pngname
 	global searchPaths
 	for path in searchPaths:
-		if pathExists(path):
-			pngname = path + serviceName + ".png"
-			if pathExists(pngname):
-				lastPiconPath = path
-				return pngname
+		pngname = piconIndex.lookup(path, serviceName)
+		if pngname:
+			lastPiconPath = path
+			return pngname
 	return ""
 
 def getPiconName(serviceName):
@@ -84,12 +88,13 @@ class Picon(Renderer):
 				pngname = tmp
 		if os.path.getsize(pngname):
 			self.defaultpngname = pngname
+		piconIndex.on_change.append(self.piconsChanged)
 
 	def addPath(self, value):
-		if pathExists(value):
+		if not value.endswith('/'):
+			value += '/'
+		if piconIndex.exists(value):
 			global searchPaths
-			if not value.endswith('/'):
-				value += '/'
 			if value not in searchPaths:
 				searchPaths.append(value)
 
@@ -120,5 +125,15 @@ class Picon(Renderer):
 					self.instance.hide()
 				self.pngname = pngname
 
+	def destroy(self):
+		if self.piconsChanged in piconIndex.on_change:
+			piconIndex.on_change.remove(self.piconsChanged)
+		Renderer.destroy(self)
+
+	def piconsChanged(self, path):
+		if path in searchPaths and self.source is not None:
+			self.changed((self.CHANGED_DEFAULT,))
+
 harddiskmanager.on_partition_list_change.append(onPartitionChange)
+piconIndex.on_change.append(onPiconsChanged)
 initPiconPaths()
@@ -0,0 +1,155 @@
+import os
+import cPickle
+from collections import OrderedDict
+from time import time
+from enigma import eTimer
+from Components.Harddisk import findMountPoint
+
+# resume points of played files, {service reference: [lru, position, length]}.
+#
+# the points are stored as a snapshot (resumepoints.pkl, the same pickled
+# dict as before) and an append-only log of the changes since the snapshot
+# was written (resumepoints.log), so storing a point does not rewrite all
+# of them. the snapshot is rewritten when the log has grown too big, or
+# when the log was found broken.
+#
+# the points are kept least recently stored first, so the oldest ones are
+# dropped without searching for them when there are too many.
+#
+# points of files which are gone are removed in the background, a few
+# points per timer tick.
+
+class ResumePoints:
+	# rewrite the snapshot when the log holds more records than that
+	MaxLogRecords = 200
+	# points checked per step of the background pruning
+	PruneBatch = 20
+	PruneInterval = 50
+	# minimum time between two prune runs, in seconds
+	PruneEvery = 3600
+
+	def __init__(self, filename = '/etc/enigma2/resumepoints.pkl'):
+		self.filename = filename
+		self.logname = os.path.splitext(filename)[0] + '.log'
+		self.points = OrderedDict()
+		self.log_records = 0
+		self.max_entries = 0		# 0 for no limit
+		self.prune_keys = None
+		self.prune_last = 0
+		self.prune_timer = eTimer()
+		self.prune_timer.callback.append(self.pruneStep)
+		self.load()
+
+	def load(self):
+		# self.points is updated in place, others keep a reference to it
+		points = {}
+		self.log_records = 0
+		broken = False
+		try:
+			f = open(self.filename, 'rb')
+			points = cPickle.load(f)
+			f.close()
+		except Exception, ex:
+			print "[ResumePoints] Failed to load resumepoints:", ex
+		try:
+			f = open(self.logname, 'rb')
+			try:
+				while True:
+					key, value = cPickle.load(f)
+					if value is None:
+						points.pop(key, None)
+					else:
+						points[key] = value
+					self.log_records += 1
+			except EOFError:
+				pass
+			except Exception, ex:
+				# a record cut short by a power failure, ignore the rest
+				print "[ResumePoints] Broken log:", ex
+				broken = True
+			f.close()
+		except IOError:
+			pass
+		self.points.clear()
+		self.points.update(sorted(points.iteritems(), key = lambda item: item[1][0]))
+		if broken:
+			# do not append behind the broken record
+			self.save()
+		return self.points
+
+	def append(self, records):
+		if self.log_records + len(records) > self.MaxLogRecords:
+			self.save()
+			return
+		try:
+			f = open(self.logname, 'ab')
+			for record in records:
+				cPickle.dump(record, f, cPickle.HIGHEST_PROTOCOL)
+			f.close()
+			self.log_records += len(records)
+		except Exception, ex:
+			print "[ResumePoints] Failed to write resumepoints:", ex
+
+	def save(self):
+		# writes a new snapshot and starts a new log
+		try:
+			f = open(self.filename + '.writing', 'wb')
+			cPickle.dump(dict(self.points), f, cPickle.HIGHEST_PROTOCOL)
+			f.close()
+			os.rename(self.filename + '.writing', self.filename)
+			if os.path.exists(self.logname):
+				os.unlink(self.logname)
+			self.log_records = 0
+		except Exception, ex:
+			print "[ResumePoints] Failed to write resumepoints:", ex
+
+	def get(self, key, default = None):
+		return self.points.get(key, default)
+
+	def set(self, key, position, length):
+		entry = [int(time()), position, length]
+		self.points.pop(key, None)
+		self.points[key] = entry
+		records = [(key, entry)]
+		while self.max_entries and len(self.points) > self.max_entries:
+			old = next(iter(self.points))
+			del self.points[old]
+			records.append((old, None))
+		self.append(records)
+		self.startPrune()
+
+	def delete(self, key):
+		if self.points.pop(key, None) is not None:
+			self.append([(key, None)])
+
+	def setMaxEntries(self, max_entries):
+		self.max_entries = max_entries
+
+	def startPrune(self, force = False):
+		if self.prune_keys is None and (force or time() - self.prune_last > self.PruneEvery):
+			self.prune_last = time()
+			self.prune_keys = self.points.keys()
+			self.prune_timer.start(self.PruneInterval, True)
+
+	def pruneStep(self):
+		keys = self.prune_keys
+		if keys is None:
+			return
+		records = []
+		for candidate in keys[-self.PruneBatch:]:
+			if candidate not in self.points:
+				continue
+			filepath = os.path.realpath(candidate.split(':')[-1])
+			mountpoint = findMountPoint(filepath)
+			if os.path.ismount(mountpoint) and not os.path.exists(filepath):
+				del self.points[candidate]
+				records.append((candidate, None))
+		del keys[-self.PruneBatch:]
+		if records:
+			self.append(records)
+		if keys:
+			self.prune_timer.start(self.PruneInterval, True)
+		else:
+			self.prune_keys = None
+
+resumePoints = ResumePoints()
@@ -1,8 +1,14 @@
 from Plugins.Plugin import PluginDescriptor
 from Components.PluginComponent import plugins
 
-from os import path as os_path, walk as os_walk
-from mimetypes import guess_type, add_type
+from Tools.Directories import resolveFilename, SCOPE_CONFIG
+
+from os import path as os_path, listdir, stat, lstat, rename
+from stat import S_ISDIR, S_ISLNK
+from mimetypes import guess_type, add_type, suffix_map, encodings_map
+from threading import Lock
+from time import time
+import marshal
 
 add_type("application/x-debian-package", ".ipk")
 add_type("application/ogg", ".ogg")
@@ -92,7 +98,7 @@ def execute(option):
 	(_, scanner, files, session) = option
 	scanner.open(files, session)
 
-def scanDevice(mountpoint):
+def getScanners():
 	scanner = [ ]
 
 	for p in plugins.getPlugins(PluginDescriptor.WHERE_FILESCAN):
@@ -101,10 +107,9 @@ def scanDevice(mountpoint):
 			l = [l]
 		scanner += l
 
-	print "scanner:", scanner
-
-	res = { }
+	return scanner
 
+def getScanPaths(scanner):
 	# merge all to-be-scanned paths, with priority to
 	# with_subdirs.
 
@@ -116,46 +121,255 @@ def scanDevice(mountpoint):
 
 	# ...then remove with_subdir=False when same path exists
 	# with with_subdirs=True
-	for p in paths_to_scan:
+	for p in list(paths_to_scan):
 		if p.with_subdirs == True and ScanPath(path=p.path) in paths_to_scan:
 			paths_to_scan.remove(ScanPath(path=p.path))
 
-	from Components.Harddisk import harddiskmanager
-	blockdev = mountpoint.rstrip("/").rsplit('/',1)[-1]
-	error, blacklisted, removable, is_cdrom, partitions, medium_found = harddiskmanager.getBlockDevInfo(blockdev)
+	return paths_to_scan
 
-	# now scan the paths
-	for p in paths_to_scan:
-		path = os_path.join(mountpoint, p.path)
+# mimetypes by file extension, guess_type() is only asked once per extension
+extension_types = { }
 
-		for root, dirs, files in os_walk(path):
-			for f in files:
-				path = os_path.join(root, f)
-				if is_cdrom and f.endswith(".wav") and f.startswith("track"):
-					sfile = ScanFile(path,"audio/x-cda")
-				else:
-					sfile = ScanFile(path)
-				for s in scanner:
-					s.handleFile(res, sfile)
+def getTypeCached(path, name):
+	ext = os_path.splitext(name)[1]
+	type = extension_types.get(ext, False)
+	if type is False:
+		lower = ext.lower()
+		if not ext or lower in (".ifo", ".dat") or lower in suffix_map or lower in encodings_map:
+			# these depend on more than the extension
+			return getType(path)
+		type = extension_types[ext] = getType(name)
+	return type
 
-			# if we really don't want to scan subdirs, stop here.
-			if not p.with_subdirs:
-				del dirs[:]
+def deviceId(mountpoint):
+	"""returns the file system uuid of the device mounted on mountpoint, None if it is unknown"""
+	from Components.Harddisk import getProcMounts
+	mountpoint = os_path.normpath(mountpoint)
+	device = None
+	for mount in getProcMounts():
+		if len(mount) > 1 and os_path.normpath(mount[1]) == mountpoint:
+			device = mount[0]
+	if device is None or not device.startswith("/dev/"):
+		return None
+	device = os_path.realpath(device)
+	try:
+		for uuid in listdir("/dev/disk/by-uuid"):
+			if os_path.realpath(os_path.join("/dev/disk/by-uuid", uuid)) == device:
+				return uuid
+	except OSError:
+		pass
+	return None
+
+# the directory listings of the scanned devices, per file system uuid.
+#
+# for every scanned directory, its mtime, its files (with their mimetype)
+# and its subdirectories are kept. on the next scan of the device, a
+# directory whose mtime did not change is not read again, so scanning a
+# replugged device only costs a stat() per directory. the cache is kept in
+# scanner.cache (marshal) in the config directory.
+
+class ScanCache:
+	MAX_DEVICES = 8
+
+	def __init__(self, filename = None):
+		self.filename = filename or resolveFilename(SCOPE_CONFIG, "scanner.cache")
+		self.devices = None		# uuid -> (last use, { relative path -> (mtime, files, subdirs) })
+		self.lock = Lock()
+
+	def get(self, device):
+		self.lock.acquire()
+		try:
+			if self.devices is None:
+				self.load()
+			return self.devices.get(device, (0, { }))[1]
+		finally:
+			self.lock.release()
+
+	def put(self, device, directories):
+		self.lock.acquire()
+		try:
+			if self.devices is None:
+				self.load()
+			self.devices[device] = (time(), directories)
+			if len(self.devices) > self.MAX_DEVICES:
+				oldest = min(self.devices, key = lambda device: self.devices[device][0])
+				del self.devices[oldest]
+			self.save()
+		finally:
+			self.lock.release()
+
+	def load(self):
+		self.devices = { }
+		try:
+			f = open(self.filename, "rb")
+			try:
+				self.devices = marshal.load(f)
+			finally:
+				f.close()
+		except (IOError, EOFError, ValueError, TypeError):
+			pass
+
+	def save(self):
+		try:
+			f = open(self.filename + ".writing", "wb")
+			marshal.dump(self.devices, f)
+			f.close()
+			rename(self.filename + ".writing", self.filename)
+		except (IOError, OSError), e:
+			print "[Scanner] failed to write", self.filename, e
+
+scanCache = ScanCache()
+
+def readDirectory(path, cached, racy):
+	"""returns (mtime, files, subdirs) of a directory, cached if its mtime
+	did not change"""
+	mtime = stat(path).st_mtime
+	if cached is not None and cached[0] == mtime:
+		return cached
+	files = [ ]
+	subdirs = [ ]
+	for name in listdir(path):
+		filename = os_path.join(path, name)
+		try:
+			mode = lstat(filename).st_mode
+		except OSError:
+			continue
+		if S_ISDIR(mode):
+			subdirs.append(name)
+		elif S_ISLNK(mode) and os_path.isdir(filename):
+			# like os.walk, links to directories are not followed
+			continue
+		else:
+			files.append((name, getTypeCached(filename, name)))
+	if mtime >= racy:
+		# changes within the mtime granularity could go unnoticed
+		mtime = None
+	return (mtime, files, subdirs)
+
+class DeviceScan:
+	# how often (in seconds) partial results are reported
+	REPORT_INTERVAL = 0.3
+
+	def __init__(self, mountpoint):
+		self.mountpoint = mountpoint
+		scanner = getScanners()
+		print "scanner:", scanner
+		self.paths_to_scan = getScanPaths(scanner)
+
+		# the scanners interested in a mimetype, so every file is only
+		# offered to those
+		self.generic = [s for s in scanner if s.mimetypes is None]
+		self.buckets = { }
+		for s in scanner:
+			for mimetype in s.mimetypes or [ ]:
+				self.buckets[mimetype] = [x for x in scanner if x.mimetypes is None or mimetype in x.mimetypes]
+
+		from Components.Harddisk import harddiskmanager
+		blockdev = mountpoint.rstrip("/").rsplit('/',1)[-1]
+		error, blacklisted, removable, self.is_cdrom, partitions, medium_found = harddiskmanager.getBlockDevInfo(blockdev)
+
+		self.aborted = False
+		self.callback = None
+		self.partial = None
+		self.res = { }
+
+	def start(self, callback, partial = None):
+		"""scans in a thread. partial(res) is called whenever files were
+		found, callback(res) when the scan is complete."""
+		from twisted.internet import reactor, threads
+		self.callback = callback
+		self.partial = partial
+		report = lambda found: reactor.callFromThread(self.merge, found)
+		threads.deferToThread(self.scan, report).addCallbacks(self.finished, self.failed)
+
+	def abort(self):
+		self.aborted = True
+		self.callback = None
+		self.partial = None
+
+	def run(self):
+		self.scan(self.merge)
+		return self.res
+
+	def merge(self, found):
+		for s, files in found.iteritems():
+			self.res.setdefault(s, []).extend(files)
+		if self.partial is not None:
+			self.partial(self.res)
+
+	def finished(self, result):
+		if self.callback is not None:
+			self.callback(self.res)
+
+	def failed(self, failure):
+		print "[Scanner] scanning", self.mountpoint, "failed:", failure.getErrorMessage()
+		self.finished(None)
+
+	def scan(self, report):
+		device = deviceId(self.mountpoint)
+		if device is not None:
+			cached = scanCache.get(device)
+		else:
+			cached = { }
+		directories = { }
+		racy = time() - 2
+		found = { }
+		reported = time()
+
+		# now scan the paths
+		for p in self.paths_to_scan:
+			todo = [ p.path ]
+			while todo:
+				if self.aborted:
+					return
+				relative = todo.pop()
+				root = os_path.join(self.mountpoint, relative)
+				try:
+					mtime, files, subdirs = directories[relative] = readDirectory(root, cached.get(relative), racy)
+				except OSError:
+					continue
+				for (name, mimetype) in files:
+					self.handleFile(found, os_path.join(root, name), name, mimetype)
+
+				# if we really don't want to scan subdirs, stop here.
+				if p.with_subdirs:
+					todo += [os_path.join(relative, name) for name in reversed(subdirs)]
+
+				if found and time() - reported > self.REPORT_INTERVAL:
+					report(found)
+					found = { }
+					reported = time()
+
+		if found:
+			report(found)
+		if device is not None and directories != cached:
+			scanCache.put(device, directories)
+
+	def handleFile(self, res, path, name, mimetype):
+		if self.is_cdrom and name.endswith(".wav") and name.startswith("track"):
+			mimetype = "audio/x-cda"
+		scanner = self.buckets.get(mimetype, self.generic)
+		if scanner:
+			sfile = ScanFile(path, mimetype, autodetect = False)
+			for s in scanner:
+				s.handleFile(res, sfile)
 
+def scanDevice(mountpoint):
 	# res is a dict with scanner -> [ScanFiles]
-	return res
+	return DeviceScan(mountpoint).run()
+
+def scanDeviceAsync(mountpoint, callback, partial = None):
+	"""like scanDevice, without blocking. returns the DeviceScan, which
+	can be aborted."""
+	scan = DeviceScan(mountpoint)
+	scan.start(callback, partial)
+	return scan
 
 def openList(session, files):
 	if not isinstance(files, list):
 		files = [ files ]
 
-	scanner = [ ]
-
-	for p in plugins.getPlugins(PluginDescriptor.WHERE_FILESCAN):
-		l = p()
-		if not isinstance(l, list):
-			l = [l]
-		scanner += l
+	scanner = getScanners()
 
 	print "scanner:", scanner
 
@@ -0,0 +1,218 @@
+import os
+import mmap
+import struct
+from bisect import bisect_left
+
+# indexed store for the settings, as an alternative to the plain
+# "config.x.y=value" text file.
+#
+# the store consists of two files:
+#   settings.idx      a table of (key offset, key length, value offset,
+#                     value length) entries followed by the key and value
+#                     data. it is mmap()ed, values are only sliced out of
+#                     the map when they are actually used.
+#   settings.journal  "name=value" lines for entries changed since the
+#                     index was written, "-name" lines for removed ones.
+#
+# a save only appends the changed entries to the journal, the index is
+# rewritten when the journal has grown too big.
+#
+# the config tree is not built at load time. a StoredSubtree stands for
+# all entries below a prefix and is only split into its next level when
+# the ConfigSubsection (or list/dict) for it is created.
+
+MAGIC = "E2SI"
+VERSION = 1
+HEADER = struct.Struct("<4sII")
+ENTRY = struct.Struct("<IIII")
+
+class StoredValue(object):
+	__slots__ = ("data", "offset", "length")
+
+	def __init__(self, data, offset, length):
+		self.data = data
+		self.offset = offset
+		self.length = length
+
+	def get(self):
+		return self.data[self.offset:self.offset + self.length]
+
+class StoredSubtree(object):
+	__slots__ = ("store", "prefix")
+
+	def __init__(self, store, prefix):
+		self.store = store
+		self.prefix = prefix
+
+	def keys(self):
+		return self.store.keysBelow(self.prefix)
+
+	def get(self):
+		"""the next level as {name: value or StoredSubtree}"""
+		level = { }
+		start = len(self.prefix) + 1
+		entries = self.store.entries
+		for key in self.keys():
+			name, dot, rest = key[start:].partition('.')
+			if dot:
+				if name not in level:
+					level[name] = StoredSubtree(self.store, key[:start] + name)
+			else:
+				level[name] = entries[key]
+		return level
+
+	def flatten(self, result):
+		entries = self.store.entries
+		for key in self.keys():
+			result[key] = resolveStoredValue(entries[key])
+
+def resolveStoredValue(value):
+	if isinstance(value, (StoredValue, StoredSubtree)):
+		return value.get()
+	return value
+
+class SettingsStore:
+	# rewrite the index when the journal holds more entries than that
+	MaxJournalEntries = 256
+
+	def __init__(self, filename):
+		self.filename = filename
+		self.journalname = os.path.splitext(filename)[0] + ".journal"
+		self.entries = { }
+		self.sorted_keys = None
+		self.journal_entries = 0
+		self.mapped = None
+		self.load()
+
+	def load(self):
+		# a previous map is not closed, values handed out before still
+		# refer to it and keep it alive
+		self.mapped = None
+		self.entries = { }
+		self.sorted_keys = None
+		self.journal_entries = 0
+		if os.path.exists(self.filename) and os.path.getsize(self.filename) >= HEADER.size:
+			f = open(self.filename, "rb")
+			try:
+				self.mapped = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+			finally:
+				f.close()
+			magic, version, count = HEADER.unpack_from(self.mapped, 0)
+			if magic != MAGIC or version != VERSION:
+				self.mapped = None
+				raise ValueError("%s is no settings index" % self.filename)
+			data = HEADER.size + count * ENTRY.size
+			mapped = self.mapped
+			entries = self.entries
+			for i in xrange(count):
+				key_offset, key_length, value_offset, value_length = ENTRY.unpack_from(mapped, HEADER.size + i * ENTRY.size)
+				key_offset += data
+				entries[mapped[key_offset:key_offset + key_length]] = StoredValue(mapped, data + value_offset, value_length)
+		if os.path.exists(self.journalname):
+			f = open(self.journalname, "r")
+			for line in f:
+				line = line.rstrip("\n")
+				if line.startswith("-"):
+					self.entries.pop(line[1:], None)
+				else:
+					result = line.split("=", 1)
+					if len(result) != 2:
+						continue
+					self.entries[result[0]] = result[1]
+				self.journal_entries += 1
+			f.close()
+
+	def items(self):
+		return self.entries.items()
+
+	def keysBelow(self, prefix):
+		"""the sorted keys starting with prefix + '.'"""
+		if self.sorted_keys is None:
+			self.sorted_keys = sorted(self.entries)
+		keys = self.sorted_keys
+		# '/' follows '.'
+		return keys[bisect_left(keys, prefix + '.'):bisect_left(keys, prefix + '/')]
+
+	def get(self, key, default = None):
+		return resolveStoredValue(self.entries.get(key, default))
+
+	# stores the flat {name: value} dict, only writing what changed.
+	# returns True if something changed
+	def save(self, values):
+		lines = [ ]
+		for (key, value) in values.iteritems():
+			old = self.entries.get(key)
+			if old is None or resolveStoredValue(old) != value:
+				if old is None:
+					self.sorted_keys = None
+				self.entries[key] = value
+				lines.append("%s=%s\n" % (key, value))
+		for key in [key for key in self.entries if key not in values]:
+			del self.entries[key]
+			self.sorted_keys = None
+			lines.append("-%s\n" % key)
+		if not lines:
+			return False
+		if self.journal_entries + len(lines) > self.MaxJournalEntries:
+			self.compact()
+			return True
+		try:
+			f = open(self.journalname, "a")
+			f.write(''.join(lines))
+			f.flush()
+			os.fsync(f.fileno())
+			f.close()
+			self.journal_entries += len(lines)
+		except IOError:
+			print "SettingsStore: Couldn't write %s" % self.journalname
+		return True
+
+	# writes all entries into a new index and empties the journal
+	def compact(self):
+		keys = [ ]
+		values = [ ]
+		table = [ ]
+		key_offset = value_offset = 0
+		entries = sorted(self.entries.items())
+		for (key, value) in entries:
+			value = resolveStoredValue(value)
+			keys.append(key)
+			values.append(value)
+			table.append(ENTRY.pack(key_offset, len(key), 0, len(value)))
+			key_offset += len(key)
+		# values follow all keys
+		for i, value in enumerate(values):
+			table[i] = table[i][:8] + struct.pack("<II", key_offset + value_offset, len(value))
+			value_offset += len(value)
+		try:
+			f = open(self.filename + ".writing", "wb")
+			f.write(HEADER.pack(MAGIC, VERSION, len(entries)))
+			f.write(''.join(table))
+			f.write(''.join(keys))
+			f.write(''.join(values))
+			f.flush()
+			os.fsync(f.fileno())
+			f.close()
+			os.rename(self.filename + ".writing", self.filename)
+			if os.path.exists(self.journalname):
+				os.unlink(self.journalname)
+		except (IOError, OSError):
+			print "SettingsStore: Couldn't write %s" % self.filename
+			return
+		self.load()
+
+	# conversion from and to the "config.x.y=value" text format
+	def importText(self, lines):
+		self.entries = { }
+		for l in lines:
+			if not l or l[0] == '#':
+				continue
+			result = l.split('=', 1)
+			if len(result) != 2:
+				continue
+			self.entries[result[0]] = result[1].strip()
+		self.sorted_keys = None
+		self.compact()
+
+	def exportText(self):
+		return ''.join(["%s=%s\n" % (key, resolveStoredValue(value)) for (key, value) in sorted(self.entries.items())])
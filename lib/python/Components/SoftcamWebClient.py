@@ -0,0 +1,164 @@
+from base64 import encodestring
+from hashlib import md5
+from random import random
+from time import time
+from urlparse import urlparse, urlunparse
+from urllib2 import parse_http_list, parse_keqv_list
+from twisted.internet import reactor, defer
+from twisted.web.client import HTTPClientFactory
+from twisted.web import error
+
+# asynchronous client for the web interfaces of the softcams (OScam,
+# CCcam), shared by the info screens.
+#
+# - nothing blocks the main loop, results are delivered by deferreds,
+# - pages are cached for a ttl given per request, so screens polling the
+#   same page (or several screens asking for it) cause one request,
+# - requests for a page which is already being fetched are coalesced,
+# - the parsed model (parser(data)) is cached and shared, not the text,
+# - authentication challenges (digest or basic) are remembered per host,
+#   so only the first request of a session needs the 401 round trip.
+#   credentials are only sent after a challenge (like urllib2 did for
+#   OScam), unless basic is given (CCcam, which always got basic
+#   authentication with the first request).
+#
+# the transport is the HTTP/1.0 client of twisted.web used elsewhere in
+# enigma2, so each request still opens its own connection.
+
+def parseUrl(url):
+	parsed = urlparse(url.strip())
+	host, port = parsed[1], 80
+	username = password = ""
+	if '@' in host:
+		username, host = host.rsplit('@', 1)
+		if ':' in username:
+			username, password = username.split(':', 1)
+	if ':' in host:
+		host, port = host.split(':')
+		port = int(port)
+	path = urlunparse(('', '') + parsed[2:]) or "/"
+	return parsed[0] or "http", host, port, path, username, password
+
+class SoftcamWebClient:
+	def __init__(self, timeout = 10):
+		self.timeout = timeout
+		self.cache = { }		# (url, username, parser) -> (time, result)
+		self.pending = { }		# (url, username, parser) -> [deferred]
+		self.challenges = { }		# (host, port) -> challenge dict
+		self.requestPage = self.requestPageTCP	# replaceable, e.g. for tests
+
+	def getPage(self, url, username = "", password = "", parser = None, ttl = 0, basic = False):
+		"""returns a deferred firing with parser(page) (or the page)"""
+		key = (url, username, parser)
+		cached = self.cache.get(key)
+		if cached is not None and time() - cached[0] < ttl:
+			return defer.succeed(cached[1])
+		d = defer.Deferred()
+		if key in self.pending:
+			self.pending[key].append(d)
+			return d
+		self.pending[key] = [d]
+		self.fetch(url, username, password, basic).addCallbacks(self.gotPage, self.gotError, callbackArgs = (key, parser), errbackArgs = (key,))
+		return d
+
+	def invalidate(self, url = None):
+		if url is None:
+			self.cache.clear()
+		else:
+			for key in [key for key in self.cache if key[0] == url]:
+				del self.cache[key]
+
+	def gotPage(self, data, key, parser):
+		waiting = self.pending.pop(key, [])
+		try:
+			if parser is not None:
+				result = parser(data)
+			else:
+				result = data
+		except Exception, e:
+			for d in waiting:
+				d.errback(e)
+			return
+		self.cache[key] = (time(), result)
+		for d in waiting:
+			d.callback(result)
+
+	def gotError(self, failure, key):
+		for d in self.pending.pop(key, []):
+			d.errback(failure)
+
+	def fetch(self, url, username, password, basic = False, retry = True):
+		scheme, host, port, path, url_username, url_password = parseUrl(url)
+		if not username and url_username:
+			username, password = url_username, url_password
+		url = "%s://%s:%d%s" % (scheme, host, port, path)
+		headers = { }
+		if username:
+			challenge = self.challenges.get((host, port))
+			if challenge is None:
+				if basic:
+					headers["Authorization"] = basicAuthorization(username, password)
+			elif challenge["scheme"] == "basic":
+				headers["Authorization"] = basicAuthorization(username, password)
+			else:
+				headers["Authorization"] = digestAuthorization(challenge, username, password, "GET", path)
+		d = self.requestPage(url, host, port, headers)
+		if username and retry:
+			d.addErrback(self.unauthorized, url, host, port, username, password)
+		return d
+
+	def unauthorized(self, failure, url, host, port, username, password):
+		failure.trap(error.Error)
+		if str(failure.value.status) != "401":
+			return failure
+		challenge = parseChallenge(getattr(failure.value, "response_headers", {}).get("www-authenticate", [""])[0])
+		if challenge is None:
+			return failure
+		self.challenges[(host, port)] = challenge
+		return self.fetch(url, username, password, retry = False)
+
+	def requestPageTCP(self, url, host, port, headers):
+		factory = HTTPClientFactory(url, headers = headers, timeout = self.timeout, agent = "Enigma2")
+		def addResponseHeaders(failure):
+			failure.value.response_headers = getattr(factory, "response_headers", None) or { }
+			return failure
+		reactor.connectTCP(host, port, factory, timeout = self.timeout)
+		return factory.deferred.addErrback(addResponseHeaders)
+
+def basicAuthorization(username, password):
+	return "Basic " + encodestring("%s:%s" % (username, password)).replace("\n", "")
+
+def parseChallenge(header):
+	if not header:
+		return None
+	scheme, sep, rest = header.partition(' ')
+	scheme = scheme.lower()
+	if scheme == "basic":
+		return { "scheme": scheme }
+	if scheme != "digest":
+		return None
+	challenge = parse_keqv_list(parse_http_list(rest))
+	challenge["scheme"] = scheme
+	challenge["nc"] = 0
+	return challenge
+
+def digestAuthorization(challenge, username, password, method, uri):
+	realm = challenge.get("realm", "")
+	nonce = challenge.get("nonce", "")
+	ha1 = md5("%s:%s:%s" % (username, realm, password)).hexdigest()
+	ha2 = md5("%s:%s" % (method, uri)).hexdigest()
+	fields = [ 'username="%s"' % username, 'realm="%s"' % realm, 'nonce="%s"' % nonce, 'uri="%s"' % uri, 'algorithm=MD5' ]
+	if "auth" in challenge.get("qop", "").split(','):
+		challenge["nc"] += 1
+		nc = "%08x" % challenge["nc"]
+		cnonce = md5("%s:%s" % (time(), random())).hexdigest()[:16]
+		response = md5(":".join((ha1, nonce, nc, cnonce, "auth", ha2))).hexdigest()
+		fields += [ 'qop=auth', 'nc=%s' % nc, 'cnonce="%s"' % cnonce ]
+	else:
+		response = md5(":".join((ha1, nonce, ha2))).hexdigest()
+	fields.append('response="%s"' % response)
+	if "opaque" in challenge:
+		fields.append('opaque="%s"' % challenge["opaque"])
+	return "Digest " + ", ".join(fields)
+
+softcamWebClient = SoftcamWebClient()
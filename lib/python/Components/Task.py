@@ -1,10 +1,12 @@
 # A Job consists of many "Tasks".
 # A task is the run of an external tool, with proper methods for failure handling
 
+import os
 from Tools.CList import CList
 
 class Job(object):
 	NOT_STARTED, IN_PROGRESS, FINISHED, FAILED = range(4)
+	PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_HIGH = -10, 0, 10
 	def __init__(self, name):
 		self.tasks = [ ]
 		self.resident_tasks = [ ]
@@ -20,6 +22,9 @@ class Job(object):
 		self.state_changed = CList()
 		self.status = self.NOT_STARTED
 		self.onSuccess = None
+		# scheduling, see JobManager
+		self.priority = self.PRIORITY_NORMAL
+		self.resources = [ "default" ]
 
 	# description is a dict
 	def fromDescription(self, description):
@@ -332,17 +337,41 @@ class ConditionTask(Task):
 		if res:
 			self.finish()
 
-# The jobmanager will execute multiple jobs, each after another.
-# later, it will also support suspending jobs (and continuing them after reboot etc)
+# The jobmanager executes jobs concurrently, as far as the resources they
+# need allow it. every job names its resources (job.resources, e.g.
+# diskResource(path), "network" or "cpu"), the number of jobs using one
+# resource at the same time is limited per resource class (resource_limits,
+# "disk:sda" belongs to the class "disk"). jobs which declare nothing use
+# "default" and run one after another, like before.
+# waiting jobs are started by priority, then in the order they were added.
+# a waiting job reserves a share of its resources, so jobs added later can
+# not take the last free share of a resource it waits for.
 # It also supports a notification when some error occurred, and possibly a retry.
+# while the retry is asked for, the failed job gives back its resources; a
+# retried job waits for them again like a new one.
 class JobManager:
 	def __init__(self):
-		self.active_jobs = [ ]
+		self.active_jobs = [ ]		# waiting jobs, in the order they are started
+		self.running_jobs = [ ]
+		self.retry_jobs = [ ]		# failed jobs, waiting for the answer whether to retry them
+		self.retried_jobs = set()	# the waiting jobs which are continued, not started
 		self.failed_jobs = [ ]
 		self.job_classes = [ ]
 		self.in_background = False
 		self.visible = False
-		self.active_job = None
+		self.visible_jobs = [ ]
+		self.resource_limits = { "default": 1, "disk": 1, "network": 1, "cpu": 2 }
+		self.resource_usage = { }
+		self.job_count = 0
+		self.jobs_changed = CList()	# called when jobs are added, started or finished
+
+	def getActiveJob(self):
+		# the first of the running jobs, for code which expects only one
+		if self.running_jobs:
+			return self.running_jobs[0]
+		return None
+
+	active_job = property(getActiveJob)
 
 	# Set onSuccess to popupTaskView to get a visible notification.
 	# onFail defaults to notifyFailed which tells the user that it went south.
@@ -352,20 +381,85 @@ class JobManager:
 			job.onFail = self.notifyFailed
 		else:
 			job.onFail = onFail
+		self.job_count += 1
+		job.sequence = self.job_count
 		self.active_jobs.append(job)
+		self.active_jobs.sort(key = lambda job: (-getattr(job, "priority", 0), job.sequence))
+		self.jobs_changed()
+		self.kick()
+
+	def getResources(self, job):
+		return set(getattr(job, "resources", None) or [ "default" ])
+
+	def getResourceLimit(self, resource):
+		return self.resource_limits.get(resource.split(':')[0], 1)
+
+	def setResourceLimit(self, resource_class, limit):
+		self.resource_limits[resource_class] = limit
 		self.kick()
 
+	def nextJob(self):
+		reserved = { }
+		for job in self.active_jobs:
+			resources = self.getResources(job)
+			for resource in resources:
+				if self.resource_usage.get(resource, 0) + reserved.get(resource, 0) >= self.getResourceLimit(resource):
+					break
+			else:
+				return job
+			for resource in resources:
+				reserved[resource] = reserved.get(resource, 0) + 1
+		return None
+
+	def getBlockingJobs(self, job):
+		# the jobs a waiting job has to wait for
+		resources = self.getResources(job)
+		result = [ ]
+		for other in self.running_jobs + self.active_jobs:
+			if other is job:
+				break
+			if resources & self.getResources(other):
+				result.append(other)
+		return result
+
 	def kick(self):
-		if self.active_job is None:
-			if self.active_jobs:
-				self.active_job = self.active_jobs.pop(0)
-				self.active_job.start(self.jobDone)
+		while True:
+			job = self.nextJob()
+			if job is None:
+				break
+			self.active_jobs.remove(job)
+			self.running_jobs.append(job)
+			for resource in self.getResources(job):
+				self.resource_usage[resource] = self.resource_usage.get(resource, 0) + 1
+			self.jobs_changed()
+			if job in self.retried_jobs:
+				self.retried_jobs.discard(job)
+				job.retry()
+			else:
+				job.start(self.jobDone)
+
+	def releaseJob(self, job):
+		# a running job gives back its resources
+		self.running_jobs.remove(job)
+		for resource in self.getResources(job):
+			self.resource_usage[resource] -= 1
+
+	def removeJob(self, job):
+		if job in self.running_jobs:
+			self.releaseJob(job)
+		elif job in self.retry_jobs:
+			self.retry_jobs.remove(job)
+		elif job in self.active_jobs:
+			self.active_jobs.remove(job)
+			self.retried_jobs.discard(job)
+		self.jobs_changed()
 
 	def notifyFailed(self, job, task, problems):
 		from Tools import Notifications
+		from Tools.BoundFunction import boundFunction
 		from Screens.MessageBox import MessageBox
 		if problems[0].RECOVERABLE:
-			Notifications.AddNotificationWithCallback(self.errorCB, MessageBox, _("Error: %s\nRetry?") % (problems[0].getErrorMessage(task)))
+			Notifications.AddNotificationWithCallback(boundFunction(self.errorCB, job = job), MessageBox, _("Error: %s\nRetry?") % (problems[0].getErrorMessage(task)))
 			return True
 		else:
 			Notifications.AddNotification(MessageBox, job.name + "\n" + _("Error") + (': %s') % (problems[0].getErrorMessage(task)), type = MessageBox.TYPE_ERROR )
@@ -374,10 +468,15 @@ class JobManager:
 	def jobDone(self, job, task, problems):
 		print "job", job, "completed with", problems, "in", task
 		if problems:
+			if job in self.running_jobs:
+				# other jobs may run while the user is asked whether to retry
+				self.releaseJob(job)
+				self.retry_jobs.append(job)
+				self.kick()
 			if not job.onFail(job, task, problems):
-				self.errorCB(False)
+				self.errorCB(False, job)
 		else:
-			self.active_job = None
+			self.removeJob(job)
 			if job.onSuccess:
 				job.onSuccess(job)
 			self.kick()
@@ -390,22 +489,61 @@ class JobManager:
 			self.visible = True
 			Notifications.AddNotification(JobView, job)
 
-	def errorCB(self, answer):
+	def setVisible(self, job, visible):
+		# several job views may be shown at the same time
+		if visible:
+			self.visible_jobs.append(job)
+		elif job in self.visible_jobs:
+			self.visible_jobs.remove(job)
+		self.visible = len(self.visible_jobs) > 0
+
+	def errorCB(self, answer, job = None):
+		if job is None:
+			job = self.retry_jobs and self.retry_jobs[0] or self.active_job
 		if answer:
 			print "retrying job"
-			self.active_job.retry()
+			if job in self.retry_jobs:
+				# waits for its resources again
+				self.retry_jobs.remove(job)
+				self.retried_jobs.add(job)
+				self.active_jobs.append(job)
+				self.active_jobs.sort(key = lambda job: (-getattr(job, "priority", 0), job.sequence))
+				self.jobs_changed()
+				self.kick()
+			else:
+				job.retry()
 		else:
 			print "not retrying job."
-			self.failed_jobs.append(self.active_job)
-			self.active_job = None
+			self.failed_jobs.append(job)
+			self.removeJob(job)
 			self.kick()
 
 	def getPendingJobs(self):
-		list = [ ]
-		if self.active_job:
-			list.append(self.active_job)
-		list += self.active_jobs
-		return list
+		return self.running_jobs + self.retry_jobs + self.active_jobs
+
+def diskResource(path):
+	"""returns the resource name of the (physical) disk holding path"""
+	path = os.path.realpath(path)
+	while not os.path.ismount(path):
+		path = os.path.dirname(path)
+	device = path
+	try:
+		f = open('/proc/mounts', 'r')
+		for line in f:
+			parts = line.split()
+			if len(parts) > 1 and parts[1] == path:
+				device = parts[0]
+		f.close()
+	except IOError:
+		pass
+	if device.startswith('/dev/'):
+		# partitions share the disk: sda1 -> sda, mmcblk0p1 -> mmcblk0,
+		# nvme0n1p1 -> nvme0n1. the disk of a partition is its parent in sysfs
+		device = os.path.basename(device)
+		sysfs = os.path.realpath('/sys/class/block/' + device)
+		if os.path.exists(os.path.join(sysfs, 'partition')):
+			device = os.path.basename(os.path.dirname(sysfs))
+	return "disk:" + device
 
 # some examples:
 #class PartitionExistsPostcondition:
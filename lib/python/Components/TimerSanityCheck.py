@@ -1,12 +1,146 @@
 import NavigationInstance
+import os
 from time import localtime, mktime, gmtime
 from ServiceReference import ServiceReference
 from enigma import iServiceInformation, eServiceCenter, eServiceReference
 from timer import TimerEntry
+from weakref import WeakKeyDictionary
+from Tools.Directories import resolveFilename, SCOPE_CONFIG
+
+class TimerConflictEngine:
+	# keeps the weekly expansion of repeating timers and the tuner types
+	# of services between conflict checks. timers are re-expanded only when
+	# their begin, end or repeat flags changed since the last check, so
+	# repeated checks of the same timer list (timer editor, EPG, AutoTimer)
+	# only pay for the timer which actually changed. the expansion depends on
+	# the offset of local time, it is dropped when the timezone or the
+	# daylight saving time changed.
+	#
+	# the tuner types depend on the service list, they are forgotten when
+	# lamedb or a bouquet file (service groups) changed, and when there are
+	# more than MaxTunerTypes of them.
+	MaxTunerTypes = 1000
+
+	def __init__(self):
+		self.localtimediff = None
+		self.repeated = WeakKeyDictionary()	# timer -> (signature, first week begin offsets)
+		self.occurrences = WeakKeyDictionary()	# timer -> (signature, expansion key, [(begin, end), ...])
+		self.tunertypes = {}	# service reference string -> tuner types, for services which could not be tuned
+		self.services_stamp = None
+
+	def invalidate(self, timer=None):
+		if timer is None:
+			self.repeated.clear()
+			self.occurrences.clear()
+			self.tunertypes = {}
+		else:
+			self.repeated.pop(timer, None)
+			self.occurrences.pop(timer, None)
+
+	def checkLocaltime(self):
+		localtimediff = 25*3600 - mktime(gmtime(25*3600))
+		if localtimediff != self.localtimediff:
+			self.localtimediff = localtimediff
+			self.repeated.clear()
+			self.occurrences.clear()
+		return localtimediff
+
+	def checkServices(self):
+		# lamedb is rewritten in place, bouquets are replaced (changing the
+		# mtime of the directory)
+		stamp = [ ]
+		for path in (resolveFilename(SCOPE_CONFIG, "lamedb"), resolveFilename(SCOPE_CONFIG)):
+			try:
+				st = os.stat(path)
+				stamp.append((st.st_mtime, st.st_size))
+			except OSError:
+				stamp.append(None)
+		if stamp != self.services_stamp or len(self.tunertypes) > self.MaxTunerTypes:
+			self.services_stamp = stamp
+			self.tunertypes = {}
+
+	def getRepeatedBegins(self, timer):
+		signature = (timer.begin, timer.end, timer.repeated, self.localtimediff)
+		cached = self.repeated.get(timer)
+		if cached is not None and cached[0] == signature:
+			return cached[1]
+		begins = []
+		rflags = timer.repeated
+		rflags = ((rflags & 0x7F)>> 3)|((rflags & 0x07)<<4)
+		if rflags:
+			begin = timer.begin % 86400 # map to first day
+			if (self.localtimediff > 0) and ((begin + self.localtimediff) > 86400):
+				rflags = ((rflags >> 1)& 0x3F)|((rflags << 6)& 0x40)
+			elif (self.localtimediff < 0) and (begin < self.localtimediff):
+				rflags = ((rflags << 1)& 0x7E)|((rflags >> 6)& 0x01)
+			while rflags: # then arrange on the week
+				if rflags & 1:
+					begins.append(begin)
+				begin += 86400
+				rflags >>= 1
+		self.repeated[timer] = (signature, begins)
+		return begins
+
+	def getOccurrences(self, timer, offset_0, weeks, journalize):
+		# journalize: expand over the weeks of the checked interval with
+		# summertime correction, otherwise just map to two plain weeks
+		signature = (timer.begin, timer.end, timer.repeated, self.localtimediff)
+		key = (offset_0, weeks, journalize)
+		cached = self.occurrences.get(timer)
+		if cached is not None and cached[0] == signature and cached[1] == key:
+			return cached[2]
+		result = []
+		duration = timer.end - timer.begin
+		begins = self.getRepeatedBegins(timer)
+		if journalize:
+			begin_hour = localtime(timer.begin).tm_hour
+			for cnt in range(weeks):
+				for begin in begins:
+					new_event_begin = begin + offset_0 + (cnt * 604800)
+					# summertime correction
+					new_event_begin += 3600 * (begin_hour - localtime(new_event_begin).tm_hour)
+					if new_event_begin >= timer.begin: # is the soap already running?
+						result.append((new_event_begin, new_event_begin + duration))
+		else:
+			for cnt in range(weeks):
+				for begin in begins:
+					new_event_begin = begin + offset_0 + (cnt * 604800)
+					result.append((new_event_begin, new_event_begin + duration))
+		self.occurrences[timer] = (signature, key, result)
+		return result
+
+	def getTunerType(self, ref, serviceHandler):
+		# tuner types of a service which could not be tuned, resolved through
+		# the service information (of all alternatives for service groups)
+		refstr = ref.toString()
+		tunerType = self.tunertypes.get(refstr)
+		if tunerType is not None:
+			return tunerType[:]
+
+		def getServiceType(ref): # helper function to get a service type of a service reference
+			serviceInfo = serviceHandler.info(ref)
+			serviceInfo = serviceInfo and serviceInfo.getInfoObject(ref, iServiceInformation.sTransponderData)
+			return serviceInfo and serviceInfo["tuner_type"] or ""
+
+		tunerType = []
+		if ref.flags & eServiceReference.isGroup: # service group ?
+			serviceList = serviceHandler.list(ref) # get all alternative services
+			if serviceList:
+				for ref in serviceList.getContent("R"): # iterate over all group service references
+					type = getServiceType(ref)
+					if not type in tunerType: # just add single time
+						tunerType.append(type)
+		else:
+			tunerType.append(getServiceType(ref))
+		self.tunertypes[refstr] = tunerType
+		return tunerType[:]
+
+conflictEngine = TimerConflictEngine()
 
 class TimerSanityCheck:
-	def __init__(self, timerlist, newtimer=None):
-		self.localtimediff = 25*3600 - mktime(gmtime(25*3600))
+	def __init__(self, timerlist, newtimer=None, engine=None):
+		self.engine = engine or conflictEngine
+		self.localtimediff = self.engine.checkLocaltime()
 		self.timerlist = timerlist
 		self.newtimer = newtimer
 		self.simultimer = []
@@ -59,11 +193,14 @@ class TimerSanityCheck:
 		# count of running timers
 
 		serviceHandler = eServiceCenter.getInstance()
+		self.localtimediff = self.engine.checkLocaltime()
+		self.engine.checkServices()
 # create a list with all start and end times
 # split it into recurring and singleshot timers
 
 ##################################################################################
 # process the new timer
+		engine = self.engine
 		self.rep_eventlist = []
 		self.nrep_eventlist = []
 		if ext_timer != 1:
@@ -71,19 +208,8 @@ class TimerSanityCheck:
 		if (self.newtimer is not None) and (not self.newtimer.disabled):
 			if not self.newtimer.service_ref.ref.valid():
 				return False
-			rflags = self.newtimer.repeated
-			rflags = ((rflags & 0x7F)>> 3)|((rflags & 0x07)<<4)
-			if rflags:
-				begin = self.newtimer.begin % 86400 # map to first day
-				if (self.localtimediff > 0) and ((begin + self.localtimediff) > 86400):
-					rflags = ((rflags >> 1)& 0x3F)|((rflags << 6)& 0x40)
-				elif (self.localtimediff < 0) and (begin < self.localtimediff):
-					rflags = ((rflags << 1)& 0x7E)|((rflags >> 6)& 0x01)
-				while rflags: # then arrange on the week
-					if rflags & 1:
-						self.rep_eventlist.append((begin, -1))
-					begin += 86400
-					rflags >>= 1
+			if self.newtimer.repeated:
+				self.rep_eventlist.append((self.newtimer, -1))
 			else:
 				self.nrep_eventlist.extend([(self.newtimer.begin,self.bflag,-1),(self.newtimer.end,self.eflag,-1)])
 
@@ -93,18 +219,7 @@ class TimerSanityCheck:
 		for timer in self.timerlist:
 			if (timer != self.newtimer) and (not timer.disabled):
 				if timer.repeated:
-					rflags = timer.repeated
-					rflags = ((rflags & 0x7F)>> 3)|((rflags & 0x07)<<4)
-					begin = timer.begin % 86400 # map all to first day
-					if (self.localtimediff > 0) and ((begin + self.localtimediff) > 86400):
-						rflags = ((rflags >> 1)& 0x3F)|((rflags << 6)& 0x40)
-					elif (self.localtimediff < 0) and (begin < self.localtimediff):
-						rflags = ((rflags << 1)& 0x7E)|((rflags >> 6)& 0x01)
-					while rflags:
-						if rflags & 1:
-							self.rep_eventlist.append((begin, idx))
-						begin += 86400
-						rflags >>= 1
+					self.rep_eventlist.append((timer, idx))
 				elif timer.state < TimerEntry.StateEnded:
 					self.nrep_eventlist.extend([(timer.begin,self.bflag,idx),(timer.end,self.eflag,idx)])
 			idx += 1
@@ -118,38 +233,14 @@ class TimerSanityCheck:
 			weeks = (interval_end - offset_0) / 604800
 			if ((interval_end - offset_0) % 604800):
 				weeks += 1
-			for cnt in range(weeks):
-				for event in self.rep_eventlist:
-					if event[1] == -1: # -1 is the identifier of the changed timer
-						event_begin = self.newtimer.begin
-						event_end = self.newtimer.end
-					else:
-						event_begin = self.timerlist[event[1]].begin
-						event_end = self.timerlist[event[1]].end
-					new_event_begin = event[0] + offset_0 + (cnt * 604800)
-					# summertime correction
-					new_lth = localtime(new_event_begin).tm_hour
-					new_event_begin += 3600 * (localtime(event_begin).tm_hour - new_lth)
-					new_event_end = new_event_begin + (event_end - event_begin)
-					if event[1] == -1:
-						if new_event_begin >= self.newtimer.begin: # is the soap already running?
-							self.nrep_eventlist.extend([(new_event_begin, self.bflag, event[1]),(new_event_end, self.eflag, event[1])])
-					else:
-						if new_event_begin >= self.timerlist[event[1]].begin: # is the soap already running?
-							self.nrep_eventlist.extend([(new_event_begin, self.bflag, event[1]),(new_event_end, self.eflag, event[1])])
+			journalize = True
 		else:
 			offset_0 = 345600 # the Epoch begins on Thursday
-			for cnt in (0, 1): # test two weeks to take care of Sunday-Monday transitions
-				for event in self.rep_eventlist:
-					if event[1] == -1: # -1 is the identifier of the changed timer
-						event_begin = self.newtimer.begin
-						event_end = self.newtimer.end
-					else:
-						event_begin = self.timerlist[event[1]].begin
-						event_end = self.timerlist[event[1]].end
-					new_event_begin = event[0] + offset_0 + (cnt * 604800)
-					new_event_end = new_event_begin + (event_end - event_begin)
-					self.nrep_eventlist.extend([(new_event_begin, self.bflag, event[1]),(new_event_end, self.eflag, event[1])])
+			weeks = 2 # test two weeks to take care of Sunday-Monday transitions
+			journalize = False
+		for timer, idx in self.rep_eventlist:
+			for new_event_begin, new_event_end in engine.getOccurrences(timer, offset_0, weeks, journalize):
+				self.nrep_eventlist.extend([(new_event_begin, self.bflag, idx),(new_event_end, self.eflag, idx)])
 
 ################################################################################
 # order list chronological
@@ -181,22 +272,7 @@ class TimerSanityCheck:
 					feinfo = fakeRecService.frontendInfo().getFrontendData()
 					tunerType.append(feinfo.get("tuner_type"))
 				else: # tune failed.. so we must go another way to get service type (DVB-S, DVB-T, DVB-C)
-
-					def getServiceType(ref): # helper function to get a service type of a service reference
-						serviceInfo = serviceHandler.info(ref)
-						serviceInfo = serviceInfo and serviceInfo.getInfoObject(ref, iServiceInformation.sTransponderData)
-						return serviceInfo and serviceInfo["tuner_type"] or ""
-
-					ref = timer.service_ref.ref
-					if ref.flags & eServiceReference.isGroup: # service group ?
-						serviceList = serviceHandler.list(ref) # get all alternative services
-						if serviceList:
-							for ref in serviceList.getContent("R"): # iterate over all group service references
-								type = getServiceType(ref)
-								if not type in tunerType: # just add single time
-									tunerType.append(type)
-					else:
-						tunerType.append(getServiceType(ref))
+					tunerType = engine.getTunerType(timer.service_ref.ref, serviceHandler)
 
 				if event[2] == -1: # new timer
 					newTimerTunerType = tunerType
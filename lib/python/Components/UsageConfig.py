@@ -212,6 +212,31 @@ def InitUsageConfig():
 		setEnableTtCachingOnOff(int(configElement.value))
 	config.usage.enable_tt_caching.addNotifier(EnableTtCachingChanged)
 
+	# keep the settings in the indexed store instead of only the text file
+	from config import configfile
+	config.usage.settings_store = ConfigYesNo(default = configfile.isStoreEnabled())
+	def SettingsStoreChanged(configElement):
+		if configElement.value:
+			configfile.enableStore()
+		else:
+			configfile.disableStore()
+	config.usage.settings_store.addNotifier(SettingsStoreChanged, immediate_feedback = False)
+
+	# memory for decoded pixmaps which are not part of the skin, in MB
+	config.usage.pixmap_cache_size = ConfigSelectionNumber(min = 2, max = 64, stepwidth = 2, default = 8)
+	def PixmapCacheSizeChanged(configElement):
+		from Tools.LoadPixmap import setPixmapCacheBudget
+		setPixmapCacheBudget(int(configElement.value) * 1024 * 1024)
+	config.usage.pixmap_cache_size.addNotifier(PixmapCacheSizeChanged)
+
+	# number of resume points kept, the least recently used ones are dropped.
+	# unlimited by default, as before
+	config.usage.resumepoints_max = ConfigSelection(default = "0", choices = [("0", _("unlimited")), "100", "250", "500", "1000", "2500", "5000"])
+	def ResumePointsMaxChanged(configElement):
+		from Components.ResumePoints import resumePoints
+		resumePoints.setMaxEntries(int(configElement.value))
+	config.usage.resumepoints_max.addNotifier(ResumePointsMaxChanged)
+
 	def TunerTypePriorityOrderChanged(configElement):
 		setTunerTypePriorityOrder(int(configElement.value))
 	config.usage.alternatives_priority.addNotifier(TunerTypePriorityOrderChanged, immediate_feedback=False)
@@ -2,8 +2,10 @@ from enigma import getPrevAsciiCode
 from Tools.NumericalTextInput import NumericalTextInput
 from Tools.Directories import resolveFilename, SCOPE_CONFIG, fileExists
 from Components.Harddisk import harddiskmanager
+from Components.SettingsStore import SettingsStore, StoredSubtree, resolveStoredValue
 from copy import copy as copy_copy
 from os import path as os_path
+import os
 from time import localtime, strftime
 
 # ConfigElement, the base class of all ConfigElements.
@@ -1488,7 +1490,7 @@ class ConfigSubList(list, object):
 		self.stored_values = dict(values)
 		for (key, val) in self.stored_values.items():
 			if int(key) < len(self):
-				self[int(key)].saved_value = val
+				self[int(key)].saved_value = resolveStoredValue(val)
 
 	saved_value = property(getSavedValue, setSavedValue)
 
@@ -1496,7 +1498,7 @@ class ConfigSubList(list, object):
 		i = str(len(self))
 		list.append(self, item)
 		if i in self.stored_values:
-			item.saved_value = self.stored_values[i]
+			item.saved_value = resolveStoredValue(self.stored_values[i])
 			item.load()
 
 	def dict(self):
@@ -1531,14 +1533,14 @@ class ConfigSubDict(dict, object):
 		self.stored_values = dict(values)
 		for (key, val) in self.items():
 			if str(key) in self.stored_values:
-				val.saved_value = self.stored_values[str(key)]
+				val.saved_value = resolveStoredValue(self.stored_values[str(key)])
 
 	saved_value = property(getSavedValue, setSavedValue)
 
 	def __setitem__(self, key, item):
 		dict.__setitem__(self, key, item)
 		if str(key) in self.stored_values:
-			item.saved_value = self.stored_values[str(key)]
+			item.saved_value = resolveStoredValue(self.stored_values[str(key)])
 			item.load()
 
 	def dict(self):
@@ -1570,7 +1572,7 @@ class ConfigSubsection(object):
 		x = content.stored_values.get(name, None)
 		if x is not None:
 			#print "ok, now we have a new item,", name, "and have the following value for it:", x
-			value.saved_value = x
+			value.saved_value = resolveStoredValue(x)
 			value.load()
 
 	def __getattr__(self, name):
@@ -1592,7 +1594,7 @@ class ConfigSubsection(object):
 		for (key, val) in self.content.items.items():
 			value = values.get(key, None)
 			if value is not None:
-				val.saved_value = value
+				val.saved_value = resolveStoredValue(value)
 
 	saved_value = property(getSavedValue, setSavedValue)
 
@@ -1625,8 +1627,13 @@ class Config(ConfigSubsection):
 				self.pickle_this(name, val, result)
 			elif isinstance(val, tuple):
 				result += [name, '=', val[0], '\n']
+			elif isinstance(val, StoredSubtree):
+				flat = { }
+				val.flatten(flat)
+				for (key, value) in flat.items():
+					result += [key, '=', value, '\n']
 			else:
-				result += [name, '=', val, '\n']
+				result += [name, '=', resolveStoredValue(val), '\n']
 
 	def pickle(self):
 		result = []
@@ -1668,10 +1675,33 @@ class Config(ConfigSubsection):
 		if "config" in tree:
 			self.setSavedValue(tree["config"])
 
+	def flatten_this(self, prefix, toflatten, result):
+		for (key, val) in toflatten.items():
+			name = '.'.join((prefix, key))
+			if isinstance(val, dict):
+				self.flatten_this(name, val, result)
+			elif isinstance(val, tuple):
+				result[name] = val[0]
+			elif isinstance(val, StoredSubtree):
+				val.flatten(result)
+			else:
+				result[name] = resolveStoredValue(val)
+
+	# same as unpickle, but only the first level is looked up. every
+	# section is read from the store when it is created, the values stay
+	# in the store until an element asks for them
+	def loadFromStore(self, store):
+		self.setSavedValue(StoredSubtree(store, "config").get())
+
+	# returns True if the store changed
+	def saveToStore(self, store):
+		result = { }
+		self.flatten_this("config", self.saved_value, result)
+		return store.save(result)
+
 	def saveToFile(self, filename):
 		text = self.pickle()
 		try:
-			import os
 			f = open(filename + ".writing", "w")
 			f.write(text)
 			f.flush()
@@ -1689,10 +1719,34 @@ class Config(ConfigSubsection):
 config = Config()
 config.misc = ConfigSubsection()
 
+# the settings are kept in the text file CONFIG_FILE, unless the indexed
+# store (see Components.SettingsStore) has been enabled (by
+# config.usage.settings_store, which calls enableStore()). then a save only
+# appends to the journal of the store, the text file is written by
+# exportText() at shutdown, when the store is disabled, and by everything
+# which reads it directly (backups, plugins) before reading it. afterwards
+# the store is touched, so a text file newer than the store (e.g. a
+# restored backup) is imported on load.
 class ConfigFile:
 	CONFIG_FILE = resolveFilename(SCOPE_CONFIG, "settings")
+	STORE_FILE = resolveFilename(SCOPE_CONFIG, "settings.idx")
+
+	def __init__(self):
+		self.store = None
 
 	def load(self):
+		if fileExists(self.STORE_FILE):
+			try:
+				self.store = SettingsStore(self.STORE_FILE)
+				if fileExists(self.CONFIG_FILE) and os_path.getmtime(self.CONFIG_FILE) > os_path.getmtime(self.STORE_FILE):
+					f = open(self.CONFIG_FILE, "r")
+					self.store.importText(f.readlines())
+					f.close()
+				config.loadFromStore(self.store)
+				return
+			except (IOError, OSError, ValueError), e:
+				print "unable to load config store (%s), using %s..." % (str(e), self.CONFIG_FILE)
+				self.store = None
 		try:
 			config.loadFromFile(self.CONFIG_FILE, True)
 		except IOError, e:
@@ -1700,7 +1754,55 @@ class ConfigFile:
 
 	def save(self):
 #		config.save()
-		config.saveToFile(self.CONFIG_FILE)
+		if self.store is not None:
+			config.saveToStore(self.store)
+		else:
+			config.saveToFile(self.CONFIG_FILE)
+
+	def isStoreEnabled(self):
+		return self.store is not None
+
+	def enableStore(self):
+		if self.store is None:
+			try:
+				self.store = SettingsStore(self.STORE_FILE)
+				self.store.importText(config.pickle().splitlines())
+			except (IOError, OSError, ValueError), e:
+				print "unable to create config store (%s)" % str(e)
+				self.store = None
+
+	# writes the store back into the text file and switches back to it
+	def disableStore(self):
+		if self.store is not None:
+			config.saveToStore(self.store)
+			self.exportText(self.CONFIG_FILE)
+			self.store = None
+			for filename in (self.STORE_FILE, os_path.splitext(self.STORE_FILE)[0] + ".journal"):
+				if fileExists(filename):
+					os.unlink(filename)
+
+	def exportText(self, filename = None):
+		if filename is None:
+			if self.store is None:
+				# the text file is up to date
+				return
+			filename = self.CONFIG_FILE
+		if self.store is not None:
+			text = self.store.exportText()
+		else:
+			text = config.pickle()
+		try:
+			f = open(filename + ".writing", "w")
+			f.write(text)
+			f.flush()
+			os.fsync(f.fileno())
+			f.close()
+			os.rename(filename + ".writing", filename)
+			if self.store is not None:
+				# the store is not older than its own export
+				os.utime(self.STORE_FILE, None)
+		except (IOError, OSError):
+			print "Config: Couldn't write %s" % filename
 
 	def __resolveValue(self, pickles, cmap):
 		key = pickles[0]
@@ -1,12 +1,27 @@
 import os
+import marshal
+from bisect import bisect_left, bisect_right
+from Tools.Directories import resolveFilename, SCOPE_CONFIG
+
+LISTS_DIR = '/var/lib/opkg/lists'
+STATUS_FILES = ('/var/lib/opkg/status', '/usr/lib/opkg/status')
+
+# package fields
+NAME, VERSION, DESCRIPTION, SECTION = range(4)
+
+UNWANTED_SUFFIXES = ('-dev', '-staticdev', '-dbg', '-doc')
 
 def enumFeeds():
-	for fn in os.listdir('/etc/opkg'):
+	try:
+		filenames = os.listdir('/etc/opkg')
+	except OSError:
+		return
+	for fn in filenames:
 		if fn.endswith('-feed.conf'):
-			file = open(os.path.join('/etc/opkg', fn))
-			feedfile = file.readlines()
-			file.close()
 			try:
+				file = open(os.path.join('/etc/opkg', fn))
+				feedfile = file.readlines()
+				file.close()
 				for feed in feedfile:
 					yield feed.split()[1]
 			except IndexError:
@@ -15,37 +30,289 @@ def enumFeeds():
 				pass
 
 def enumPlugins(filter_start=''):
-	for feed in enumFeeds():
-		package = None
+	packageIndex.refresh()
+	for name in packageIndex.startingWith(filter_start):
+		if not name.endswith(UNWANTED_SUFFIXES):
+			package = packageIndex.get(name)
+			yield package[NAME], package[VERSION], package[DESCRIPTION]
+
+def cleanDescription(description):
+	d = description.split(' ',3)
+	if len(d) > 3:
+		# Get rid of annoying "version" and package repeating strings
+		if d[1] == 'version':
+			description = d[3]
+		if description.startswith('gitAUTOINC'):
+			description = description.split(' ',1)[1]
+	return description.strip()
+
+def parseControl(filename, installed_only = False):
+	"""returns the packages [(name, version, description, section)] of a
+	feed list or (installed_only) of the status file"""
+	result = [ ]
+	fields = { }
+	key = None
+	f = open(filename, 'r')
+	try:
+		for line in f:
+			if line[:1] in (' ', '\t'):
+				if key == 'Description':
+					fields[key] += line.rstrip('\n')
+				continue
+			line = line.strip()
+			if line:
+				key, sep, value = line.partition(':')
+				fields[key] = value.strip()
+				continue
+			if 'Package' in fields and (not installed_only or fields.get('Status', '').endswith(' installed')):
+				result.append((fields['Package'], fields.get('Version', ''), cleanDescription(fields.get('Description', '')), fields.get('Section', '')))
+			fields = { }
+			key = None
+		if 'Package' in fields and (not installed_only or fields.get('Status', '').endswith(' installed')):
+			result.append((fields['Package'], fields.get('Version', ''), cleanDescription(fields.get('Description', '')), fields.get('Section', '')))
+	finally:
+		f.close()
+	return result
+
+def fileStamp(path):
+	try:
+		st = os.stat(path)
+		return (st.st_mtime, st.st_size)
+	except OSError:
+		return None
+
+def versionOrder(c):
+	if c.isdigit():
+		return 0
+	if c.isalpha():
+		return ord(c)
+	if c == '~':
+		return -1
+	return ord(c) + 256
+
+def compareFragments(a, b):
+	# the comparison of dpkg/opkg for the upstream version and revision
+	i = j = 0
+	while i < len(a) or j < len(b):
+		first_diff = 0
+		while (i < len(a) and not a[i].isdigit()) or (j < len(b) and not b[j].isdigit()):
+			ac = i < len(a) and versionOrder(a[i]) or 0
+			bc = j < len(b) and versionOrder(b[j]) or 0
+			if ac != bc:
+				return cmp(ac, bc)
+			i += 1
+			j += 1
+		while i < len(a) and a[i] == '0':
+			i += 1
+		while j < len(b) and b[j] == '0':
+			j += 1
+		while i < len(a) and a[i].isdigit() and j < len(b) and b[j].isdigit():
+			if not first_diff:
+				first_diff = cmp(a[i], b[j])
+			i += 1
+			j += 1
+		if i < len(a) and a[i].isdigit():
+			return 1
+		if j < len(b) and b[j].isdigit():
+			return -1
+		if first_diff:
+			return first_diff
+	return 0
+
+def splitVersion(version):
+	epoch, sep, rest = version.partition(':')
+	if not sep:
+		epoch, rest = '0', version
+	upstream, sep, revision = rest.rpartition('-')
+	if not sep:
+		upstream, revision = rest, ''
+	try:
+		epoch = int(epoch)
+	except ValueError:
+		epoch = 0
+	return epoch, upstream, revision
+
+def compareVersions(a, b):
+	"""compares two package versions like opkg does, returns -1, 0 or 1"""
+	a = splitVersion(a)
+	b = splitVersion(b)
+	return cmp(a[0], b[0]) or compareFragments(a[1], b[1]) or compareFragments(a[2], b[2])
+
+# index of the packages in the feeds and of the installed packages.
+#
+# the feed lists and the status file are only parsed again when their
+# mtime (or size) changed, the parsed packages are kept in a compact
+# on-disk index (packages.index, marshal) and survive restarts. queries
+# (by name, prefix, substring, section, installed state) do not touch the
+# file system, refresh() brings the index up to date with a few stats.
+
+class PackageIndex:
+	INDEX_VERSION = 1
+
+	def __init__(self, filename = None):
+		self.filename = filename or resolveFilename(SCOPE_CONFIG, "packages.index")
+		self.sources = { }		# file name -> (stamp, packages)
+		self.order = [ ]		# feed lists (in the order of the feeds), then the status file
+		self.status = None
+		self.loaded = False
+		self.buildIndex()
+
+	def feedFiles(self):
+		return [os.path.join(LISTS_DIR, feed) for feed in enumFeeds()]
+
+	def statusFile(self):
+		for filename in STATUS_FILES:
+			if os.path.exists(filename):
+				return filename
+		return None
+
+	def refresh(self):
+		"""brings the index up to date, returns True if it changed"""
+		if not self.loaded:
+			self.load()
+		status = self.statusFile()
+		order = self.feedFiles()
+		if status is not None:
+			order.append(status)
+		changed = order != self.order or status != self.status
+		for filename in order:
+			stamp = fileStamp(filename)
+			source = self.sources.get(filename)
+			if source is not None and source[0] == stamp:
+				continue
+			changed = True
+			packages = [ ]
+			if stamp is not None:
+				try:
+					packages = parseControl(filename, filename == status)
+				except IOError, e:
+					print "[opkg] failed to read", filename, e
+			self.sources[filename] = (stamp, packages)
+		for filename in self.sources.keys():
+			if filename not in order:
+				del self.sources[filename]
+				changed = True
+		if changed:
+			self.order = order
+			self.status = status
+			self.buildIndex()
+			self.save()
+		return changed
+
+	def buildIndex(self):
+		self.packages = { }		# name -> package (the first feed providing it wins)
+		self.installed = { }		# name -> installed version
+		self.sections = { }		# section -> [names]
+		for filename in self.order:
+			if filename == self.status:
+				for package in self.sources[filename][1]:
+					self.installed[package[NAME]] = package[VERSION]
+			else:
+				for package in self.sources[filename][1]:
+					if package[NAME] not in self.packages:
+						self.packages[package[NAME]] = package
+		self.names = sorted(self.packages)
+		for name in self.names:
+			self.sections.setdefault(self.packages[name][SECTION], [ ]).append(name)
+		# the names, lower case and one per line, for substring searches
+		self.haystack = '\n'.join(self.names).lower()
+		self.offsets = [ ]
+		offset = 0
+		for name in self.names:
+			self.offsets.append(offset)
+			offset += len(name) + 1
+
+	def load(self):
+		self.loaded = True
+		try:
+			f = open(self.filename, 'rb')
+			try:
+				version, order, status, sources = marshal.load(f)
+			finally:
+				f.close()
+		except (IOError, EOFError, ValueError, TypeError):
+			return
+		if version == self.INDEX_VERSION:
+			self.order = order
+			self.status = status
+			self.sources = sources
+			self.buildIndex()
+
+	def save(self):
 		try:
-			for line in open('/var/lib/opkg/lists/%s' % feed, 'r'):
-				if line.startswith('Package:'):
-					package = line.split(":",1)[1].strip()
-					version = ''
-					description = ''
-					if package.startswith(filter_start) and not package.endswith('-dev') and not package.endswith('-staticdev') and not package.endswith('-dbg') and not package.endswith('-doc'):
-						continue
-					package = None
-				if package is None:
-					continue
-				if line.startswith('Version:'):
-					version = line.split(":",1)[1].strip()
-				elif line.startswith('Description:'):
-					description = line.split(":",1)[1].strip()
-				elif description and line.startswith(' '):
-					description += line[:-1]
-				elif len(line) <= 1:
-					d = description.split(' ',3)
-					if len(d) > 3:
-						# Get rid of annoying "version" and package repeating strings
-						if d[1] == 'version':
-							description = d[3]
-						if description.startswith('gitAUTOINC'):
-							description = description.split(' ',1)[1]
-					yield package, version, description.strip()
-					package = None
-		except IOError:
-			pass
+			f = open(self.filename + '.writing', 'wb')
+			marshal.dump((self.INDEX_VERSION, self.order, self.status, self.sources), f)
+			f.close()
+			os.rename(self.filename + '.writing', self.filename)
+		except (IOError, OSError), e:
+			print "[opkg] failed to write", self.filename, e
+
+	def feedAge(self):
+		"""seconds since the oldest feed list was downloaded, None if a
+		feed list is missing"""
+		from time import time
+		stamps = [self.sources.get(filename, (None,))[0] for filename in self.order if filename != self.status]
+		if not stamps or None in stamps:
+			return None
+		return time() - min([stamp[0] for stamp in stamps])
+
+	def get(self, name):
+		return self.packages.get(name)
+
+	def isInstalled(self, name):
+		return name in self.installed
+
+	def installedVersion(self, name):
+		return self.installed.get(name)
+
+	def getState(self, name):
+		"""returns 'installed', 'upgradeable' or 'installable'"""
+		installed = self.installed.get(name)
+		if installed is None:
+			return 'installable'
+		package = self.packages.get(name)
+		if package is not None and compareVersions(package[VERSION], installed) > 0:
+			return 'upgradeable'
+		return 'installed'
+
+	def startingWith(self, prefix):
+		"""names of the packages starting with prefix, sorted"""
+		if not prefix:
+			return self.names[:]
+		return self.names[bisect_left(self.names, prefix):bisect_left(self.names, prefix[:-1] + chr(ord(prefix[-1]) + 1))]
+
+	def search(self, text, descriptions = False):
+		"""names of the packages containing text (case insensitive), sorted"""
+		text = text.lower()
+		if not text:
+			return self.names[:]
+		result = [ ]
+		if '\n' not in text:
+			haystack = self.haystack
+			pos = haystack.find(text)
+			while pos != -1:
+				index = bisect_right(self.offsets, pos) - 1
+				result.append(self.names[index])
+				# continue on the next line
+				if index + 1 < len(self.offsets):
+					pos = haystack.find(text, self.offsets[index + 1])
+				else:
+					pos = -1
+		if descriptions:
+			found = set(result)
+			for name in self.names:
+				if name not in found and text in self.packages[name][DESCRIPTION].lower():
+					result.append(name)
+			result.sort()
+		return result
+
+	def getSections(self):
+		return sorted(self.sections)
+
+	def inSection(self, section):
+		return self.sections.get(section, [ ])
+
+packageIndex = PackageIndex()
 
 if __name__ == '__main__':
 	for p in enumPlugins('enigma'):
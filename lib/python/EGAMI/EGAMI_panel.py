@@ -435,6 +435,7 @@ class EGEnigma2ConfigInfo(Screen):
 	
 	def __fillList(self):
 		self.list = []
+		configfile.exportText()
 		f = open("/etc/enigma2/settings", "r")
 		for line in f.readlines():
 			x=line.strip()
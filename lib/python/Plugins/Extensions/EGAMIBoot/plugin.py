@@ -473,6 +473,9 @@ class EGAMIBootImageInstall(Screen, ConfigListScreen):
 			cmd1 = "python " + pluginpath + '/ex_init.pyo'
 			cmd = '%s %s %s %s' % (cmd1, source, target.lower().replace('.', '_'), str(self.sett.value))
 			print cmd
+			if self.sett.value:
+				# the settings are copied from /etc/enigma2
+				configfile.exportText()
 			self.session.open(Console, _('EgamiBoot: Install new image'), [message, cmd])
 			
 	def cancel(self):
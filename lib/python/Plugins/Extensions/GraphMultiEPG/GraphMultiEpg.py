@@ -10,6 +10,7 @@ from Components.Sources.Event import Event
 from Components.MultiContent import MultiContentEntryText, MultiContentEntryPixmapAlphaTest
 from Components.TimerList import TimerList
 from Components.Renderer.Picon import getPiconName
+from Components.EpgWindowCache import epgWindowCache, mergeRows
 from Components.Sources.ServiceEvent import ServiceEvent
 from Screens.Screen import Screen
 from Screens.HelpMenu import HelpableScreen
@@ -81,6 +82,7 @@ class EPGList(HTMLComponent, GUIComponent):
 				 LoadPixmap(cached=True, path=resolveFilename(SCOPE_CURRENT_SKIN, 'skin_default/icons/epgclock_post.png')) ]
 		self.time_base = None
 		self.time_epoch = time_epoch
+		self.window_key = None	# (time_base, time_epoch) of the rows in the list
 		self.list = None
 		self.select_rect = None
 		self.event_rect = None
@@ -560,40 +562,33 @@ class EPGList(HTMLComponent, GUIComponent):
 			self.time_base = int(stime)
 		if services is None:
 			time_base = self.time_base + self.offs * self.time_epoch * 60
-			test = [ (service[0], 0, time_base, self.time_epoch) for service in self.list ]
+			refs = tuple([service[0] for service in self.list])
 			serviceList = self.list
 			piconIdx = 3
 		else:
 			self.cur_event = None
 			self.cur_service = None
-			test = [ (service.ref.toString(), 0, self.time_base, self.time_epoch) for service in services ]
+			time_base = self.time_base
+			refs = tuple([service.ref.toString() for service in services])
 			serviceList = services
 			piconIdx = 0
 
-		test.insert(0, 'XRnITBD') #return record, service ref, service name, event id, event title, begin time, duration
-		epg_data = [] if self.epgcache is None else self.epgcache.lookupEvent(test)
-		self.list = [ ]
-		tmp_list = None
-		service = ""
-		sname = ""
-
-		serviceIdx = 0
-		for x in epg_data:
-			if service != x[0]:
-				if tmp_list is not None:
-					picon = None if piconIdx == 0 else serviceList[serviceIdx][piconIdx]
-					self.list.append((service, sname, tmp_list[0][0] is not None and tmp_list or None, picon))
-					serviceIdx += 1
-				service = x[0]
-				sname = x[1]
-				tmp_list = [ ]
-			tmp_list.append((x[2], x[3], x[4], x[5])) #(event_id, event_title, begin_time, duration)
-		if tmp_list and len(tmp_list):
-			picon = None if piconIdx == 0 else serviceList[serviceIdx][piconIdx]
-			self.list.append((service, sname, tmp_list[0][0] is not None and tmp_list or None, picon))
-			serviceIdx += 1
-
-		self.l.setList(self.list)
+		rows = epgWindowCache.get(refs, time_base, self.time_epoch)
+		changed = None
+		window_key = (time_base, self.time_epoch)
+		if services is None and window_key == self.window_key:
+			# a refill of the same window, only the rows whose events changed are replaced
+			changed = mergeRows(self.list, rows)
+		self.window_key = window_key
+		if changed is None:
+			if piconIdx == 0:
+				self.list = [ row + (None,) for row in rows ]
+			else:
+				self.list = [ rows[idx] + (serviceList[idx][piconIdx],) for idx in range(len(rows)) ]
+			self.l.setList(self.list)
+		else:
+			for idx in changed:
+				self.l.invalidateEntry(idx)
 		self.findBestEvent()
 
 	def getEventRect(self):
@@ -996,6 +991,7 @@ class GraphMultiEPG(Screen, HelpableScreen):
 		self.session.nav.RecordTimer.removeEntry(timer)
 		self["key_green"].setText(_("Add timer"))
 		self.key_green_choice = self.ADD_TIMER
+		self["list"].l.invalidate() # the timer state is drawn from the timer list
 	
 	def timerAdd(self):
 		cur = self["list"].getCurrent()
@@ -1028,6 +1024,7 @@ class GraphMultiEPG(Screen, HelpableScreen):
 					self.session.openWithCallback(self.finishSanityCorrection, TimerSanityConflict, simulTimerList)
 			self["key_green"].setText(_("Remove timer"))
 			self.key_green_choice = self.REMOVE_TIMER
+			self["list"].l.invalidate() # the timer state is drawn from the timer list
 		else:
 			self["key_green"].setText(_("Add timer"))
 			self.key_green_choice = self.ADD_TIMER
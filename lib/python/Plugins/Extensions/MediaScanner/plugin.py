@@ -1,5 +1,5 @@
 from Plugins.Plugin import PluginDescriptor
-from Components.Scanner import scanDevice
+from Components.Scanner import scanDeviceAsync
 from Screens.InfoBar import InfoBar
 import os
 
@@ -11,29 +11,62 @@ def execute(option):
 	(_, scanner, files, session) = option
 	scanner.open(files, session)
 
+class MediaScan:
+	# the viewers are offered as soon as files for them were found, the
+	# list grows while the rest of the medium is scanned. they keep the
+	# order they were found in, so the selection does not move
+	def __init__(self, description, mountpoint, session):
+		self.mountpoint = mountpoint
+		self.session = session
+		self.choicebox = None
+		self.closed = False
+		self.scanners = [ ]	# in the order they were found
+		print "scanning", mountpoint
+		self.scan = scanDeviceAsync(mountpoint, self.scanFinished, self.scanProgress)
+
+	def getList(self, res):
+		for r in res:
+			if r not in self.scanners:
+				self.scanners.append(r)
+		return [ (r.description, r, res[r], self.session) for r in self.scanners if r in res ]
+
+	def scanProgress(self, res):
+		if self.closed:
+			return
+		if self.choicebox is None:
+			from Screens.ChoiceBox import ChoiceBox
+			self.choicebox = self.session.openWithCallback(self.choiceClosed, ChoiceBox,
+				title = _("The following files were found..."),
+				list = self.getList(res))
+		else:
+			self.choicebox.setList(self.getList(res))
+
+	def scanFinished(self, res):
+		if self.closed:
+			return
+		if self.choicebox is not None:
+			self.choicebox.setList(self.getList(res))
+			return
+		from Screens.MessageBox import MessageBox
+		if os.access(self.mountpoint, os.F_OK|os.R_OK):
+			self.session.open(MessageBox, _("No displayable files on this medium found!"), MessageBox.TYPE_ERROR, simple = True, timeout = 5)
+		else:
+			print "ignore", self.mountpoint, "because its not accessible"
+
+	def choiceClosed(self, option):
+		self.closed = True
+		self.choicebox = None
+		if option is None:
+			# the scan goes on, so its results are cached for the next time
+			return
+		execute(option)
+
 def mountpoint_choosen(option):
 	if option is None:
 		return
 
-	from Screens.ChoiceBox import ChoiceBox
-
-	print "scanning", option
 	(description, mountpoint, session) = option
-	res = scanDevice(mountpoint)
-
-	list = [ (r.description, r, res[r], session) for r in res ]
-
-	if not list:
-		from Screens.MessageBox import MessageBox
-		if os.access(mountpoint, os.F_OK|os.R_OK):
-			session.open(MessageBox, _("No displayable files on this medium found!"), MessageBox.TYPE_ERROR, simple = True, timeout = 5)
-		else:
-			print "ignore", mountpoint, "because its not accessible"
-		return
-
-	session.openWithCallback(execute, ChoiceBox,
-		title = _("The following files were found..."),
-		list = list)
+	MediaScan(description, mountpoint, session)
 
 def scan(session):
 	from Screens.ChoiceBox import ChoiceBox
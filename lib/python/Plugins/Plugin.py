@@ -98,6 +98,14 @@ class PluginDescriptor:
 	def getWakeupTime(self):
 		return self.wakeupfnc and self.wakeupfnc() or -1
 
+	def getArgNames(self):
+		# plugins not imported yet know their arguments from the plugin cache
+		argnames = getattr(self.__call__, "argnames", None)
+		if argnames is not None:
+			return argnames
+		from inspect import getargspec
+		return getargspec(self.__call__)[0]
+
 	@property
 	def icon(self):
 		if self.iconstr:
@@ -66,6 +66,7 @@ class BackupScreen(Screen, ConfigListScreen):
 
 	def doBackup(self):
 		configfile.save()
+		configfile.exportText()
 		try:
 			if (path.exists(self.backuppath) == False):
 				makedirs(self.backuppath)
@@ -27,14 +27,13 @@ from Components.PackageInfo import PackageInfoHandler
 from Components.Language import language
 from Components.AVSwitch import AVSwitch
 from Components.Task import job_manager
+from Components.opkg import packageIndex, VERSION, DESCRIPTION
 from Tools.Directories import pathExists, fileExists, resolveFilename, SCOPE_PLUGINS, SCOPE_CURRENT_PLUGIN, SCOPE_ACTIVE_SKIN, SCOPE_METADIR
 from Tools.LoadPixmap import LoadPixmap
 from Tools.NumericalTextInput import NumericalTextInput
 from enigma import eTimer, RT_HALIGN_LEFT, RT_VALIGN_CENTER, eListboxPythonMultiContent, eListbox, gFont, getDesktop, ePicLoad, eRCInput, getPrevAsciiCode, eEnv, iRecordableService
-from cPickle import dump, load
 from os import path as os_path, system as os_system, unlink, stat, mkdir, popen, makedirs, listdir, access, rename, remove, W_OK, R_OK, F_OK
 from time import time, gmtime, strftime, localtime
-from stat import ST_MTIME
 from datetime import date
 from twisted.web import client
 from twisted.internet import reactor
@@ -57,37 +56,6 @@ config.plugins.softwaremanager.overwriteConfigFiles = ConfigSelection(
 config.plugins.softwaremanager.onSetupMenu = ConfigYesNo(default=False)
 config.plugins.softwaremanager.onBlueButton = ConfigYesNo(default=False)
 
-def write_cache(cache_file, cache_data):
-	#Does a cPickle dump
-	if not os_path.isdir( os_path.dirname(cache_file) ):
-		try:
-			mkdir( os_path.dirname(cache_file) )
-		except OSError:
-			    print os_path.dirname(cache_file), 'is a file'
-	fd = open(cache_file, 'w')
-	dump(cache_data, fd, -1)
-	fd.close()
-
-def valid_cache(cache_file, cache_ttl):
-	#See if the cache file exists and is still living
-	try:
-		mtime = stat(cache_file)[ST_MTIME]
-	except:
-		return 0
-	curr_time = time()
-	if (curr_time - mtime) > cache_ttl:
-		return 0
-	else:
-		return 1
-
-def load_cache(cache_file):
-	#Does a cPickle load
-	fd = open(cache_file)
-	cache_data = load(fd)
-	fd.close()
-	return cache_data
-
-
 class UpdatePluginMenu(Screen):
 	skin = """
 		<screen name="UpdatePluginMenu" position="center,center" size="610,410" >
@@ -1588,14 +1556,9 @@ class PacketManager(Screen, NumericalTextInput):
 		self["key_green"] = StaticText(_("Reload"))
 
 		self.list_updating = True
-		self.packetlist = []
-		self.installed_packetlist = {}
-		self.upgradeable_packages = {}
 		self.Console = Console()
 		self.cmdList = []
-		self.cachelist = []
-		self.cache_ttl = 86400  #600 is default, 0 disables, Seconds cache is considered valid (24h should be ok for caching ipkgs)
-		self.cache_file = eEnv.resolve('${libdir}/enigma2/python/Plugins/SystemPlugins/SoftwareManager/packetmanager.cache') #Path to cache directory
+		self.cache_ttl = 86400  #600 is default, 0 disables, Seconds the downloaded feed lists are considered valid (24h should be ok for caching ipkgs)
 		self.oktext = _("\nAfter pressing OK, please wait!")
 		self.unwanted_extensions = ('-dbg', '-dev', '-doc', '-staticdev', 'busybox')
 
@@ -1646,10 +1609,8 @@ class PacketManager(Screen, NumericalTextInput):
 		self.close()
 
 	def reload(self):
-		if (os_path.exists(self.cache_file) == True):
-			remove(self.cache_file)
-			self.list_updating = True
-			self.rebuildList()
+		self.list_updating = True
+		self.rebuildList(update = True)
 
 	def setWindowTitle(self):
 		self.setTitle(_("Packet manager"))
@@ -1667,16 +1628,16 @@ class PacketManager(Screen, NumericalTextInput):
 				self.statuslist.append(( _("Error"), '', _("An error occurred while downloading the packetlist. Please try again." ),'',statuspng, divpng ))
 				self['list'].setList(self.statuslist)
 
-	def rebuildList(self):
+	def rebuildList(self, update = False):
 		self.setStatus('update')
-		self.inv_cache = 0
-		self.vc = valid_cache(self.cache_file, self.cache_ttl)
-		if self.cache_ttl > 0 and self.vc != 0:
-			try:
-				self.buildPacketList()
-			except:
-				self.inv_cache = 1
-		if self.cache_ttl == 0 or self.inv_cache == 1 or self.vc == 0:
+		# the package index is up to date with the downloaded feed lists,
+		# they are only downloaded again when they are too old
+		packageIndex.refresh()
+		age = packageIndex.feedAge()
+		if not update and self.cache_ttl > 0 and age is not None and age < self.cache_ttl:
+			self.list_updating = False
+			self.buildPacketList()
+		else:
 			self.run = 0
 			self.ipkg.startCmd(IpkgComponent.CMD_UPDATE)
 
@@ -1714,9 +1675,7 @@ class PacketManager(Screen, NumericalTextInput):
 			if cur:
 				item = self['list'].getIndex()
 				self.list[item] = self.buildEntryComponent(cur[0], cur[1], cur[2], 'installable')
-				self.cachelist[item] = [cur[0], cur[1], cur[2], 'installable']
 				self['list'].setList(self.list)
-				write_cache(self.cache_file, self.cachelist)
 				self.reloadPluginlist()
 		if result:
 			self.session.open(TryQuitMainloop,retvalue=3)
@@ -1736,9 +1695,7 @@ class PacketManager(Screen, NumericalTextInput):
 			if cur:
 				item = self['list'].getIndex()
 				self.list[item] = self.buildEntryComponent(cur[0], cur[1], cur[2], 'installed')
-				self.cachelist[item] = [cur[0], cur[1], cur[2], 'installed']
 				self['list'].setList(self.list)
-				write_cache(self.cache_file, self.cachelist)
 				self.reloadPluginlist()
 		if result:
 			self.session.open(TryQuitMainloop,retvalue=3)
@@ -1750,61 +1707,10 @@ class PacketManager(Screen, NumericalTextInput):
 		elif event == IpkgComponent.EVENT_DONE:
 			if self.list_updating:
 				self.list_updating = False
-				if not self.Console:
-					self.Console = Console()
-				cmd = self.ipkg.ipkg + " list"
-				self.Console.ePopen(cmd, self.IpkgList_Finished)
+				packageIndex.refresh()
+				self.buildPacketList()
 		pass
 
-	def IpkgList_Finished(self, result, retval, extra_args = None):
-		result = result.replace('\n ',' - ')
-		if result:
-			self.packetlist = []
-			last_name = ""
-			for x in result.splitlines():
-				tokens = x.split(' - ')
-				name = tokens[0].strip()
-				if not any((name.endswith(x) or name.find('locale') != -1) for x in self.unwanted_extensions):
-					l = len(tokens)
-					version = l > 1 and tokens[1].strip() or ""
-					descr = l > 3 and tokens[3].strip() or l > 2 and tokens[2].strip() or ""
-					if name == last_name:
-						continue
-					last_name = name
-					self.packetlist.append([name, version, descr])
-
-		if not self.Console:
-			self.Console = Console()
-		cmd = self.ipkg.ipkg + " list_installed"
-		self.Console.ePopen(cmd, self.IpkgListInstalled_Finished)
-
-	def IpkgListInstalled_Finished(self, result, retval, extra_args = None):
-		if result:
-			self.installed_packetlist = {}
-			for x in result.splitlines():
-				tokens = x.split(' - ')
-				name = tokens[0].strip()
-				if not any(name.endswith(x) for x in self.unwanted_extensions):
-					l = len(tokens)
-					version = l > 1 and tokens[1].strip() or ""
-					self.installed_packetlist[name] = version
-		if not self.Console:
-			self.Console = Console()
-		cmd = "opkg list-upgradable"
-		self.Console.ePopen(cmd, self.OpkgListUpgradeable_Finished)
-
-	def OpkgListUpgradeable_Finished(self, result, retval, extra_args = None):
-		if result:
-			self.upgradeable_packages = {}
-			for x in result.splitlines():
-				tokens = x.split(' - ')
-				name = tokens[0].strip()
-				if not any(name.endswith(x) for x in self.unwanted_extensions):
-					l = len(tokens)
-					version = l > 2 and tokens[2].strip() or ""
-					self.upgradeable_packages[name] = version
-		self.buildPacketList()
-
 	def buildEntryComponent(self, name, version, description, state):
 		divpng = LoadPixmap(cached=True, path=resolveFilename(SCOPE_ACTIVE_SKIN, "div-h.png"))
 		if not description:
@@ -1821,33 +1727,11 @@ class PacketManager(Screen, NumericalTextInput):
 
 	def buildPacketList(self):
 		self.list = []
-		self.cachelist = []
-		if self.cache_ttl > 0 and self.vc != 0:
-			print 'Loading packagelist cache from ',self.cache_file
-			try:
-				self.cachelist = load_cache(self.cache_file)
-				if len(self.cachelist) > 0:
-					for x in self.cachelist:
-						self.list.append(self.buildEntryComponent(x[0], x[1], x[2], x[3]))
-					self['list'].setList(self.list)
-			except:
-				self.inv_cache = 1
-
-		if self.cache_ttl == 0 or self.inv_cache == 1 or self.vc == 0:
-			print 'rebuilding fresh package list'
-			for x in self.packetlist:
-				status = ""
-				if self.installed_packetlist.has_key(x[0]):
-					if self.upgradeable_packages.has_key(x[0]):
-						status = "upgradeable"
-					else:
-						status = "installed"
-				else:
-					status = "installable"
-				self.list.append(self.buildEntryComponent(x[0], x[1], x[2], status))
-				self.cachelist.append([x[0], x[1], x[2], status])
-			write_cache(self.cache_file, self.cachelist)
-			self['list'].setList(self.list)
+		for name in packageIndex.names:
+			if not any((name.endswith(x) or name.find('locale') != -1) for x in self.unwanted_extensions):
+				package = packageIndex.get(name)
+				self.list.append(self.buildEntryComponent(name, package[VERSION], package[DESCRIPTION], packageIndex.getState(name)))
+		self['list'].setList(self.list)
 
 	def reloadPluginlist(self):
 		plugins.readPluginList(resolveFilename(SCOPE_PLUGINS))
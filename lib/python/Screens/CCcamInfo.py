@@ -1,6 +1,5 @@
 # -*- coding: UTF-8 -*-
 # CCcam Info by AliAbdul
-from base64 import encodestring
 from Components.ActionMap import ActionMap, NumberActionMap
 from Components.config import config, ConfigInteger, ConfigSelection, ConfigSubsection, ConfigText, ConfigYesNo, getConfigListEntry, ConfigNumber
 from Components.ConfigList import ConfigListScreen
@@ -10,6 +9,7 @@ from Components.Language import language
 from Components.MenuList import MenuList
 from Components.MultiContent import MultiContentEntryText, MultiContentEntryPixmapAlphaTest
 from Components.ScrollLabel import ScrollLabel
+from Components.SoftcamWebClient import softcamWebClient
 from Components.Sources.StaticText import StaticText
 from Components.ServiceEventTracker import ServiceEventTracker
 from Screens.HelpMenu import HelpableScreen
@@ -24,9 +24,6 @@ from Screens.Screen import Screen
 from Screens.VirtualKeyBoard import VirtualKeyBoard
 from skin import parseColor
 from Tools.Directories import fileExists, resolveFilename, SCOPE_LANGUAGE, SCOPE_PLUGINS
-from twisted.internet import reactor
-from twisted.web.client import HTTPClientFactory
-from urlparse import urlparse, urlunparse
 import gettext
 
 
@@ -270,51 +267,12 @@ CFG = "/etc/CCcam.cfg"
 
 #############################################################
 
-def _parse(url):
-	url = url.strip()
-	parsed = urlparse(url)
-	scheme = parsed[0]
-	path = urlunparse(('','') + parsed[2:])
+# pages are shared for a few seconds, the info screens ask for the same
+# pages (e.g. /shares) several times in a row
+PAGE_TTL = 5
 
-	host, port = parsed[1], 80
-
-	if '@' in host:
-		username, host = host.split('@')
-		if ':' in username:
-			username, password = username.split(':')
-		else:
-			password = ""
-	else:
-		username = ""
-		password = ""
-
-	if ':' in host:
-		host, port = host.split(':')
-		port = int(port)
-
-	if path == "":
-		path = "/"
-
-	return scheme, host, port, path, username, password
-
-def getPage(url, contextFactory=None, *args, **kwargs):
-	scheme, host, port, path, username, password = _parse(url)
-
-	if username and password:
-		url = scheme + '://' + host + ':' + str(port) + path
-		basicAuth = encodestring("%s:%s" % (username, password))
-		authHeader = "Basic " + basicAuth.strip()
-		AuthHeaders = {"Authorization": authHeader}
-
-		if kwargs.has_key("headers"):
-			kwargs["headers"].update(AuthHeaders)
-		else:
-			kwargs["headers"] = AuthHeaders
-
-	factory = HTTPClientFactory(url, *args, **kwargs)
-	reactor.connectTCP(host, port, factory)
-
-	return factory.deferred
+def getPage(url, ttl = PAGE_TTL):
+	return softcamWebClient.getPage(url, ttl = ttl, basic = True)
 
 #############################################################
 
@@ -6,6 +6,7 @@ import Components.ParentalControl
 from Components.Button import Button
 from Components.config import configfile, config
 from Components.ServiceList import ServiceList
+from Components.ChannelNumbers import channelNumbers
 from Components.ActionMap import NumberActionMap, ActionMap, HelpableActionMap
 from Components.MenuList import MenuList
 from Components.ServiceEventTracker import ServiceEventTracker, InfoBarBase
@@ -580,10 +581,12 @@ class ChannelSelectionEdit:
 				if not mutableList.addService(ref, current):
 					self.servicelist.addService(ref, True)
 					mutableList.flushChanges()
+					channelNumbers.bouquetChanged(self.getRoot())
 					break
 			elif not mutableList.addService(ref):
 				self.servicelist.addService(ref, True)
 				mutableList.flushChanges()
+				channelNumbers.bouquetChanged(self.getRoot())
 				break
 			cnt+=1
 
@@ -603,6 +606,7 @@ class ChannelSelectionEdit:
 			if not mutableBouquet.addService(new_ref.ref, cur_service.ref):
 				mutableBouquet.removeService(cur_service.ref)
 				mutableBouquet.flushChanges()
+				channelNumbers.bouquetChanged(root)
 				eDVBDB.getInstance().reloadBouquets()
 				mutableAlternatives = new_ref.list().startEdit()
 				if mutableAlternatives:
@@ -633,6 +637,7 @@ class ChannelSelectionEdit:
 			new_bouquet_ref = eServiceReference(str)
 			if not mutableBouquetList.addService(new_bouquet_ref):
 				mutableBouquetList.flushChanges()
+				channelNumbers.bouquetChanged(self.bouquet_root)
 				eDVBDB.getInstance().reloadBouquets()
 				mutableBouquet = serviceHandler.list(new_bouquet_ref).startEdit()
 				if mutableBouquet:
@@ -642,6 +647,7 @@ class ChannelSelectionEdit:
 							if mutableBouquet.addService(service):
 								print "add", service.toString(), "to new bouquet failed"
 					mutableBouquet.flushChanges()
+					channelNumbers.bouquetChanged(new_bouquet_ref)
 				else:
 					print "get mutable list for new created bouquet failed"
 				# do some voodoo to check if current_root is equal to bouquet_root
@@ -684,6 +690,7 @@ class ChannelSelectionEdit:
 		self.servicelist.moveUp()
 
 	def removeBouquet(self):
+		channelNumbers.bouquetChanged(self.getCurrentSelection())
 		refstr = self.getCurrentSelection().toString()
 		print "removeBouquet", refstr
 		pos = refstr.find('FROM BOUQUET "')
@@ -742,6 +749,7 @@ class ChannelSelectionEdit:
 				self.mutableList.addService(eServiceReference(x))
 			if changed:
 				self.mutableList.flushChanges()
+				channelNumbers.bouquetChanged(self.getRoot())
 		self.__marked = []
 		self.clearMarks()
 		self.bouquet_mark_edit = OFF
@@ -771,6 +779,7 @@ class ChannelSelectionEdit:
 		if ref.valid() and mutableList is not None:
 			if not mutableList.removeService(ref):
 				mutableList.flushChanges() #FIXME dont flush on each single removed service
+				channelNumbers.bouquetChanged(self.getRoot())
 				self.servicelist.removeCurrent()
 				self.servicelist.resetRoot()
 
@@ -781,6 +790,7 @@ class ChannelSelectionEdit:
 				service = self.servicelist.getCurrent()
 			if not mutableList.addService(service):
 				mutableList.flushChanges()
+				channelNumbers.bouquetChanged(dest)
 				# do some voodoo to check if current_root is equal to dest
 				cur_root = self.getRoot()
 				str1 = cur_root and cur_root.toString() or -1
@@ -798,6 +808,7 @@ class ChannelSelectionEdit:
 			self.movemode = False
 			self.pathChangeDisabled = False # re-enable path change
 			self.mutableList.flushChanges() # FIXME add check if changes was made
+			channelNumbers.bouquetChanged(self.getRoot())
 			self.mutableList = None
 			self.setTitle(self.saved_title)
 			self.saved_title = None
@@ -915,20 +926,11 @@ class ChannelSelectionBase(Screen):
 	def getBouquetNumOffset(self, bouquet):
 		if not config.usage.multibouquet.getValue():
 			return 0
-		str = bouquet.toString()
 		offset = 0
 		if 'userbouquet.' in bouquet.toCompareString():
-			serviceHandler = eServiceCenter.getInstance()
-			servicelist = serviceHandler.list(bouquet)
-			if servicelist is not None:
-				while True:
-					serviceIterator = servicelist.getNext()
-					if not serviceIterator.valid(): #check if end of list
-						break
-					number = serviceIterator.getChannelNum()
-					if number > 0:
-						offset = number - 1
-						break
+			number = channelNumbers.getFirstNumber(bouquet)
+			if number is not None:
+				offset = number - 1
 		return offset
 
 	def recallBouquetMode(self):
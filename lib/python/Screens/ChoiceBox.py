@@ -19,22 +19,10 @@ class ChoiceBox(Screen):
 			self["text"] = Label("")
 		else:
 			self["text"] = Label(title)
-		self.list = []
-		self.summarylist = []
 		if keys is None:
-			self.__keys = [ "1", "2", "3", "4", "5", "6", "7", "8", "9", "0", "red", "green", "yellow", "blue" ] + (len(list) - 10) * [""]
-		else:
-			self.__keys = keys + (len(list) - len(keys)) * [""]
-
-		self.keymap = {}
-		pos = 0
-		for x in list:
-			strpos = str(self.__keys[pos])
-			self.list.append(ChoiceEntryComponent(key = strpos, text = x))
-			if self.__keys[pos] != "":
-				self.keymap[self.__keys[pos]] = list[pos]
-			self.summarylist.append((self.__keys[pos], x[0]))
-			pos += 1
+			keys = [ "1", "2", "3", "4", "5", "6", "7", "8", "9", "0", "red", "green", "yellow", "blue" ]
+		self.choice_keys = keys
+		self.buildList(list)
 		self["list"] = ChoiceList(list = self.list, selection = selection)
 		self["summary_list"] = StaticText()
 		self["summary_selection"] = StaticText()
@@ -62,6 +50,29 @@ class ChoiceBox(Screen):
 			"down": self.down
 		}, -1)
 
+	def buildList(self, list):
+		keys = self.choice_keys + (len(list) - len(self.choice_keys)) * [""]
+		self.list = []
+		self.summarylist = []
+		self.keymap = {}
+		pos = 0
+		for x in list:
+			strpos = str(keys[pos])
+			self.list.append(ChoiceEntryComponent(key = strpos, text = x))
+			if keys[pos] != "":
+				self.keymap[keys[pos]] = list[pos]
+			self.summarylist.append((keys[pos], x[0]))
+			pos += 1
+
+	# replaces the entries, e.g. while they are still being collected
+	def setList(self, list):
+		index = self["list"].l.getCurrentSelectionIndex()
+		self.buildList(list)
+		self["list"].setList(self.list)
+		if index is not None and index < len(self.list):
+			self["list"].moveToIndex(index)
+		self.updateSummary(self["list"].getSelectedIndex())
+
 	def autoResize(self):
 		desktop_w = enigma.getDesktop(0).size().width()
 		desktop_h = enigma.getDesktop(0).size().height()
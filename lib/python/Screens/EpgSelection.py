@@ -2,7 +2,9 @@ from Screen import Screen
 from Screens.HelpMenu import HelpableScreen
 from Components.ActionMap import NumberActionMap, HelpableActionMap, HelpableNumberActionMap
 from Components.Button import Button
+from Components.ChannelNumbers import channelNumbers
 from Components.config import config, configfile, ConfigClock
+from Components.EpgWindowCache import epgWindowCache
 from Components.EpgList import EPGList, TimelineText, EPG_TYPE_SINGLE, EPG_TYPE_SIMILAR, EPG_TYPE_MULTI, EPG_TYPE_ENHANCED, EPG_TYPE_INFOBAR, EPG_TYPE_INFOBARGRAPH, EPG_TYPE_GRAPH, MAX_TIMELINES
 from Components.Label import Label
 from Components.Pixmap import Pixmap
@@ -827,6 +829,7 @@ class EPGSelection(Screen, HelpableScreen):
 		self.session.nav.RecordTimer.removeEntry(timer)
 		self['key_green'].setText(_('Add Timer'))
 		self.key_green_choice = self.ADD_TIMER
+		self.refreshTimerRows()
 
 	def timerAdd(self):
 		cur = self['list'].getCurrent()
@@ -858,6 +861,7 @@ class EPGSelection(Screen, HelpableScreen):
 					self.session.openWithCallback(self.finishSanityCorrection, TimerSanityConflict, simulTimerList)
 			self['key_green'].setText(_('Remove timer'))
 			self.key_green_choice = self.REMOVE_TIMER
+			self.refreshTimerRows()
 		else:
 			self['key_green'].setText(_('Add Timer'))
 			self.key_green_choice = self.ADD_TIMER
@@ -865,6 +869,11 @@ class EPGSelection(Screen, HelpableScreen):
 	def finishSanityCorrection(self, answer):
 		self.finishedAdd(answer)
 
+	def refreshTimerRows(self):
+		# the timer state is drawn from the timer list, the rows stay
+		if self.type == EPG_TYPE_GRAPH or self.type == EPG_TYPE_INFOBARGRAPH:
+			self['list'].l.invalidate()
+
 	def doRecordTimer(self):
 		zap = 0
 		cur = self['list'].getCurrent()
@@ -1025,6 +1034,8 @@ class EPGSelection(Screen, HelpableScreen):
 	def refreshData(self, force = False):
 		self.refreshTimer.stop()
 		if self.type == EPG_TYPE_GRAPH or self.type == EPG_TYPE_INFOBARGRAPH:
+			# the zap brought new epg data, do not show cached windows
+			epgWindowCache.invalidate()
 			self['list'].fillGraphEPG(None, self.ask_time)
 		elif self.type == EPG_TYPE_MULTI:
 			self['list'].fillMultiEPG(self.services, self.ask_time)
@@ -1220,29 +1231,7 @@ class EPGSelection(Screen, HelpableScreen):
 		return None
 
 	def searchNumber(self, number):
-		bouquet = self.servicelist.getRoot()
-		service = None
-		serviceHandler = eServiceCenter.getInstance()
-		service = self.searchNumberHelper(serviceHandler, number, bouquet)
-		if config.usage.multibouquet.getValue():
-			service = self.searchNumberHelper(serviceHandler, number, bouquet)
-			if service is None:
-				bouquet = self.servicelist.bouquet_root
-				bouquetlist = serviceHandler.list(bouquet)
-				if bouquetlist is not None:
-					bouquet = bouquetlist.getNext()
-					while bouquet.valid():
-						if bouquet.flags & eServiceReference.isDirectory:
-							service = self.searchNumberHelper(serviceHandler, number, bouquet)
-							if service is not None:
-								playable = not service.flags & (eServiceReference.isMarker | eServiceReference.isDirectory) or service.flags & eServiceReference.isNumberedMarker
-								if not playable:
-									service = None
-								break
-							if config.usage.alternative_number_mode.getValue():
-								break
-						bouquet = bouquetlist.getNext()
-		return (service, bouquet)
+		return channelNumbers.searchNumber(number, self.servicelist.getRoot(), self.servicelist.bouquet_root)
 
 	def zapToNumber(self, service, bouquet):
 		if service is not None:
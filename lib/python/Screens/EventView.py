@@ -38,7 +38,7 @@ class EventViewContextMenu(Screen):
 
 		for p in plugins.getPlugins(PluginDescriptor.WHERE_EVENTINFO):
 			#only list service or event specific eventinfo plugins here, no servelist plugins
-			if 'servicelist' not in p.__call__.func_code.co_varnames:
+			if 'servicelist' not in p.getArgNames():
 				menu.append((p.name, boundFunction(self.runPlugin, p)))
 
 		self["menu"] = MenuList(menu)
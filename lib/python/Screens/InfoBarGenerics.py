@@ -3,7 +3,9 @@ from Screens.ChannelSelection import ChannelSelection, BouquetSelector, SilentBo
 
 from Components.ActionMap import ActionMap, HelpableActionMap
 from Components.ActionMap import NumberActionMap
-from Components.Harddisk import harddiskmanager, findMountPoint
+from Components.Harddisk import harddiskmanager
+from Components.ChannelNumbers import channelNumbers
+from Components.ResumePoints import resumePoints
 from Components.Input import Input
 from Components.Label import Label
 from Components.PluginComponent import plugins
@@ -13,7 +15,7 @@ from Components.Sources.List import List
 from Components.config import config, configfile, ConfigBoolean, ConfigClock
 from Components.SystemInfo import SystemInfo
 from Components.UsageConfig import preferredInstantRecordPath, defaultMoviePath, preferredTimerPath, ConfigSelection
-from Components.Task import Task, Job, job_manager as JobManager
+from Components.Task import Task, Job, job_manager as JobManager, diskResource
 from Components.Pixmap import MovingPixmap, MultiPixmap
 from Components.Sources.StaticText import StaticText
 from Components.ScrollLabel import ScrollLabel
@@ -43,6 +45,7 @@ from Screens.TimerEntry import TimerEntry as TimerEntry_TimerEntry
 from timer import TimerEntry
 
 from Tools import Directories, ASCIItranslit, Notifications
+from Tools.CopyFiles import FileTransferTask
 
 from enigma import getBoxType, eBackgroundFileEraser, eTimer, eServiceCenter, eDVBServicePMTHandler, iServiceInformation, iPlayableService, eServiceReference, eEPGCache, eActionMap, getBoxType
 
@@ -51,7 +54,7 @@ from bisect import insort
 from random import randint
 from sys import maxint
 
-import os, cPickle
+import os
 
 # hack alert!
 from Screens.Menu import MainMenu, Menu, mdom
@@ -75,29 +78,19 @@ def setResumePoint(session):
 			pos = seek.getPlayPosition()
 			if not pos[0]:
 				key = ref.toString()
-				lru = int(time())
 				l = seek.getLength()
 				if l:
 					l = l[1]
 				else:
 					l = None
-				resumePointCache[key] = [lru, pos[1], l]
-				for k, v in resumePointCache.items():
-					if v[0] < lru:
-						candidate = k
-						filepath = os.path.realpath(candidate.split(':')[-1])
-						mountpoint = findMountPoint(filepath)
-						if os.path.ismount(mountpoint) and not os.path.exists(filepath):
-							del resumePointCache[candidate]
-				saveResumePoints()
+				# missing files are pruned in the background
+				resumePoints.set(key, pos[1], l)
+				resumePointCacheLast = int(time())
 
 def delResumePoint(ref):
 	global resumePointCache, resumePointCacheLast
-	try:
-		del resumePointCache[ref.toString()]
-	except KeyError:
-		pass
-	saveResumePoints()
+	resumePoints.delete(ref.toString())
+	resumePointCacheLast = int(time())
 
 def getResumePoint(session):
 	global resumePointCache
@@ -112,29 +105,17 @@ def getResumePoint(session):
 
 def saveResumePoints():
 	global resumePointCache, resumePointCacheLast
-	try:
-		f = open('/etc/enigma2/resumepoints.pkl', 'wb')
-		cPickle.dump(resumePointCache, f, cPickle.HIGHEST_PROTOCOL)
-		f.close()
-	except Exception, ex:
-		print "[InfoBar] Failed to write resumepoints:", ex
+	resumePoints.save()
 	resumePointCacheLast = int(time())
 
 def loadResumePoints():
-	try:
-		file = open('/etc/enigma2/resumepoints.pkl', 'rb')
-		PickleFile = cPickle.load(file)
-		file.close()
-		return PickleFile
-	except Exception, ex:
-		print "[InfoBar] Failed to load resumepoints:", ex
-		return {}
+	return resumePoints.load()
 
 def updateresumePointCache():
 	global resumePointCache
-	resumePointCache = loadResumePoints()
+	resumePointCache = resumePoints.points
 	
-resumePointCache = loadResumePoints()
+resumePointCache = resumePoints.points
 resumePointCacheLast = int(time())
 
 class InfoBarDish:
@@ -494,28 +475,7 @@ class InfoBarNumberZap:
 		return None
 
 	def searchNumber(self, number, firstBouquetOnly = False):
-		bouquet = self.servicelist.getRoot()
-		service = None
-		serviceHandler = eServiceCenter.getInstance()
-		if not firstBouquetOnly:
-			service = self.searchNumberHelper(serviceHandler, number, bouquet)
-		if config.usage.multibouquet.value and not service:
-			bouquet = self.servicelist.bouquet_root
-			bouquetlist = serviceHandler.list(bouquet)
-			if bouquetlist:
-				bouquet = bouquetlist.getNext()
-				while bouquet.valid():
-					if bouquet.flags & eServiceReference.isDirectory:
-						service = self.searchNumberHelper(serviceHandler, number, bouquet)
-						if service:
-							playable = not (service.flags & (eServiceReference.isMarker|eServiceReference.isDirectory)) or (service.flags & eServiceReference.isNumberedMarker)
-							if not playable:
-								service = None
-							break
-						if config.usage.alternative_number_mode.getValue() or firstBouquetOnly:
-							break
-					bouquet = bouquetlist.getNext()
-		return service, bouquet
+		return channelNumbers.searchNumber(number, self.servicelist.getRoot(), self.servicelist.bouquet_root, firstBouquetOnly)
 
 	def selectAndStartService(self, service, bouquet):
 		if service:
@@ -2641,7 +2601,7 @@ class InfoBarTimeshift:
 						else:
 							eventname = ""
 
-						JobManager.AddJob(CopyTimeshiftJob(self, "mv \"%s%s.copy\" \"%s.ts\"" % (config.usage.timeshift_path.getValue(),copy_file,fullname), copy_file, fullname, eventname))
+						JobManager.AddJob(CopyTimeshiftJob(self, copy_file, fullname, eventname))
 						if not Screens.Standby.inTryQuitMainloop and not Screens.Standby.inStandby and not mergelater and self.save_timeshift_postaction != "standby":
 							Notifications.AddNotification(MessageBox, _("Saving timeshift as movie now. This might take a while!"), MessageBox.TYPE_INFO, timeout=5)
 					else:
@@ -2836,7 +2796,7 @@ class InfoBarTimeshift:
 							self.BgFileEraser.erase("%s%s.sc" % (config.usage.default_path.getValue(), ptsmergeDEST))
 
 						# Add Merge Job to JobManager
-						JobManager.AddJob(MergeTimeshiftJob(self, "cat \"%s%s\" >> \"%s%s\"" % (config.usage.default_path.getValue(),ptsmergeSRC,config.usage.default_path.getValue(),ptsmergeDEST), ptsmergeSRC, ptsmergeDEST, eventname))
+						JobManager.AddJob(MergeTimeshiftJob(self, ptsmergeSRC, ptsmergeDEST, eventname))
 						config.timeshift.isRecording.value = True
 						ptsfilemerged = True
 					else:
@@ -3447,7 +3407,6 @@ class InfoBarExtensions:
 					self.session.open(MessageBox, _("The MediaPlayer plugin is not installed!\nPlease install it."), type = MessageBox.TYPE_INFO,timeout = 10 )
 
 from Tools.BoundFunction import boundFunction
-import inspect
 
 # depends on InfoBarExtensions
 
@@ -3461,7 +3420,7 @@ class InfoBarPlugins:
 	def getPluginList(self):
 		l = []
 		for p in plugins.getPlugins(where = PluginDescriptor.WHERE_EXTENSIONSMENU):
-			args = inspect.getargspec(p.__call__)[0]
+			args = p.getArgNames()
 			if len(args) == 1 or len(args) == 2 and isinstance(self, InfoBarChannelSelection):
 				l.append(((boundFunction(self.getPluginName, p.name), boundFunction(self.runPlugin, p), lambda: True), None, p.name))
 		l.sort(key = lambda e: e[2]) # sort by name
@@ -4526,39 +4485,23 @@ class InfoBarZoom:
 ###################################
 
 class CopyTimeshiftJob(Job):
-	def __init__(self, toolbox, cmdline, srcfile, destfile, eventname):
+	def __init__(self, toolbox, srcfile, destfile, eventname):
 		Job.__init__(self, _("Saving Timeshift files"))
 		self.toolbox = toolbox
-		AddCopyTimeshiftTask(self, cmdline, srcfile, destfile, eventname)
+		self.resources = [ diskResource(config.usage.timeshift_path.getValue()), diskResource(destfile) ]
+		AddCopyTimeshiftTask(self, srcfile, destfile, eventname)
 
-class AddCopyTimeshiftTask(Task):
-	def __init__(self, job, cmdline, srcfile, destfile, eventname):
-		Task.__init__(self, job, eventname)
+class AddCopyTimeshiftTask(FileTransferTask):
+	def __init__(self, job, srcfile, destfile, eventname):
+		FileTransferTask.__init__(self, job, eventname, "move", config.usage.timeshift_path.getValue() + srcfile + ".copy", destfile + ".ts")
 		self.toolbox = job.toolbox
-		self.setCmdline(cmdline)
-		self.srcfile = config.usage.timeshift_path.getValue() + srcfile + ".copy"
-		self.destfile = destfile + ".ts"
-
-		self.ProgressTimer = eTimer()
-		self.ProgressTimer.callback.append(self.ProgressUpdate)
-
-	def ProgressUpdate(self):
-		if self.srcsize <= 0 or not Directories.fileExists(self.destfile, 'r'):
-			return
-
-		self.setProgress(int((os.path.getsize(self.destfile)/float(self.srcsize))*100))
-		self.ProgressTimer.start(15000, True)
 
 	def prepare(self):
-		if Directories.fileExists(self.srcfile, 'r'):
-			self.srcsize = os.path.getsize(self.srcfile)
-			self.ProgressTimer.start(15000, True)
-
+		FileTransferTask.prepare(self)
 		self.toolbox.ptsFrontpanelActions("start")
 
 	def afterRun(self):
-		self.setProgress(100)
-		self.ProgressTimer.stop()
+		self.setProgress(self.end)
 		self.toolbox.ptsCopyFilefinished(self.srcfile, self.destfile)
 		config.timeshift.isRecording.value = True
 
@@ -4567,41 +4510,23 @@ class AddCopyTimeshiftTask(Task):
 ###################################
 
 class MergeTimeshiftJob(Job):
-	def __init__(self, toolbox, cmdline, srcfile, destfile, eventname):
+	def __init__(self, toolbox, srcfile, destfile, eventname):
 		Job.__init__(self, _("Merging Timeshift files"))
 		self.toolbox = toolbox
-		AddMergeTimeshiftTask(self, cmdline, srcfile, destfile, eventname)
+		self.resources = [ diskResource(config.usage.default_path.getValue()) ]
+		AddMergeTimeshiftTask(self, srcfile, destfile, eventname)
 
-class AddMergeTimeshiftTask(Task):
-	def __init__(self, job, cmdline, srcfile, destfile, eventname):
-		Task.__init__(self, job, eventname)
+class AddMergeTimeshiftTask(FileTransferTask):
+	def __init__(self, job, srcfile, destfile, eventname):
+		FileTransferTask.__init__(self, job, eventname, "append", config.usage.default_path.getValue() + srcfile, config.usage.default_path.getValue() + destfile)
 		self.toolbox = job.toolbox
-		self.setCmdline(cmdline)
-		self.srcfile = config.usage.default_path.getValue() + srcfile
-		self.destfile = config.usage.default_path.getValue() + destfile
-
-		self.ProgressTimer = eTimer()
-		self.ProgressTimer.callback.append(self.ProgressUpdate)
-
-	def ProgressUpdate(self):
-		if self.srcsize <= 0 or not Directories.fileExists(self.destfile, 'r'):
-			return
-
-		self.setProgress(int((os.path.getsize(self.destfile)/float(self.srcsize))*100))
-		self.ProgressTimer.start(7500, True)
 
 	def prepare(self):
-		if Directories.fileExists(self.srcfile, 'r') and Directories.fileExists(self.destfile, 'r'):
-			fsize1 = os.path.getsize(self.srcfile)
-			fsize2 = os.path.getsize(self.destfile)
-			self.srcsize = fsize1 + fsize2
-			self.ProgressTimer.start(7500, True)
-
+		FileTransferTask.prepare(self)
 		self.toolbox.ptsFrontpanelActions("start")
 
 	def afterRun(self):
-		self.setProgress(100)
-		self.ProgressTimer.stop()
+		self.setProgress(self.end)
 		config.timeshift.isRecording.value = True
 		self.toolbox.ptsMergeFilefinished(self.srcfile, self.destfile)
 
@@ -4613,6 +4538,7 @@ class CreateAPSCFilesJob(Job):
 	def __init__(self, toolbox, cmdline, eventname):
 		Job.__init__(self, _("Creating AP and SC Files"))
 		self.toolbox = toolbox
+		self.resources = [ diskResource(config.usage.default_path.getValue()) ]
 		CreateAPSCFilesTask(self, cmdline, eventname)
 
 class CreateAPSCFilesTask(Task):
@@ -16,7 +16,9 @@ from xml.etree import ElementTree
 
 from operator import itemgetter
 import os, time
-import urllib2
+
+from Components.SoftcamWebClient import softcamWebClient
+from twisted.internet import defer
 
 fb = getDesktop(0).size()
 if fb.width() > 1024:
@@ -27,6 +29,31 @@ else:
 	sizeH = 700
 	HDSKIN = False
 
+# time in seconds the pages of the web interface are cached
+STATUS_TTL = 2
+ENTITLEMENT_TTL = 30
+READERSTATS_TTL = 10
+
+oscam_conf = None
+
+class WebIFError(Exception):
+	pass
+
+def parseXML(data):
+	return ElementTree.XML(data)
+
+def parseLog(data):
+	if "<![CDATA" not in data:
+		data = data.replace("<log>", "<log><![CDATA[").replace("</log>", "]]></log>")
+	return ElementTree.XML(data)
+
+def errorText(failure):
+	return str(failure.getErrorMessage())
+
+def screenClosed(screen):
+	# requests may finish after their screen has been closed
+	return not screen.__dict__.has_key("session")
+
 class OscamInfo:
 	TYPE = 0
 	NAME = 1
@@ -42,14 +69,19 @@ class OscamInfo:
 	version = ""
 
 	def confPath(self):
+		# searching the file systems takes a while, remember the result
+		global oscam_conf
+		if oscam_conf is not None and os.path.exists(oscam_conf):
+			return oscam_conf
 		search_dirs = [ "/usr", "/var", "/etc" ]
 		sdirs = " ".join(search_dirs)
 		cmd = 'find %s -name "oscam.conf"' % sdirs
 		res = os.popen(cmd).read()
 		if res == "":
-			return None
+			oscam_conf = None
 		else:
-			return res.replace("\n", "")
+			oscam_conf = res.replace("\n", "")
+		return oscam_conf
 
 
 	def getUserData(self):
@@ -91,7 +123,7 @@ class OscamInfo:
 		else:
 			return _("file oscam.conf could not be found")
 
-	def openWebIF(self, part = None, reader = None):
+	def getWebIFUrl(self, part = None, reader = None):
 		if config.oscaminfo.userdatafromconf.getValue():
 			self.ip = "127.0.0.1"
 			udata = self.getUserData()
@@ -117,185 +149,170 @@ class OscamInfo:
 			self.url = "http://%s:%s/oscamapi.html?part=%s" % (self.ip, self.port, part )
 		if part is not None and reader is not None:
 			self.url = "http://%s:%s/oscamapi.html?part=%s&label=%s" % ( self.ip, self.port, part, reader )
+		return (True, self.url)
 
+	def openWebIF(self, part = None, reader = None, parser = parseXML, ttl = STATUS_TTL):
+		"""returns a deferred with the parsed page, which fails with the error"""
+		result = self.getWebIFUrl(part, reader)
+		if not result[0]:
+			return defer.fail(WebIFError(result[1]))
 		print "URL=%s" % self.url
-		pwman = urllib2.HTTPPasswordMgrWithDefaultRealm()
-		pwman.add_password( None, self.url, self.username, self.password )
-		handlers = urllib2.HTTPDigestAuthHandler( pwman )
-		opener = urllib2.build_opener( urllib2.HTTPHandler, handlers )
-		urllib2.install_opener( opener )
-		request = urllib2.Request( self.url )
-		err = False
-		try:
-			data = urllib2.urlopen( request ).read()
-			# print data
-		except urllib2.URLError, e:
-			if hasattr(e, "reason"):
-				err = str(e.reason)
-			elif hasattr(e, "code"):
-				err = str(e.code)
-		if err is not False:
-			print "[openWebIF] Fehler: %s" % err
-			return (False, err)
-		else:
-			return (True, data)
+		return softcamWebClient.getPage(self.url, self.username, self.password, parser, ttl).addErrback(self.webIFError)
+
+	def webIFError(self, failure):
+		print "[openWebIF] Fehler: %s" % failure.getErrorMessage()
+		return failure
 
 	def readXML(self, typ):
+		"""returns a deferred with the list of entries, or the error text"""
 		if typ == "l":
 			self.showLog = True
-			part = "status&appendlog=1"
+			d = self.openWebIF("status&appendlog=1", parser = parseLog)
 		else:
 			self.showLog = False
-			part = None
-		result = self.openWebIF(part)
+			d = self.openWebIF()
+		return d.addCallback(self.parseStatus, typ).addErrback(errorText)
+
+	def parseStatus(self, data, typ):
 		retval = []
 		tmp = {}
-		if result[0]:
-			if not self.showLog:
-				data = ElementTree.XML(result[1])
-#				if typ=="version":
-#					if data.attrib.has_key("version"):
-#						self.version = data.attrib["version"]
-#					else:
-#						self.version = "n/a"
-#					return self.version
-				status = data.find("status")
-				clients = status.findall("client")
-				for cl in clients:
-					name = cl.attrib["name"]
-					proto = cl.attrib["protocol"]
-					if cl.attrib.has_key("au"):
-						au = cl.attrib["au"]
-					else:
-						au = ""
-					caid = cl.find("request").attrib["caid"]
-					srvid = cl.find("request").attrib["srvid"]
-					if cl.find("request").attrib.has_key("ecmtime"):
-						ecmtime = cl.find("request").attrib["ecmtime"]
-						if ecmtime == "0" or ecmtime == "":
-							ecmtime = "n/a"
-						else:
-							ecmtime = str(float(ecmtime) / 1000)[:5]
-					else:
-						ecmtime = "not available"
-					srvname = cl.find("request").text
-					if srvname is not None:
-						if ":" in srvname:
-							srvname_short = srvname.split(":")[1].strip()
-						else:
-							srvname_short = srvname
+		if not self.showLog:
+			status = data.find("status")
+			clients = status.findall("client")
+			for cl in clients:
+				name = cl.attrib["name"]
+				proto = cl.attrib["protocol"]
+				if cl.attrib.has_key("au"):
+					au = cl.attrib["au"]
+				else:
+					au = ""
+				caid = cl.find("request").attrib["caid"]
+				srvid = cl.find("request").attrib["srvid"]
+				if cl.find("request").attrib.has_key("ecmtime"):
+					ecmtime = cl.find("request").attrib["ecmtime"]
+					if ecmtime == "0" or ecmtime == "":
+						ecmtime = "n/a"
 					else:
-						srvname_short = "n/A"
-					login = cl.find("times").attrib["login"]
-					online = cl.find("times").attrib["online"]
-					if proto.lower() == "dvbapi":
-						ip = ""
+						ecmtime = str(float(ecmtime) / 1000)[:5]
+				else:
+					ecmtime = "not available"
+				srvname = cl.find("request").text
+				if srvname is not None:
+					if ":" in srvname:
+						srvname_short = srvname.split(":")[1].strip()
 					else:
-						ip = cl.find("connection").attrib["ip"]
-						if ip == "0.0.0.0":
-							ip = ""
-					port = cl.find("connection").attrib["port"]
-					connstatus = cl.find("connection").text
-					if name != "" and name != "anonymous" and proto != "":
-						try:
-							tmp[cl.attrib["type"]].append( (name, proto, "%s:%s" % (caid, srvid), srvname_short, ecmtime, ip, connstatus) )
-						except KeyError:
-							tmp[cl.attrib["type"]] = []
-							tmp[cl.attrib["type"]].append( (name, proto, "%s:%s" % (caid, srvid), srvname_short, ecmtime, ip, connstatus) )
-			else:
-				if "<![CDATA" not in result[1]:
-					tmp = result[1].replace("<log>", "<log><![CDATA[").replace("</log>", "]]></log>")
+						srvname_short = srvname
 				else:
-					tmp = result[1]
-				data = ElementTree.XML(tmp)
-				log = data.find("log")
-				logtext = log.text
-			if typ == "s":
-				if tmp.has_key("r"):
-					for i in tmp["r"]:
-						retval.append(i)
-				if tmp.has_key("p"):
-					for i in tmp["p"]:
-						retval.append(i)
-			elif typ == "c":
-				if tmp.has_key("c"):
-					for i in tmp["c"]:
-						retval.append(i)
-			elif typ == "l":
-				tmp = logtext.split("\n")
-				retval = []
-				for i in tmp:
-					tmp2 = i.split(" ")
-					if len(tmp2) > 2:
-						del tmp2[2]
-						txt = ""
-						for j in tmp2:
-							txt += "%s " % j.strip()
-						retval.append( txt )
-
-			return retval
-
+					srvname_short = "n/A"
+				login = cl.find("times").attrib["login"]
+				online = cl.find("times").attrib["online"]
+				if proto.lower() == "dvbapi":
+					ip = ""
+				else:
+					ip = cl.find("connection").attrib["ip"]
+					if ip == "0.0.0.0":
+						ip = ""
+				port = cl.find("connection").attrib["port"]
+				connstatus = cl.find("connection").text
+				if name != "" and name != "anonymous" and proto != "":
+					try:
+						tmp[cl.attrib["type"]].append( (name, proto, "%s:%s" % (caid, srvid), srvname_short, ecmtime, ip, connstatus) )
+					except KeyError:
+						tmp[cl.attrib["type"]] = []
+						tmp[cl.attrib["type"]].append( (name, proto, "%s:%s" % (caid, srvid), srvname_short, ecmtime, ip, connstatus) )
 		else:
-			return result[1]
+			log = data.find("log")
+			logtext = log.text
+		if typ == "s":
+			if tmp.has_key("r"):
+				for i in tmp["r"]:
+					retval.append(i)
+			if tmp.has_key("p"):
+				for i in tmp["p"]:
+					retval.append(i)
+		elif typ == "c":
+			if tmp.has_key("c"):
+				for i in tmp["c"]:
+					retval.append(i)
+		elif typ == "l":
+			tmp = logtext.split("\n")
+			retval = []
+			for i in tmp:
+				tmp2 = i.split(" ")
+				if len(tmp2) > 2:
+					del tmp2[2]
+					txt = ""
+					for j in tmp2:
+						txt += "%s " % j.strip()
+					retval.append( txt )
+
+		return retval
+
 	def getVersion(self):
-		xmldata = self.openWebIF()
-		if xmldata[0]:
-			data = ElementTree.XML(xmldata[1])
-			if data.attrib.has_key("version"):
-				self.version = data.attrib["version"]
-			else:
-				self.version = "n/a"
-			return self.version
+		"""returns a deferred with the version"""
+		return self.openWebIF().addCallbacks(self.parseVersion, self.noVersion)
+
+	def parseVersion(self, data):
+		if data.attrib.has_key("version"):
+			self.version = data.attrib["version"]
 		else:
 			self.version = "n/a"
 		return self.version
 
+	def noVersion(self, failure):
+		self.version = "n/a"
+		return self.version
+
 	def getTotalCards(self, reader):
-		xmldata = self.openWebIF(part = "entitlement", reader = reader)
-		if xmldata[0]:
-			xmld = ElementTree.XML(xmldata[1])
-			cards = xmld.find("reader").find("cardlist")
-			cardTotal = cards.attrib["totalcards"]
-			return cardTotal
-		else:
-			return None
+		"""returns a deferred with the number of cards, None on errors"""
+		return self.openWebIF(part = "entitlement", reader = reader, ttl = ENTITLEMENT_TTL).addCallback(self.parseTotalCards).addErrback(lambda failure: None)
+
+	def parseTotalCards(self, xmld):
+		cards = xmld.find("reader").find("cardlist")
+		cardTotal = cards.attrib["totalcards"]
+		return cardTotal
+
 	def getReaders(self, spec = None):
-		xmldata = self.openWebIF()
+		"""returns a deferred with the list of readers, None on errors"""
+		return self.openWebIF().addCallback(self.parseReaders, spec).addErrback(lambda failure: None)
+
+	def parseReaders(self, data, spec):
 		readers = []
-		if xmldata[0]:
-			data = ElementTree.XML(xmldata[1])
-			status = data.find("status")
-			clients = status.findall("client")
-			for cl in clients:
-				if cl.attrib.has_key("type"):
-					if cl.attrib["type"] == "p" or cl.attrib["type"] == "r":
-						if spec is not None:
-							proto = cl.attrib["protocol"]
-							if spec in proto:
-								name = cl.attrib["name"]
-								cards = self.getTotalCards(name)
-								readers.append( ( "%s ( %s Cards )" % (name, cards), name) )
-						else:
-							if cl.attrib["name"] != "" and cl.attrib["name"] != "" and cl.attrib["protocol"] != "":
-								readers.append( (cl.attrib["name"], cl.attrib["name"]) )  # return tuple for later use in Choicebox
+		cards = []
+		status = data.find("status")
+		clients = status.findall("client")
+		for cl in clients:
+			if cl.attrib.has_key("type"):
+				if cl.attrib["type"] == "p" or cl.attrib["type"] == "r":
+					if spec is not None:
+						proto = cl.attrib["protocol"]
+						if spec in proto:
+							name = cl.attrib["name"]
+							cards.append(self.getTotalCards(name))
+							readers.append(name)
+					else:
+						if cl.attrib["name"] != "" and cl.attrib["name"] != "" and cl.attrib["protocol"] != "":
+							readers.append( (cl.attrib["name"], cl.attrib["name"]) )  # return tuple for later use in Choicebox
+		if spec is None:
 			return readers
-		else:
-			return None
+		# the card counts of all readers are requested at the same time
+		def addCards(results):
+			return [ ( "%s ( %s Cards )" % (name, cards), name) for (name, (ok, cards)) in zip(readers, results) ]
+		return defer.DeferredList(cards).addCallback(addCards)
 
 	def getClients(self):
-		xmldata = self.openWebIF()
+		"""returns a deferred with the list of clients, None on errors"""
+		return self.openWebIF().addCallback(self.parseClients).addErrback(lambda failure: None)
+
+	def parseClients(self, data):
 		clientnames = []
-		if xmldata[0]:
-			data = ElementTree.XML(xmldata[1])
-			status = data.find("status")
-			clients = status.findall("client")
-			for cl in clients:
-				if cl.attrib.has_key("type"):
-					if cl.attrib["type"] == "c":
-						readers.append( (cl.attrib["name"], cl.attrib["name"]) )  # return tuple for later use in Choicebox
-			return clientnames
-		else:
-			return None
+		status = data.find("status")
+		clients = status.findall("client")
+		for cl in clients:
+			if cl.attrib.has_key("type"):
+				if cl.attrib["type"] == "c":
+					clientnames.append( (cl.attrib["name"], cl.attrib["name"]) )  # return tuple for later use in Choicebox
+		return clientnames
 
 	def getECMInfo(self, ecminfo):
 		result = []
@@ -432,27 +449,35 @@ class OscamInfoMenu(Screen):
 				self.session.open(oscInfo, "l")
 		elif entry == 4:
 			osc = OscamInfo()
-			reader = osc.getReaders("cccam")  # get list of available CCcam-Readers
-			if isinstance(reader, list):
-				if len(reader) == 1:
-					self.session.open(oscEntitlements, reader[0][1])
-				else:
-					self.callbackmode = "cccam"
-					self.session.openWithCallback(self.chooseReaderCallback, ChoiceBox, title = _("Please choose CCcam-Reader"), list=reader)
+			osc.getReaders("cccam").addCallback(self.gotCCcamReaders)  # get list of available CCcam-Readers
 		elif entry == 5:
 			osc = OscamInfo()
-			reader = osc.getReaders()
-			if reader is not None:
-				reader.append( ("All", "all") )
-				if isinstance(reader, list):
-					if len(reader) == 1:
-						self.session.open(oscReaderStats, reader[0][1])
-					else:
-						self.callbackmode = "readers"
-						self.session.openWithCallback(self.chooseReaderCallback, ChoiceBox, title = _("Please choose reader"), list=reader)
+			osc.getReaders().addCallback(self.gotReaders)
 		elif entry == 6:
 			self.session.open(OscamInfoConfigScreen)
 
+	def gotCCcamReaders(self, reader):
+		if screenClosed(self):
+			return
+		if isinstance(reader, list):
+			if len(reader) == 1:
+				self.session.open(oscEntitlements, reader[0][1])
+			else:
+				self.callbackmode = "cccam"
+				self.session.openWithCallback(self.chooseReaderCallback, ChoiceBox, title = _("Please choose CCcam-Reader"), list=reader)
+
+	def gotReaders(self, reader):
+		if screenClosed(self):
+			return
+		if reader is not None:
+			reader.append( ("All", "all") )
+			if isinstance(reader, list):
+				if len(reader) == 1:
+					self.session.open(oscReaderStats, reader[0][1])
+				else:
+					self.callbackmode = "readers"
+					self.session.openWithCallback(self.chooseReaderCallback, ChoiceBox, title = _("Please choose reader"), list=reader)
+
 	def chooseReaderCallback(self, retval):
 		print retval
 		if retval is not None:
@@ -538,11 +563,8 @@ class oscInfo(Screen, OscamInfo):
 		global HDSKIN, sizeH
 		self.session = session
 		self.what = what
-		self.firstrun = True
-		self.webif_data = self.readXML(typ = self.what)
-		entry_count = len( self.webif_data )
-#		entry_count = len(self.readXML(typ = self.what))
-		ysize = (entry_count + 4) * 25
+		# the data is requested after the layout, the screen is resized then
+		ysize = 5 * 25
 		ypos = 10
 		self.sizeLH = sizeH - 20
 		self.skin = """<screen position="center,center" size="%d, %d" title="Client Info" >""" % (sizeH, ysize)
@@ -707,11 +729,12 @@ class oscInfo(Screen, OscamInfo):
 			self["key_blue"].setText("Log")
 
 	def showData(self):
-		if self.firstrun:
-			data = self.webif_data
-			self.firstrun = False
-		else:
-			data = self.readXML(typ = self.what)
+		what = self.what
+		self.readXML(typ = what).addCallback(self.gotData, what)
+
+	def gotData(self, data, what):
+		if screenClosed(self) or what != self.what:
+			return
 		if not isinstance(data,str):
 			out = []
 			if self.what != "l":
@@ -731,16 +754,11 @@ class oscInfo(Screen, OscamInfo):
 						out.append( self.buildLogListEntry( (i,) ))
 				#out.reverse()
 			ysize = (len(out) + 4 ) * 25
-			if self.what == "c":
-				self.changeScreensize( ysize )
-				self.setTitle("Client Info ( Oscam-Version: %s )" % self.getVersion())
-			elif self.what == "s":
-				self.changeScreensize( ysize )
-				self.setTitle("Server Info( Oscam-Version: %s )" % self.getVersion())
-
-			elif self.what == "l":
+			if self.what == "l":
 				self.changeScreensize( 500 )
-				self.setTitle("Oscam Log ( Oscam-Version: %s )" % self.getVersion())
+			else:
+				self.changeScreensize( ysize )
+			self.getVersion().addCallback(self.gotVersion, what)
 			self["output"].l.setList(out)
 			self["output"].selectionEnabled(False)
 		else:
@@ -757,6 +775,15 @@ class oscInfo(Screen, OscamInfo):
 			self["output"].l.setList(out)
 			self["output"].selectionEnabled(False)
 
+	def gotVersion(self, version, what):
+		if screenClosed(self) or what != self.what:
+			return
+		if what == "c":
+			self.setTitle("Client Info ( Oscam-Version: %s )" % version)
+		elif what == "s":
+			self.setTitle("Server Info( Oscam-Version: %s )" % version)
+		elif what == "l":
+			self.setTitle("Oscam Log ( Oscam-Version: %s )" % version)
 
 
 class oscEntitlements(Screen, OscamInfo):
@@ -844,8 +871,16 @@ class oscEntitlements(Screen, OscamInfo):
 		return res
 
 	def showData(self):
-		xmldata_for_reader = self.openWebIF(part = "entitlement", reader = self.cccamreader)
-		xdata = ElementTree.XML(xmldata_for_reader[1])
+		self.openWebIF(part = "entitlement", reader = self.cccamreader, ttl = ENTITLEMENT_TTL).addCallbacks(self.gotData, self.gotError)
+
+	def gotError(self, failure):
+		if screenClosed(self):
+			return
+		self.setTitle(_("Error") + errorText(failure))
+
+	def gotData(self, xdata):
+		if screenClosed(self):
+			return
 		reader = xdata.find("reader")
 		if reader.attrib.has_key("hostaddress"):
 			hostadr = reader.attrib["hostaddress"]
@@ -987,14 +1022,23 @@ class oscReaderStats(Screen, OscamInfo):
 		return sorted(datalist, key=itemgetter(sort_col), reverse = reverse)
 
 	def showData(self):
-		readers = self.getReaders()
+		self.getReaders().addCallback(self.gotReaders)
+
+	def gotReaders(self, readers):
+		if screenClosed(self) or readers is None:
+			return
+		# the statistics of all readers are requested at the same time
+		stats = [ self.openWebIF(part = "readerstats", reader = i[1], ttl = READERSTATS_TTL) for i in readers ]
+		defer.DeferredList(stats, consumeErrors = True).addCallback(self.gotStats, readers)
+
+	def gotStats(self, stats, readers):
+		if screenClosed(self):
+			return
 		result = []
 		title2 = ""
-		for i in readers:
-			xmldata = self.openWebIF(part = "readerstats", reader = i[1])
+		for (i, (ok, xdata)) in zip(readers, stats):
 			emm_wri = emm_ski = emm_blk = emm_err = ""
-			if xmldata[0]:
-				xdata = ElementTree.XML(xmldata[1])
+			if ok:
 				rdr = xdata.find("reader")
 #					emms = rdr.find("emmstats")
 #					if emms.attrib.has_key("totalwritten"):
@@ -378,17 +378,15 @@ class PluginDownloadBrowser(Screen):
 			self.runSettingsInstall()
 			return
 		self.remainingdata = ""
-		if self.run == 0:
-			self.run = 1
-			if self.type == self.DOWNLOAD:
-				self.startIpkgListInstalled()
-		elif self.run == 1 and self.type == self.DOWNLOAD:
+		if self.run == 0 and self.type == self.DOWNLOAD:
+			# the feed lists are up to date now, the available and the
+			# installed plugins are both looked up in the package index
 			self.run = 2
-			from Components import opkg
+			from Components.opkg import enumPlugins, packageIndex
 			pluginlist = []
 			self.pluginlist = pluginlist
-			for plugin in opkg.enumPlugins(self.PLUGIN_PREFIX):
-				if plugin[0] not in self.installedplugins and ((not config.pluginbrowser.po.getValue() and not plugin[0].endswith('-po')) or config.pluginbrowser.po.getValue()) and ((not config.pluginbrowser.src.getValue() and not plugin[0].endswith('-src')) or config.pluginbrowser.src.getValue()):
+			for plugin in enumPlugins(self.PLUGIN_PREFIX):
+				if not packageIndex.isInstalled(plugin[0]) and ((not config.pluginbrowser.po.getValue() and not plugin[0].endswith('-po')) or config.pluginbrowser.po.getValue()) and ((not config.pluginbrowser.src.getValue() and not plugin[0].endswith('-src')) or config.pluginbrowser.src.getValue()):
 					pluginlist.append(plugin + (plugin[0][15:],))
 			if pluginlist:
 				pluginlist.sort()
@@ -1,5 +1,5 @@
 from Screens.Screen import Screen
-from Screens.Setup import setupdom
+from Screens.Setup import setupRegistry
 from Screens.LocationBox import MovieLocationBox, TimeshiftLocationBox
 from Screens.MessageBox import MessageBox
 from Components.Label import Label
@@ -50,13 +50,11 @@ class RecordingSettings(Screen,ConfigListScreen):
 		self["config"].setList(list)
 
 	def refill(self, list):
-		xmldata = setupdom().getroot()
-		for x in xmldata.findall("setup"):
-			if x.get("key") != self.setup:
-				continue
-			self.addItems(list, x)
-			self.setup_title = x.get("title", "").encode("UTF-8")
-			self.seperation = int(x.get('separation', '0'))
+		setup = setupRegistry.getSetup(self.setup)
+		if setup is not None:
+			self.addItems(list, setup.items)
+			self.setup_title = setup.title
+			self.seperation = setup.separation
 
 	def __init__(self, session):
 		from Components.Sources.StaticText import StaticText
@@ -267,40 +265,23 @@ class RecordingSettings(Screen,ConfigListScreen):
 	def createSummary(self):
 		return SetupSummary
 
-	def addItems(self, list, parentNode):
-		for x in parentNode:
-			if not x.tag:
+	def addItems(self, list, items):
+		if items and not self.levelChanged in config.usage.setup_level.notifiers:
+			config.usage.setup_level.notifiers.append(self.levelChanged)
+			self.onClose.append(self.removeNotifier)
+
+		level = config.usage.setup_level.index
+		for x in items:
+			if x.level > level or not x.available():
+				continue
+
+			b = x.getConfig()
+			if b == "":
 				continue
-			if x.tag == 'item':
-				item_level = int(x.get("level", 0))
-
-				if not self.levelChanged in config.usage.setup_level.notifiers:
-					config.usage.setup_level.notifiers.append(self.levelChanged)
-					self.onClose.append(self.removeNotifier)
-
-				if item_level > config.usage.setup_level.index:
-					continue
-
-				requires = x.get("requires")
-				if requires and requires.startswith('config.'):
-					item = eval(requires or "")
-					if item.getValue() and not item.getValue() == "0":
-						SystemInfo[requires] = True
-					else:
-						SystemInfo[requires] = False
-
-				if requires and not SystemInfo.get(requires, False):
-					continue
-
-				item_text = _(x.get("text", "??").encode("UTF-8"))
-				item_description = _(x.get("description", " ").encode("UTF-8"))
-				b = eval(x.text or "")
-				if b == "":
-					continue
-				#add to configlist
-				item = b
-				# the first b is the item itself, ignored by the configList.
-				# the second one is converted to string.
-				if not isinstance(item, ConfigNothing):
-					list.append((item_text, item, item_description))
+			#add to configlist
+			item = b
+			# the first b is the item itself, ignored by the configList.
+			# the second one is converted to string.
+			if not isinstance(item, ConfigNothing):
+				list.append((_(x.text), item, _(x.description)))
 
@@ -12,23 +12,126 @@ from Components.Sources.Boolean import Boolean
 from enigma import eEnv
 
 import xml.etree.cElementTree
+import os
+import re
+
+# setup.xml (and the data/setup.xml of plugins) is parsed once, and again
+# only when the file changes. the items are indexed per setup key and per
+# config path, their config expressions are compiled: plain paths like
+# config.usage.setup_level are looked up attribute by attribute, anything
+# else is evaluated from compiled code.
+
+configPath = re.compile(r"^config(\.[A-Za-z_][A-Za-z0-9_]*)+$")
+
+def compileConfig(expression):
+	expression = expression.strip()
+	if configPath.match(expression):
+		return tuple(expression.split('.')[1:])
+	return compile(expression, "setup.xml", "eval")
+
+def resolveConfig(compiled):
+	if isinstance(compiled, tuple):
+		element = config
+		for name in compiled:
+			element = getattr(element, name)
+		return element
+	return eval(compiled)
+
+class SetupItem:
+	def __init__(self, node):
+		self.level = int(node.get("level", 0))
+		self.text = node.get("text", "??").encode("UTF-8")
+		self.description = node.get("description", " ").encode("UTF-8")
+		self.requires = node.get("requires")
+		if self.requires and self.requires.startswith('config.'):
+			self.requires_config = compileConfig(self.requires)
+		else:
+			self.requires_config = None
+		self.expression = (node.text or "").strip()
+		if self.expression:
+			self.config = compileConfig(self.expression)
+		else:
+			self.config = None
+
+	def available(self):
+		if not self.requires:
+			return True
+		if self.requires_config is not None:
+			value = resolveConfig(self.requires_config).getValue()
+			SystemInfo[self.requires] = bool(value and not value == "0")
+		return SystemInfo.get(self.requires, False)
+
+	def getConfig(self):
+		if self.config is None:
+			return ""
+		return resolveConfig(self.config)
+
+class SetupEntry:
+	def __init__(self, node):
+		self.key = node.get("key")
+		self.title = node.get("title", "").encode("UTF-8")
+		self.separation = int(node.get('separation', '0'))
+		self.items = [SetupItem(x) for x in node if x.tag == 'item']
+
+class SetupFile:
+	def __init__(self, filename, stamp):
+		self.filename = filename
+		self.stamp = stamp
+		setupfile = file(filename, 'r')
+		try:
+			self.dom = xml.etree.cElementTree.parse(setupfile)
+		finally:
+			setupfile.close()
+		self.setups = { }		# key -> SetupEntry
+		self.items = { }		# config path -> SetupItem, the first one wins
+		for x in self.dom.getroot().findall("setup"):
+			entry = SetupEntry(x)
+			if entry.key in self.setups:
+				# like before, the items of all setups with the key are shown
+				previous = self.setups[entry.key]
+				entry.items = previous.items + entry.items
+			self.setups[entry.key] = entry
+			for item in entry.items:
+				self.items.setdefault(item.expression, item)
+
+class SetupRegistry:
+	def __init__(self):
+		self.files = { }		# file name -> SetupFile
+
+	def getFilename(self, plugin = None):
+		if plugin is not None:
+			# first we search in the current path
+			filename = resolveFilename(SCOPE_CURRENT_PLUGIN, plugin + '/data/setup.xml')
+			if os.path.isfile(filename):
+				return filename
+		# if not found in the current path, we use the global datadir-path
+		return eEnv.resolve('${datadir}/enigma2/setup.xml')
+
+	def getFile(self, plugin = None):
+		filename = self.getFilename(plugin)
+		st = os.stat(filename)
+		stamp = (st.st_mtime, st.st_size)
+		setupfile = self.files.get(filename)
+		if setupfile is None or setupfile.stamp != stamp:
+			setupfile = self.files[filename] = SetupFile(filename, stamp)
+		return setupfile
+
+	def getSetup(self, key, plugin = None):
+		return self.getFile(plugin).setups.get(key)
+
+	def getItem(self, configElement):
+		return self.getFile().items.get(configElement)
+
+setupRegistry = SetupRegistry()
 
 def setupdom(plugin=None):
-	# read the setupmenu
-	try:
-		# first we search in the current path
-		setupfile = file(resolveFilename(SCOPE_CURRENT_PLUGIN, plugin + '/data/setup.xml'), 'r')
-	except:
-		# if not found in the current path, we use the global datadir-path
-		setupfile = file(eEnv.resolve('${datadir}/enigma2/setup.xml'), 'r')
-	setupfiledom = xml.etree.cElementTree.parse(setupfile)
-	setupfile.close()
-	return setupfiledom
+	# the parsed setupmenu, shared: do not modify it
+	return setupRegistry.getFile(plugin).dom
 
 def getConfigMenuItem(configElement):
-	for item in setupdom().getroot().findall('./setup/item/.'):
-		if item.text == configElement:
-			return _(item.attrib["text"]), eval(configElement)
+	item = setupRegistry.getItem(configElement)
+	if item is not None:
+		return _(item.text), item.getConfig()
 	return "", None
 
 class SetupError(Exception):
@@ -78,13 +181,11 @@ class Setup(ConfigListScreen, Screen):
 		self["config"].setList(list)
 
 	def refill(self, list):
-		xmldata = setupdom(self.plugin).getroot()
-		for x in xmldata.findall("setup"):
-			if x.get("key") != self.setup:
-				continue
-			self.addItems(list, x);
-			self.setup_title = x.get("title", "").encode("UTF-8")
-			self.seperation = int(x.get('separation', '0'))
+		setup = setupRegistry.getSetup(self.setup, self.plugin)
+		if setup is not None:
+			self.addItems(list, setup.items)
+			self.setup_title = setup.title
+			self.seperation = setup.separation
 
 	def __init__(self, session, setup, plugin=None):
 		Screen.__init__(self, session)
@@ -223,48 +324,30 @@ class Setup(ConfigListScreen, Screen):
 	def createSummary(self):
 		return SetupSummary
 
-	def addItems(self, list, parentNode):
-		for x in parentNode:
-			if not x.tag:
+	def addItems(self, list, items):
+		if items and not self.levelChanged in config.usage.setup_level.notifiers:
+			config.usage.setup_level.notifiers.append(self.levelChanged)
+			self.onClose.append(self.removeNotifier)
+
+		level = config.usage.setup_level.index
+		for x in items:
+			if x.level > level or not x.available():
+				continue
+
+			b = x.getConfig()
+			if b == "":
 				continue
-			if x.tag == 'item':
-				item_level = int(x.get("level", 0))
-
-				if not self.levelChanged in config.usage.setup_level.notifiers:
-					config.usage.setup_level.notifiers.append(self.levelChanged)
-					self.onClose.append(self.removeNotifier)
-
-				if item_level > config.usage.setup_level.index:
-					continue
-
-				requires = x.get("requires")
-				if requires and requires.startswith('config.'):
-					item = eval(requires or "")
-					if item.getValue() and not item.getValue() == "0":
-						SystemInfo[requires] = True
-					else:
-						SystemInfo[requires] = False
-
-				if requires and not SystemInfo.get(requires, False):
-					continue
-
-				item_text = _(x.get("text", "??").encode("UTF-8"))
-				item_description = _(x.get("description", " ").encode("UTF-8"))
-				b = eval(x.text or "")
-				if b == "":
-					continue
-				#add to configlist
-				item = b
-				# the first b is the item itself, ignored by the configList.
-				# the second one is converted to string.
-				if not isinstance(item, ConfigNothing):
-					list.append((item_text, item, item_description))
+			#add to configlist
+			item = b
+			# the first b is the item itself, ignored by the configList.
+			# the second one is converted to string.
+			if not isinstance(item, ConfigNothing):
+				list.append((_(x.text), item, _(x.description)))
 
 def getSetupTitle(id):
-	xmldata = setupdom().getroot()
-	for x in xmldata.findall("setup"):
-		if x.get("key") == id:
-			if _(x.get("title", "").encode("UTF-8")) == _("EPG settings") or _(x.get("title", "").encode("UTF-8")) == _("Logs settings") or _(x.get("title", "").encode("UTF-8")) == _("OSD settings") or _(x.get("title", "").encode("UTF-8")) == _("Softcam setings"):
-				return _("Settings...")
-			return x.get("title", "").encode("UTF-8")
+	setup = setupRegistry.getSetup(id)
+	if setup is not None:
+		if _(setup.title) in (_("EPG settings"), _("Logs settings"), _("OSD settings"), _("Softcam setings")):
+			return _("Settings...")
+		return setup.title
 	raise SetupError("unknown setup id '%s'!" % repr(id))
@@ -74,14 +74,21 @@ class JobView(InfoBarNotifications, Screen, ConfigListScreen):
 		self.setupList()
 
 	def windowShow(self):
-		job_manager.visible = True
+		job_manager.setVisible(self.job, True)
 		self.job.state_changed.append(self.state_changed)
+		job_manager.jobs_changed.append(self.jobs_changed)
 
 	def windowHide(self):
-		job_manager.visible = False
+		job_manager.setVisible(self.job, False)
+		if self.jobs_changed in job_manager.jobs_changed:
+			job_manager.jobs_changed.remove(self.jobs_changed)
 		if len(self.job.state_changed) > 0:
 			self.job.state_changed.remove(self.state_changed)
 
+	def jobs_changed(self):
+		if self.job.status == self.job.NOT_STARTED:
+			self.state_changed()
+
 	def state_changed(self):
 		j = self.job
 		self["job_progress"].range = j.end
@@ -91,8 +98,21 @@ class JobView(InfoBarNotifications, Screen, ConfigListScreen):
 		#print "JobView::state_changed:", j.end, j.progress
 		self["job_status"].text = j.getStatustext()
 		if j.status == j.IN_PROGRESS:
-			self["job_task"].text = j.tasks[j.current_task].name
-			self["summary_job_task"].text = j.tasks[j.current_task].name
+			task = j.tasks[j.current_task]
+			# copy tasks report their throughput
+			if getattr(task, "speed", 0):
+				self["job_task"].text = "%s (%.1f MB/s)" % (task.name, task.speed / 1048576.0)
+			else:
+				self["job_task"].text = task.name
+			self["summary_job_task"].text = task.name
+		elif j.status == j.NOT_STARTED:
+			# other jobs may be running at the same time, show the ones this job waits for
+			blocking = job_manager.getBlockingJobs(j)
+			if blocking:
+				self["job_task"].text = _("Waiting for: %s") % ", ".join([job.name for job in blocking])
+			else:
+				self["job_task"].text = ""
+			self["summary_job_task"].text = j.getStatustext()
 		else:
 			self["job_task"].text = ""
 			self["summary_job_task"].text = j.getStatustext()
@@ -117,7 +137,7 @@ class JobView(InfoBarNotifications, Screen, ConfigListScreen):
 
 	def abort(self):
 		if self.job.status == self.job.NOT_STARTED:
-			job_manager.active_jobs.remove(self.job)
+			job_manager.removeJob(self.job)
 			self.close(False)
 		elif self.job.status == self.job.IN_PROGRESS and self["cancelable"].boolean == True:
 			self.job.cancel()
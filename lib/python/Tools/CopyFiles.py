@@ -1,8 +1,7 @@
-from Components.Task import PythonTask, Task, Job, job_manager as JobManager
-from Tools.Directories import fileExists
-from enigma import eTimer
-from os import path
+from Components.Task import PythonTask, Task, Job, job_manager as JobManager, diskResource
+from Tools.FileCopy import FileCopy, pathSize
 from shutil import rmtree
+from time import time
 
 class DeleteFolderTask(PythonTask):
 	def openFiles(self, fileList):
@@ -21,41 +20,43 @@ class DeleteFolderTask(PythonTask):
 class CopyFileJob(Job):
 	def __init__(self, srcfile, destfile, name):
 		Job.__init__(self, _("Copying files"))
-		cmdline = "cp -Rf \"%s\" \"%s\"" % (srcfile,destfile)
-		AddFileProcessTask(self, cmdline, srcfile, destfile, name)
+		self.resources = [ diskResource(srcfile), diskResource(destfile) ]
+		FileTransferTask(self, name, "copy", srcfile, destfile)
 
 class MoveFileJob(Job):
 	def __init__(self, srcfile, destfile, name):
 		Job.__init__(self, _("Moving files"))
-		cmdline = "mv -f \"%s\" \"%s\"" % (srcfile,destfile)
-		AddFileProcessTask(self, cmdline, srcfile, destfile, name)
+		self.resources = [ diskResource(srcfile), diskResource(destfile) ]
+		FileTransferTask(self, name, "move", srcfile, destfile)
 
-class AddFileProcessTask(Task):
-	def __init__(self, job, cmdline, srcfile, destfile, name):
-		Task.__init__(self, job, name)
-		self.setCmdline(cmdline)
+class FileTransferTask(PythonTask):
+	# copies ("copy"), moves ("move") or appends ("append") srcfile to
+	# destfile in the worker thread. progress is counted in bytes, speed
+	# holds the throughput in bytes per second.
+	def __init__(self, job, name, mode, srcfile, destfile):
+		PythonTask.__init__(self, job, name)
+		self.mode = mode
 		self.srcfile = srcfile
 		self.destfile = destfile
-
-		self.ProgressTimer = eTimer()
-		self.ProgressTimer.callback.append(self.ProgressUpdate)
-
-	def ProgressUpdate(self):
-		if self.srcsize <= 0 or not fileExists(self.destfile, 'r'):
-			return
-
-		self.setProgress(int((path.getsize(self.destfile)/float(self.srcsize))*100))
-		self.ProgressTimer.start(5000, True)
+		self.speed = 0
 
 	def prepare(self):
-		if fileExists(self.srcfile, 'r'):
-			self.srcsize = path.getsize(self.srcfile)
-			self.ProgressTimer.start(5000, True)
+		self.end = max(pathSize(self.srcfile), 1)
+		self.starttime = time()
+		self.copier = FileCopy(self.bytesDone, self.isAborted)
 
-	def afterRun(self):
-		self.setProgress(100)
-		self.ProgressTimer.stop()
+	def isAborted(self):
+		return self.aborted
 
+	def bytesDone(self, count):
+		# called in the worker thread, onTimer shows self.pos
+		self.pos = count
+		elapsed = time() - self.starttime
+		if elapsed > 0:
+			self.speed = count / elapsed
+
+	def work(self):
+		getattr(self.copier, self.mode)(self.srcfile, self.destfile)
 
 def copyFiles(fileList, name):
 	for src, dst in fileList:
@@ -66,7 +67,7 @@ def moveFiles(fileList, name):
 		JobManager.AddJob(MoveFileJob(src, dst, name))
 
 def deleteFiles(fileList, name):
-	job = Components.Task.Job(_("Deleting files"))
+	job = Job(_("Deleting files"))
 	task = DeleteFolderTask(job, name)
 	task.openFiles(fileList)
-	Components.Task.job_manager.AddJob(job)
+	JobManager.AddJob(job)
@@ -73,7 +73,52 @@ fallbackPaths = {
 		SCOPE_TIMESHIFT: [("/hdd/timeshift", PATH_MOVE)]
 	}
 
+# the skin scopes look for a file in up to four places, depending on the
+# selected skin. their results for relative names are remembered (also
+# for files which do not exist) until the skin changes. a file added to
+# /etc/enigma2 or to the skin directories later is not seen until
+# clearResolveCache() is called. absolute and ~/ names are not cached.
+
+cachedScopes = frozenset((SCOPE_CURRENT_SKIN, SCOPE_ACTIVE_SKIN, SCOPE_ACTIVE_LCDSKIN, SCOPE_CURRENT_PLUGIN))
+resolveCache = {}		# (scope, base, path_prefix) -> path
+resolveCacheHits = 0
+resolveCacheMisses = 0
+skinNotifiers = set()		# the skin settings clearing the cache on a change
+
+def clearResolveCache(configElement = None):
+	resolveCache.clear()
+
+def getResolveCacheStats():
+	"""returns (hits, misses, entries) of the resolveFilename cache"""
+	return resolveCacheHits, resolveCacheMisses, len(resolveCache)
+
+def addSkinNotifier(name):
+	from Components.config import config
+	skinNotifiers.add(name)
+	getattr(config.skin, name).addNotifier(clearResolveCache, initial_call = False)
+
 def resolveFilename(scope, base = "", path_prefix = None):
+	global resolveCacheHits, resolveCacheMisses
+	if scope not in cachedScopes or base.startswith('/') or base.startswith('~/'):
+		# absolute names are returned as they are, before config is needed
+		return resolveFilenameUncached(scope, base, path_prefix)
+	key = (scope, base, path_prefix)
+	path = resolveCache.get(key)
+	if path is not None:
+		resolveCacheHits += 1
+		return path
+	resolveCacheMisses += 1
+	path = resolveFilenameUncached(scope, base, path_prefix)
+	if scope == SCOPE_ACTIVE_LCDSKIN:
+		name = "display_skin"
+	else:
+		name = "primary_skin"
+	if name not in skinNotifiers:
+		addSkinNotifier(name)
+	resolveCache[key] = path
+	return path
+
+def resolveFilenameUncached(scope, base = "", path_prefix = None):
 	if base.startswith("~/"):
 		# you can only use the ~/ if we have a prefix directory
 		assert path_prefix is not None
@@ -283,6 +328,7 @@ def getRecordingFilename(basename, dirname = None):
 
 # this is clearly a hack:
 def InitFallbackFiles():
+	clearResolveCache()
 	resolveFilename(SCOPE_CONFIG, "userbouquet.favourites.tv")
 	resolveFilename(SCOPE_CONFIG, "bouquets.tv")
 	resolveFilename(SCOPE_CONFIG, "userbouquet.favourites.radio")
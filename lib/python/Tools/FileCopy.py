@@ -0,0 +1,190 @@
+import os
+import errno
+import shutil
+
+# in-process copying of (large) files, meant to run in the worker thread of
+# a PythonTask.
+#
+# - the data is moved inside the kernel by sendfile() where the kernel
+#   supports it for files, otherwise by a loop of large reads and writes,
+# - the pages of both files are dropped from the page cache behind the copy
+#   (posix_fadvise DONTNEED, after the written pages went to the disk), so
+#   copying a recording does not evict everything else,
+# - progress(bytes) is called after every chunk, abort() is polled before
+#   every chunk and stops the copy, a partial destination is removed,
+# - moving renames when source and destination share the file system.
+
+CHUNK_SIZE = 4 * 1024 * 1024	# a multiple of the page size
+
+POSIX_FADV_DONTNEED = 4
+SYNC_FILE_RANGE_WAIT_BEFORE = 1
+SYNC_FILE_RANGE_WRITE = 2
+SYNC_FILE_RANGE_WAIT_AFTER = 4
+
+sendfile = fadvise = sync_file_range = None
+try:
+	import ctypes
+	import ctypes.util
+	libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno = True)
+
+	def libcFunction(name, restype, *argtypes):
+		try:
+			function = getattr(libc, name)
+		except AttributeError:
+			return None
+		function.restype = restype
+		function.argtypes = argtypes
+		return function
+
+	sendfile = libcFunction("sendfile64", ctypes.c_ssize_t, ctypes.c_int, ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t)
+	fadvise = libcFunction("posix_fadvise64", ctypes.c_int, ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong, ctypes.c_int)
+	sync_file_range = libcFunction("sync_file_range", ctypes.c_int, ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong, ctypes.c_uint)
+except Exception, ex:
+	print "[FileCopy] native file functions not available:", ex
+
+class CopyAborted(Exception):
+	def __str__(self):
+		return "Cancelled upon user request"
+
+def pathSize(path):
+	"""returns the number of bytes in a file or directory tree"""
+	if os.path.islink(path) or not os.path.isdir(path):
+		try:
+			return os.path.getsize(path)
+		except OSError:
+			return 0
+	size = 0
+	for root, dirs, files in os.walk(path):
+		for name in files:
+			filename = os.path.join(root, name)
+			if not os.path.islink(filename):
+				try:
+					size += os.path.getsize(filename)
+				except OSError:
+					pass
+	return size
+
+class FileCopy:
+	def __init__(self, progress = None, abort = None):
+		self.progress = progress	# called with the number of bytes done so far
+		self.abort = abort		# returns True to stop
+		self.done = 0
+		self.use_sendfile = sendfile is not None
+
+	def copy(self, src, dst):
+		"""like cp -R src dst"""
+		if os.path.isdir(dst):
+			dst = os.path.join(dst, os.path.basename(src.rstrip('/')))
+		self.copyPath(src, dst)
+
+	def move(self, src, dst):
+		"""like mv src dst"""
+		if os.path.isdir(dst):
+			dst = os.path.join(dst, os.path.basename(src.rstrip('/')))
+		size = pathSize(src)
+		try:
+			os.rename(src, dst)
+			self.advance(size)
+			return
+		except OSError, e:
+			if e.errno != errno.EXDEV:
+				raise
+		self.copyPath(src, dst, True)
+		if os.path.isdir(src) and not os.path.islink(src):
+			shutil.rmtree(src)
+		else:
+			os.remove(src)
+
+	def append(self, src, dst):
+		"""like cat src >> dst"""
+		self.copyFile(src, dst, append = True)
+
+	def copyPath(self, src, dst, keepstat = False):
+		if os.path.islink(src):
+			if os.path.lexists(dst):
+				os.remove(dst)
+			os.symlink(os.readlink(src), dst)
+		elif os.path.isdir(src):
+			if not os.path.isdir(dst):
+				os.makedirs(dst)
+			for name in os.listdir(src):
+				self.copyPath(os.path.join(src, name), os.path.join(dst, name), keepstat)
+			if keepstat:
+				shutil.copystat(src, dst)
+		else:
+			self.copyFile(src, dst)
+			if keepstat:
+				shutil.copystat(src, dst)
+
+	def copyFile(self, src, dst, append = False):
+		fdin = os.open(src, os.O_RDONLY)
+		try:
+			if append:
+				fdout = os.open(dst, os.O_WRONLY | os.O_CREAT, 0666)
+				start = os.lseek(fdout, 0, os.SEEK_END)
+			else:
+				fdout = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0666)
+				start = 0
+			try:
+				self.copyData(fdin, fdout, start)
+			except:
+				# leave the destination as it was
+				if append:
+					os.ftruncate(fdout, start)
+					os.close(fdout)
+				else:
+					os.close(fdout)
+					os.remove(dst)
+				raise
+			os.close(fdout)
+		finally:
+			os.close(fdin)
+
+	def copyData(self, fdin, fdout, outpos):
+		inpos = 0
+		previous = None
+		while True:
+			if self.abort is not None and self.abort():
+				raise CopyAborted()
+			if self.use_sendfile:
+				count = sendfile(fdout, fdin, None, CHUNK_SIZE)
+				if count < 0:
+					err = ctypes.get_errno()
+					if err == errno.EINTR:
+						continue
+					if inpos == 0 and err in (errno.EINVAL, errno.ENOSYS):
+						# this kernel can not sendfile() between files
+						self.use_sendfile = False
+						continue
+					raise OSError(err, os.strerror(err))
+			else:
+				data = os.read(fdin, CHUNK_SIZE)
+				count = len(data)
+				while data:
+					data = data[os.write(fdout, data):]
+			if count == 0:
+				break
+			if fadvise is not None:
+				fadvise(fdin, inpos, count, POSIX_FADV_DONTNEED)
+			# start writing this chunk, wait for the previous one and drop it
+			if sync_file_range is not None:
+				sync_file_range(fdout, outpos, count, SYNC_FILE_RANGE_WRITE)
+			if previous is not None:
+				self.dropWritten(fdout, previous)
+			previous = (outpos, count)
+			inpos += count
+			outpos += count
+			self.advance(count)
+		if previous is not None:
+			self.dropWritten(fdout, previous)
+
+	def dropWritten(self, fd, (offset, count)):
+		if sync_file_range is not None:
+			sync_file_range(fd, offset, count, SYNC_FILE_RANGE_WAIT_BEFORE | SYNC_FILE_RANGE_WRITE | SYNC_FILE_RANGE_WAIT_AFTER)
+		if fadvise is not None:
+			fadvise(fd, offset, count, POSIX_FADV_DONTNEED)
+
+	def advance(self, count):
+		self.done += count
+		if self.progress is not None:
+			self.progress(self.done)
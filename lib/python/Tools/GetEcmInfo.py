@@ -1,181 +1,277 @@
 from Components.config import config
+from Tools.Inotify import inotify, IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO, IN_DELETE
 import os
 import time
 
 ECM_INFO = '/tmp/ecm.info'
 EMPTY_ECM_INFO = _("Free To Air"),'0','0','0'
 
-old_ecm_time = time.time()
-info = {}
-ecm = ''
-data = EMPTY_ECM_INFO
+# what[1] of the CHANGED_SPECIFIC sent by converters when ecm.info changed
+ECM_CHANGED = "ecminfo"
 
-class GetEcmInfo:
-	def pollEcmData(self):
-		global data
-		global old_ecm_time
-		global info
-		global ecm
-		try:
-			ecm_time = os.stat(ECM_INFO).st_mtime
-		except:
-			ecm_time = old_ecm_time
-			data = EMPTY_ECM_INFO
-			info = {}
-			ecm = ''
-		if ecm_time != old_ecm_time:
-			oecmi1 = info.get('ecminterval1','')
-			oecmi0 = info.get('ecminterval0','')
-			info = {}
-			info['ecminterval2'] = oecmi1
-			info['ecminterval1'] = oecmi0
-			old_ecm_time = ecm_time
+def parseEcmInfo(ecm):
+	info = {}
+	info['caid'] = "0"
+	info['eCaid'] = ""
+	info['eEnc'] = ""
+	info['eSrc'] = ""
+	info['eTime'] = "0"
+	info['pid'] = "0"
+	info['prov'] = ""
+	info['provid'] = "0"
+	for line in ecm:
+		d = line.split(':', 1)
+		if len(d) > 1:
+			info[d[0].strip()] = d[1].strip()
+		mgcam = line.strip()
+		if line.find('ECM') != -1:
+			linetmp = mgcam.split(' ')
+			info['eEnc'] = linetmp[1]
+			info['eCaid'] = linetmp[5][2:-1]
+			continue
+		if line.find('source') != -1:
+			linetmp = mgcam.split(' ')
 			try:
-				file = open(ECM_INFO, 'rb')
-				ecm = file.readlines()
-				file.close()
+				info['eSrc'] = linetmp[4][:-1]
+				continue
 			except:
-				ecm = ''
-			info['caid'] = "0"
-			info['eCaid'] = ""
-			info['eEnc'] = ""
-			info['eSrc'] = ""
-			info['eTime'] = "0"
-			info['pid'] = "0"
-			info['prov'] = ""
-			info['provid'] = "0"
-			for line in ecm:
-				d = line.split(':', 1)
-				if len(d) > 1:
-					info[d[0].strip()] = d[1].strip()
-				mgcam = line.strip()
-				if line.find('ECM') != -1:
-					linetmp = mgcam.split(' ')
-					info['eEnc'] = linetmp[1]
-					info['eCaid'] = linetmp[5][2:-1]
-					continue
-				if line.find('source') != -1:
-					linetmp = mgcam.split(' ')
-					try:
-						info['eSrc'] = linetmp[4][:-1]
-						continue
-					except:
-						info['eSrc'] = linetmp[1]
-						continue
-				if line.find('msec') != -1:
-					linetmp = line.split(' ')
-					info['eTime'] = linetmp[0]
-					continue
-				if ecm[1].startswith('SysID'):
-					info['prov'] = ecm[1].strip()[6:]
-					continue
-				if 'CaID 0x' in ecm[0] and 'pid 0x' in ecm[0]:
-					info['caid'] = ecm[0][ecm[0].find('CaID 0x')+7:ecm[0].find(',')]
-					info['pid'] = ecm[0][ecm[0].find('pid 0x')+6:ecm[0].find(' =')]
-					info['provid'] = info.get('prov', '0')[:4]
-			data = self.getText()
-		else:
-			info['ecminterval0'] = int(time.time()-ecm_time+0.5)
+				info['eSrc'] = linetmp[1]
+				continue
+		if line.find('msec') != -1:
+			linetmp = line.split(' ')
+			info['eTime'] = linetmp[0]
+			continue
+		if len(ecm) > 1 and ecm[1].startswith('SysID'):
+			info['prov'] = ecm[1].strip()[6:]
+			continue
+		if 'CaID 0x' in ecm[0] and 'pid 0x' in ecm[0]:
+			info['caid'] = ecm[0][ecm[0].find('CaID 0x')+7:ecm[0].find(',')]
+			info['pid'] = ecm[0][ecm[0].find('pid 0x')+6:ecm[0].find(' =')]
+			info['provid'] = info.get('prov', '0')[:4]
+	return info
 
-	def getEcmData(self):
-		self.pollEcmData()
-		return data
+def ecmText(info):
+	# info is dictionary
+	textvalue = ""
+	using = info.get('using', '')
+	protocol = info.get('protocol', '')
+	if using or protocol:
+		if config.usage.show_cryptoinfo.getValue() == '0':
+			textvalue = ' '
+		elif config.usage.show_cryptoinfo.getValue() == '1':
+			# CCcam
+			if using == 'fta':
+				textvalue = _("Free To Air")
+			elif using == 'emu':
+				textvalue = "EMU (%ss)" % (info.get('ecm time', '?'))
+			else:
+				if info.get('address', None):
+					address = info.get('address', '')
+				elif info.get('from', None):
+					address = info.get('from', '')
+				else:
+					address = ''
+				hops = info.get('hops', None)
+				if hops and hops != '0':
+					hops = ' @' + hops
+				else:
+					hops = ''
+				textvalue = address + hops + " (%ss)" % info.get('ecm time', '?')
+		elif config.usage.show_cryptoinfo.getValue() == '2':
+			# CCcam
+			if using == 'fta':
+				textvalue = _("Free To Air")
+			else:
+				address = _('Server:') + ' '
+				if info.get('address', None):
+					address += info.get('address', '')
+				elif info.get('from', None):
+					address += info.get('from', '')
 
-	def getInfo(self, member, ifempty = ''):
-		self.pollEcmData()
-		return str(info.get(member, ifempty))
+				protocol = _('Protocol:') + ' '
+				if info.get('protocol', None):
+					protocol += info.get('protocol', '')
 
-	def getText(self):
-		global ecm
-		# info is dictionary
-		using = info.get('using', '')
-		protocol = info.get('protocol', '')
-		if using or protocol:
-			if config.usage.show_cryptoinfo.getValue() == '0':
-				self.textvalue = ' '
-			elif config.usage.show_cryptoinfo.getValue() == '1':
-				# CCcam
-				if using == 'fta':
-					self.textvalue = _("Free To Air")
-				elif using == 'emu':
-					self.textvalue = "EMU (%ss)" % (info.get('ecm time', '?'))
-				else:
-					if info.get('address', None):
-						address = info.get('address', '')
-					elif info.get('from', None):
-						address = info.get('from', '')
+				hops = _('Hops:') + ' '
+				if info.get('hops', None):
+					hops += info.get('hops', '')
+
+				ecm = _('Ecm:') + ' '
+				if info.get('ecm time', None):
+					ecm += info.get('ecm time', '')
+				textvalue = address + '\n' + protocol + '  ' + hops + '  ' + ecm
+	else:
+		decode = info.get('decode', None)
+		if decode:
+			# gbox (untested)
+			if info['decode'] == 'Network':
+				cardid = 'id:' + info.get('prov', '')
+				try:
+					file = open('/tmp/share.info', 'rb')
+					share = file.readlines()
+					file.close()
+					for line in share:
+						if cardid in line:
+							textvalue = line.strip()
+							break
 					else:
-						address = ''
+						textvalue = cardid
+				except:
+					textvalue = decode
+			else:
+				textvalue = decode
+			if 'response' in info:
+				textvalue = textvalue + " (0.%ss)" % info['response']
+		else:
+			source = info.get('source', None)
+			if source:
+				# MGcam
+				textvalue = "%s %s %.3f @ %s" % (info['eEnc'],info['eCaid'],(float(info['eTime'])/1000),info['eSrc'])
+			else:
+				reader = info.get('reader', '')
+				if reader:
 					hops = info.get('hops', None)
 					if hops and hops != '0':
 						hops = ' @' + hops
 					else:
 						hops = ''
-					self.textvalue = address + hops + " (%ss)" % info.get('ecm time', '?')
-			elif config.usage.show_cryptoinfo.getValue() == '2':
-				# CCcam
-				if using == 'fta':
-					self.textvalue = _("Free To Air")
+					textvalue = reader + hops + " (%ss)" % info.get('ecm time', '?')
 				else:
-					address = _('Server:') + ' '
-					if info.get('address', None):
-						address += info.get('address', '')
-					elif info.get('from', None):
-						address += info.get('from', '')
-
-					protocol = _('Protocol:') + ' '
-					if info.get('protocol', None):
-						protocol += info.get('protocol', '')
-
-					hops = _('Hops:') + ' '
-					if info.get('hops', None):
-						hops += info.get('hops', '')
-
-					ecm = _('Ecm:') + ' '
-					if info.get('ecm time', None):
-						ecm += info.get('ecm time', '')
-					self.textvalue = address + '\n' + protocol + '  ' + hops + '  ' + ecm
+					textvalue = ""
+	decCI = info.get('caid', '0')
+	provid = info.get('provid', '0')
+	if provid == '0':
+		provid = info.get('prov', '0')
+	ecmpid = info.get('pid', '0')
+	return textvalue,decCI,provid,ecmpid
+
+class EcmRecord:
+	"""the parsed content of ecm.info, it is not changed once created"""
+	def __init__(self, mtime = None, lines = (), info = None, interval1 = '', interval2 = ''):
+		self.mtime = mtime		# None if there is no ecm.info
+		self.lines = tuple(lines)
+		self.info = info or { }
+		self.interval1 = interval1	# seconds between the last ecm.info changes
+		self.interval2 = interval2
+		self.texts = { }		# show_cryptoinfo -> getEcmData() result
+
+	def getEcmData(self):
+		if self.mtime is None:
+			return EMPTY_ECM_INFO
+		show = config.usage.show_cryptoinfo.getValue()
+		data = self.texts.get(show)
+		if data is None:
+			data = self.texts[show] = ecmText(self.info)
+		return data
+
+	def getInfo(self, member, ifempty = ''):
+		if member == 'ecminterval0':
+			if self.mtime is None:
+				return ifempty
+			return str(int(time.time() - self.mtime + 0.5))
+		if member == 'ecminterval1':
+			return str(self.interval1)
+		if member == 'ecminterval2':
+			return str(self.interval2)
+		return str(self.info.get(member, ifempty))
+
+# one reader of ecm.info for all converters. while someone listens, the
+# file is watched by inotify (the directory, as softcams delete and
+# recreate it), without inotify it is polled by a single timer. a change
+# is read and parsed once, the listeners get the new EcmRecord.
+
+class EcmInfoService:
+	POLL_INTERVAL = 1000
+	# events often come in bursts (truncate, write, close), read once
+	SETTLE_TIME = 50
+
+	def __init__(self, filename = ECM_INFO):
+		self.filename = filename
+		self.directory, self.name = os.path.split(filename)
+		self.record = EcmRecord()
+		self.listeners = [ ]
+		self.timer = None
+		self.watching = False
+
+	def addListener(self, callback):
+		if callback not in self.listeners:
+			self.listeners.append(callback)
+			if len(self.listeners) == 1:
+				self.start()
+
+	def removeListener(self, callback):
+		if callback in self.listeners:
+			self.listeners.remove(callback)
+			if not self.listeners:
+				self.stop()
+
+	def start(self):
+		from enigma import eTimer
+		if self.timer is None:
+			self.timer = eTimer()
+			self.timer.callback.append(self.timeout)
+		self.update()
+		self.watching = inotify.addWatch(self.directory, IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE, self.directoryChanged)
+		if not self.watching:
+			self.timer.start(self.POLL_INTERVAL)
+
+	def stop(self):
+		if self.watching:
+			inotify.removeWatch(self.directory, self.directoryChanged)
+			self.watching = False
+		self.timer.stop()
+
+	def directoryChanged(self, path, name, mask):
+		if name == self.name:
+			self.timer.start(self.SETTLE_TIME, True)
+
+	def timeout(self):
+		self.update()
+
+	def update(self):
+		"""reads ecm.info if it changed, returns True if it did"""
+		try:
+			mtime = os.stat(self.filename).st_mtime
+		except OSError:
+			mtime = None
+		record = self.record
+		if mtime == record.mtime:
+			return False
+		if mtime is None:
+			self.record = EcmRecord()
 		else:
-			decode = info.get('decode', None)
-			if decode:
-				# gbox (untested)
-				if info['decode'] == 'Network':
-					cardid = 'id:' + info.get('prov', '')
-					try:
-						file = open('/tmp/share.info', 'rb')
-						share = file.readlines()
-						file.close()
-						for line in share:
-							if cardid in line:
-								self.textvalue = line.strip()
-								break
-						else:
-							self.textvalue = cardid
-					except:
-						self.textvalue = decode
-				else:
-					self.textvalue = decode
-				if 'response' in info:
-					self.textvalue = self.textvalue + " (0.%ss)" % info['response']
+			try:
+				f = open(self.filename, 'rb')
+				lines = f.readlines()
+				f.close()
+			except IOError:
+				lines = [ ]
+			if record.mtime is not None:
+				interval1 = int(mtime - record.mtime + 0.5)
 			else:
-				source = info.get('source', None)
-				if source:
-					# MGcam
-					self.textvalue = "%s %s %.3f @ %s" % (info['eEnc'],info['eCaid'],(float(info['eTime'])/1000),info['eSrc'])
-				else:
-					reader = info.get('reader', '')
-					if reader:
-						hops = info.get('hops', None)
-						if hops and hops != '0':
-							hops = ' @' + hops
-						else:
-							hops = ''
-						self.textvalue = reader + hops + " (%ss)" % info.get('ecm time', '?')
-					else:
-						self.textvalue = ""
-		decCI = info.get('caid', '0')
-		provid = info.get('provid', '0')
-		if provid == '0':
-			provid = info.get('prov', '0')
-		ecmpid = info.get('pid', '0')
-		return self.textvalue,decCI,provid,ecmpid
+				interval1 = ''
+			self.record = EcmRecord(mtime, lines, parseEcmInfo(lines), interval1, record.interval1)
+		for callback in self.listeners[:]:
+			callback(self.record)
+		return True
+
+	def getRecord(self):
+		if not self.listeners:
+			# nobody keeps it up to date, check now
+			self.update()
+		return self.record
+
+ecmInfo = EcmInfoService()
+
+class GetEcmInfo:
+	def pollEcmData(self):
+		return ecmInfo.getRecord()
+
+	def getEcmData(self):
+		return self.pollEcmData().getEcmData()
+
+	def getInfo(self, member, ifempty = ''):
+		return self.pollEcmData().getInfo(member, ifempty)
+
+	def getText(self):
+		return self.pollEcmData().getEcmData()
@@ -0,0 +1,129 @@
+import os
+import struct
+from select import POLLIN
+
+# minimal inotify binding for the enigma main loop. callbacks are called
+# as callback(path, name, mask) from the main loop, name is the file name
+# inside a watched directory (empty for events on the path itself).
+#
+# several callbacks may watch the same path, each one only gets the events
+# of its own mask.
+#
+# when inotify is not available (no ctypes, old kernel) addWatch()
+# returns False and the caller has to fall back to polling.
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_MASK_ADD = 0x20000000
+
+IN_NONBLOCK = 00004000
+IN_CLOEXEC = 02000000
+
+# changes of the file list of a directory
+IN_DIRECTORY_CHANGES = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+# changes of the content of a file
+IN_FILE_CHANGES = IN_CLOSE_WRITE | IN_MODIFY | IN_DELETE_SELF | IN_MOVE_SELF | IN_ATTRIB
+
+EVENT = struct.Struct("iIII")
+
+try:
+	import ctypes
+	import ctypes.util
+	libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno = True)
+	libc.inotify_init1
+	libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+	libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+except Exception, ex:
+	print "[Inotify] not available:", ex
+	libc = None
+
+class Inotify:
+	def __init__(self):
+		self.fd = -1
+		self.notifier = None
+		self.watches = {}	# wd -> [path, [(callback, mask)]]
+		self.paths = {}		# path -> wd
+
+	def available(self):
+		if self.fd < 0 and libc is not None:
+			fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+			if fd >= 0:
+				import enigma
+				self.fd = fd
+				self.notifier = enigma.eSocketNotifier(fd, POLLIN)
+				self.notifier.callback.append(self.dataAvail)
+		return self.fd >= 0
+
+	def addWatch(self, path, mask, callback):
+		if not self.available():
+			return False
+		# IN_MASK_ADD keeps the events the other watchers of path asked for
+		wd = libc.inotify_add_watch(self.fd, path, mask | IN_MASK_ADD)
+		if wd < 0:
+			return False
+		if wd in self.watches:
+			callbacks = self.watches[wd][1]
+			for i, (cb, cbmask) in enumerate(callbacks):
+				if cb == callback:
+					callbacks[i] = (cb, cbmask | mask)
+					break
+			else:
+				callbacks.append((callback, mask))
+		else:
+			self.watches[wd] = [path, [(callback, mask)]]
+		self.paths[path] = wd
+		return True
+
+	def removeWatch(self, path, callback = None):
+		wd = self.paths.get(path)
+		if wd is None:
+			return
+		callbacks = self.watches[wd][1]
+		callbacks[:] = [(cb, mask) for (cb, mask) in callbacks if cb != callback]
+		if callback is None or not callbacks:
+			del self.watches[wd]
+			del self.paths[path]
+			libc.inotify_rm_watch(self.fd, wd)
+		else:
+			# only the events the remaining watchers asked for
+			mask = 0
+			for (cb, cbmask) in callbacks:
+				mask |= cbmask
+			libc.inotify_add_watch(self.fd, path, mask)
+
+	def dataAvail(self, what):
+		try:
+			data = os.read(self.fd, 65536)
+		except OSError:
+			return
+		pos = 0
+		while pos + EVENT.size <= len(data):
+			wd, mask, cookie, length = EVENT.unpack_from(data, pos)
+			name = data[pos + EVENT.size:pos + EVENT.size + length].rstrip('\0')
+			pos += EVENT.size + length
+			watch = self.watches.get(wd)
+			if watch is None:
+				continue
+			path, callbacks = watch
+			if mask & IN_IGNORED:
+				# watch removed by the kernel (path deleted or unmounted)
+				del self.watches[wd]
+				if self.paths.get(path) == wd:
+					del self.paths[path]
+			for (callback, cbmask) in callbacks[:]:
+				if not mask & (cbmask | IN_IGNORED):
+					continue
+				try:
+					callback(path, name, mask)
+				except Exception, ex:
+					print "[Inotify] callback for %s failed:" % path, ex
+
+inotify = Inotify()
@@ -1,11 +1,123 @@
 from enigma import loadPNG, loadJPG
+from collections import OrderedDict
+from threading import Lock, Event
+import os
 
-pixmap_cache = {}
+# decoded pixmaps are kept in a least recently used cache with a byte
+# budget. pixmaps loaded with cached=True (skin pixmaps) are pinned and
+# never evicted, as before, up to pinned_budget; beyond it they go into the
+# lru. pixmaps loaded without the cached argument are cached as long as
+# they fit into the budget, and are checked against the mtime and size of
+# their file on every hit, so a changed file is decoded again. cached=False
+# still decodes a fresh pixmap.
+#
+# a pixmap loaded for a desktop is converted for it, so entries are keyed
+# by (path, desktop).
 
-def LoadPixmap(path, desktop = None, cached = False):
-	if path in pixmap_cache:
-		return pixmap_cache[path]
+class PixmapCache:
+	def __init__(self, budget = 8 * 1024 * 1024, pinned_budget = 16 * 1024 * 1024):
+		self.budget = budget
+		self.pinned_budget = pinned_budget
+		self.pinned = {}		# key -> pixmap
+		self.entries = OrderedDict()	# key -> (pixmap, stamp, size), oldest first
+		self.used = 0
+		self.pinned_used = 0
+		self.loading = {}		# key -> Event, for loads in progress
+		self.lock = Lock()
+		self.hits = self.misses = self.evictions = 0
 
+	def __contains__(self, key):
+		if not isinstance(key, tuple):
+			key = (key, None)
+		return key in self.pinned or key in self.entries
+
+	def __getitem__(self, key):
+		if not isinstance(key, tuple):
+			key = (key, None)
+		if key in self.pinned:
+			return self.pinned[key]
+		return self.entries[key][0]
+
+	def setBudget(self, budget):
+		with self.lock:
+			self.budget = budget
+			self.evict()
+
+	def getStats(self):
+		return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+			"entries": len(self.entries), "pinned": len(self.pinned),
+			"bytes": self.used, "pinned_bytes": self.pinned_used, "budget": self.budget}
+
+	def clear(self):
+		with self.lock:
+			self.entries.clear()
+			self.used = 0
+
+	def evict(self):
+		# called with the lock held
+		while self.used > self.budget and self.entries:
+			key, (ptr, stamp, size) = self.entries.popitem(last = False)
+			self.used -= size
+			self.evictions += 1
+
+	def lookup(self, key, stamp):
+		# called with the lock held
+		ptr = self.pinned.get(key)
+		if ptr is not None:
+			return ptr
+		entry = self.entries.pop(key, None)
+		if entry is not None:
+			if entry[1] == stamp:
+				self.entries[key] = entry # most recently used now
+				return entry[0]
+			self.used -= entry[2]
+		return None
+
+	def add(self, key, ptr, stamp, pinned):
+		# called with the lock held
+		size = pixmapSize(ptr)
+		if pinned and (key in self.pinned or self.pinned_used + size <= self.pinned_budget):
+			if key in self.entries:
+				self.used -= self.entries.pop(key)[2]
+			if key not in self.pinned:
+				self.pinned_used += size
+			self.pinned[key] = ptr
+		elif size <= self.budget:
+			if key in self.entries:
+				self.used -= self.entries.pop(key)[2]
+			self.entries[key] = (ptr, stamp, size)
+			self.used += size
+			self.evict()
+
+def pixmapSize(ptr):
+	# estimate of the decoded size, 32 bits per pixel
+	try:
+		size = ptr.size()
+		return size.width() * size.height() * 4
+	except:
+		return 64 * 1024
+
+def fileStamp(path):
+	try:
+		st = os.stat(path)
+		return (st.st_mtime, st.st_size)
+	except OSError:
+		return None
+
+def desktopKey(desktop):
+	if not desktop:
+		return None
+	try:
+		return int(desktop.this) # the desktop, not the python wrapper
+	except:
+		return True
+
+pixmap_cache = PixmapCache()
+
+def setPixmapCacheBudget(budget):
+	pixmap_cache.setBudget(budget)
+
+def decodePixmap(path, desktop):
 	if path[-4:] == ".png":
 		ptr = loadPNG(path)
 	elif path[-4:] == ".jpg":
@@ -17,8 +129,41 @@ def LoadPixmap(path, desktop = None, cached = False):
 		raise Exception("neither .png nor .jpg, please fix file extension")
 	if ptr and desktop:
 		desktop.makeCompatiblePixmap(ptr)
+	return ptr
+
+def LoadPixmap(path, desktop = None, cached = None):
+	cache = pixmap_cache
+	key = (path, desktopKey(desktop))
+	if key in cache.pinned:
+		cache.hits += 1
+		return cache.pinned[key]
+	if cached is False:
+		return decodePixmap(path, desktop)
 
-	if cached:
-		pixmap_cache[path] = ptr
+	stamp = path[-1:] == "." and fileStamp(path + "rgb.jpg") or fileStamp(path)
+	while True:
+		with cache.lock:
+			ptr = cache.lookup(key, stamp)
+			if ptr is not None:
+				cache.hits += 1
+				if cached and key not in cache.pinned:
+					cache.add(key, ptr, stamp, True)
+				return ptr
+			loading = cache.loading.get(key)
+			if loading is None:
+				loading = cache.loading[key] = Event()
+				cache.misses += 1
+				break
+		# somebody else is decoding the same file, use that result
+		loading.wait()
 
+	ptr = None
+	try:
+		ptr = decodePixmap(path, desktop)
+	finally:
+		with cache.lock:
+			if ptr:
+				cache.add(key, ptr, stamp, cached)
+			del cache.loading[key]
+		loading.set()
 	return ptr
@@ -1,5 +1,9 @@
 # the implementation here is a bit crappy.
 import time
+import sys
+import os
+import thread
+import __builtin__
 from Directories import resolveFilename, SCOPE_CONFIG
 
 PERCENTAGE_START = 50
@@ -30,6 +34,70 @@ try:
 except IOError:
 	print "WARNING: couldn't open profile file!"
 
+# besides the flat timestamps above, the boot is recorded as a tree of
+# nested spans: the phases started by profile(), module imports (through
+# an import hook), plugins and screens. at profile_final() the tree is
+# written in the "folded stacks" format of flame graph tools
+# (profile.folded, "boot;phase;import x;import y <microseconds>"), and
+# compared against the previous boot (profile.diff).
+
+FOLDED_FILE = resolveFilename(SCOPE_CONFIG, "profile.folded")
+DIFF_FILE = resolveFilename(SCOPE_CONFIG, "profile.diff")
+
+span_stack = [["boot", profile_start, 0.0]]	# [name, start, time spent in children]
+span_folded = {}				# stack -> self time
+span_thread = thread.get_ident()
+
+# imports taking less than that (in seconds) are not recorded on their own
+IMPORT_MIN_TIME = 0.0002
+
+def span_begin(id):
+	if span_stack is not None and thread.get_ident() == span_thread:
+		span_stack.append([id, time.time(), 0.0])
+		return True
+	return False
+
+def span_end(keep = True):
+	# keep = False drops the span, its time counts for the parent
+	if span_stack is None or len(span_stack) < 2 or thread.get_ident() != span_thread:
+		return
+	duration = time.time() - span_stack[-1][1]
+	if keep:
+		stack = ';'.join([frame[0] for frame in span_stack])
+		span_folded[stack] = span_folded.get(stack, 0.0) + duration - span_stack[-1][2]
+		span_stack.pop()
+		span_stack[-1][2] += duration
+	else:
+		span_stack.pop()
+
+class profile_span:
+	"""with profile_span("screen InfoBar"): ..."""
+	def __init__(self, id):
+		self.id = id
+
+	def __enter__(self):
+		self.active = span_begin(self.id)
+
+	def __exit__(self, *args):
+		if self.active:
+			span_end()
+
+original_import = __builtin__.__import__
+
+def profiled_import(name, globals = None, locals = None, fromlist = None, level = -1):
+	if span_stack is None or thread.get_ident() != span_thread:
+		return original_import(name, globals, locals, fromlist, level)
+	modules = len(sys.modules)
+	span_begin("import " + name)
+	try:
+		return original_import(name, globals, locals, fromlist, level)
+	finally:
+		# only imports which actually loaded something are of interest,
+		# the time of very short ones is left to the importing module
+		span_end(len(sys.modules) != modules and span_stack is not None and time.time() - span_stack[-1][1] >= IMPORT_MIN_TIME)
+
+__builtin__.__import__ = profiled_import
+
 def profile(id):
 	now = time.time() - profile_start
 	if profile_file:
@@ -48,8 +116,83 @@ def profile(id):
 			except IOError:
 				pass
 
+	# on the top level, an id starts a new phase. ids placed inside an
+	# import (or another span) are only timestamps.
+	if span_stack is not None and thread.get_ident() == span_thread and len(span_stack) <= 2:
+		if len(span_stack) == 2:
+			span_end()
+		span_begin(id)
+
+def readFolded(filename):
+	result = {}
+	try:
+		f = open(filename, "r")
+		for line in f:
+			stack, value = line.rstrip('\n').rsplit(' ', 1)
+			result[stack] = result.get(stack, 0) + int(value)
+		f.close()
+	except (IOError, ValueError):
+		pass
+	return result
+
+def inclusiveTimes(folded):
+	# self times per stack -> total times per stack (including children)
+	result = {}
+	for (stack, value) in folded.iteritems():
+		frames = stack.split(';')
+		for i in range(1, len(frames) + 1):
+			key = ';'.join(frames[:i])
+			result[key] = result.get(key, 0) + value
+	return result
+
+def compareProfiles(old, new, count = 50, threshold = 5000):
+	"""returns [(delta, old, new, stack)] of the largest changes between
+	two folded profiles, times in microseconds"""
+	old = inclusiveTimes(old)
+	new = inclusiveTimes(new)
+	result = []
+	for stack in set(old) | set(new):
+		delta = new.get(stack, 0) - old.get(stack, 0)
+		if abs(delta) >= threshold:
+			result.append((delta, old.get(stack, 0), new.get(stack, 0), stack))
+	result.sort(key = lambda x: -abs(x[0]))
+	return result[:count]
+
+def writeProfileReport():
+	old = readFolded(FOLDED_FILE)
+	folded = dict([(stack, int(value * 1000000)) for (stack, value) in span_folded.iteritems()])
+	try:
+		f = open(FOLDED_FILE + ".writing", "w")
+		for stack in sorted(folded):
+			f.write("%s %d\n" % (stack, folded[stack]))
+		f.close()
+		if os.path.exists(FOLDED_FILE):
+			os.rename(FOLDED_FILE, FOLDED_FILE + ".old")
+		os.rename(FOLDED_FILE + ".writing", FOLDED_FILE)
+	except (IOError, OSError), e:
+		print "WARNING: couldn't write boot profile:", e
+		return
+	if not old:
+		return
+	try:
+		f = open(DIFF_FILE, "w")
+		f.write("# change against the previous boot in ms: delta, before, after, stack\n")
+		for (delta, before, after, stack) in compareProfiles(old, folded):
+			f.write("%+9.1f %9.1f %9.1f %s\n" % (delta / 1000.0, before / 1000.0, after / 1000.0, stack))
+		f.close()
+	except IOError, e:
+		print "WARNING: couldn't write boot profile comparison:", e
+
 def profile_final():
-	global profile_file
+	global profile_file, span_stack
 	if profile_file is not None:
 		profile_file.close()
 		profile_file = None
+	if span_stack is not None:
+		while len(span_stack) > 1:
+			span_end()
+		span_folded["boot"] = time.time() - profile_start - span_stack[0][2]
+		span_stack = None
+		if __builtin__.__import__ is profiled_import:
+			__builtin__.__import__ = original_import
+		writeProfileReport()
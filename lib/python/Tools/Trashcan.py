@@ -79,6 +79,9 @@ def clean(ctimeLimit, reserveBytes):
 	if config.usage.movielist_trashcan.getValue() and not isCleaning:
 		name = _("Cleaning Trashes")
 		job = Components.Task.Job(name)
+		# looks at all disks, but only hands the files to the background eraser
+		job.resources = [ "cpu" ]
+		job.priority = job.PRIORITY_LOW
 		task = CleanTrashTask(job, name)
 		task.openFiles(ctimeLimit, reserveBytes)
 		Components.Task.job_manager.AddJob(job)
@@ -2,7 +2,7 @@ import sys, os
 if os.path.isfile("/usr/lib/enigma2/python/enigma.zip"):
 	sys.path.append("/usr/lib/enigma2/python/enigma.zip")
 
-from Tools.Profile import profile, profile_final
+from Tools.Profile import profile, profile_final, profile_span
 profile("PYTHON_START")
 
 import Tools.RedirectOutput
@@ -268,30 +268,31 @@ class Session:
 		screen.addSummary(self.summary)
 
 	def doInstantiateDialog(self, screen, arguments, kwargs, desktop):
-		# create dialog
+		with profile_span("screen " + screen.__name__):
+			# create dialog
 
-		try:
-			dlg = self.create(screen, arguments, **kwargs)
-		except:
-			print 'EXCEPTION IN DIALOG INIT CODE, ABORTING:'
-			print '-'*60
-			print_exc(file=stdout)
-			enigma.quitMainloop(5)
-			print '-'*60
+			try:
+				dlg = self.create(screen, arguments, **kwargs)
+			except:
+				print 'EXCEPTION IN DIALOG INIT CODE, ABORTING:'
+				print '-'*60
+				print_exc(file=stdout)
+				enigma.quitMainloop(5)
+				print '-'*60
 
-		if dlg is None:
-			return
+			if dlg is None:
+				return
 
-		# read skin data
-		readSkin(dlg, None, dlg.skinName, desktop)
+			# read skin data
+			readSkin(dlg, None, dlg.skinName, desktop)
 
-		# create GUI view of this dialog
-		assert desktop is not None
+			# create GUI view of this dialog
+			assert desktop is not None
 
-		dlg.setDesktop(desktop)
-		dlg.applySkin()
+			dlg.setDesktop(desktop)
+			dlg.applySkin()
 
-		return dlg
+			return dlg
 
 	def pushCurrent(self):
 		if self.current_dialog is not None:
@@ -523,6 +524,8 @@ def runScreenTest():
 
 	profile("RunReactor")
 	profile_final()
+	from Tools.Directories import getResolveCacheStats
+	print "[resolveFilename] cache during startup: %d hits, %d misses, %d entries" % getResolveCacheStats()
 	runReactor()
 
 	config.misc.startCounter.save()
@@ -593,6 +596,8 @@ def runScreenTest():
 
 	profile("configfile.save")
 	configfile.save()
+	configfile.exportText()
+	skin.skin_cache.save()
 	from Screens import InfoBarGenerics
 	InfoBarGenerics.saveResumePoints()
 
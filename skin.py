@@ -2,6 +2,7 @@ from Tools.Profile import profile
 profile("LOAD:ElementTree")
 import xml.etree.cElementTree
 import os
+import marshal
 
 profile("LOAD:enigma_skin")
 from enigma import eSize, ePoint, eRect, gFont, eWindow, eLabel, ePixmap, eWindowStyleManager, addFont, gRGB, eWindowStyleSkinned, getDesktop
@@ -40,6 +41,160 @@ class DisplaySkinError(Exception):
 	def __str__(self):
 		return "{%s}: %s. Please contact the skin's author!" % (config.skin.display_skin.getValue(), self.msg)
 
+# parsed skin files are kept in a cache file as plain (tag, attrib, text,
+# children) tuples, keyed by the mtime and size of the xml file. on a warm
+# boot the skins are read from there, and only the screens which are
+# actually opened are turned into SkinElements. the cache also keeps the
+# resolved filenames of pixmaps and fonts for the active skins, as long as
+# the skin and font directories (and their subdirectories) are unchanged.
+# names which did not resolve to an existing file are not kept.
+class SkinElement(object):
+	# the subset of the ElementTree element interface used in here
+	__slots__ = ("tag", "attrib", "text", "raw_children", "children")
+
+	def __init__(self, data):
+		self.tag, attrib, self.text, self.raw_children = data
+		self.attrib = dict(attrib) # the cached data stays as parsed
+		self.children = None
+
+	def getchildren(self):
+		if self.children is None:
+			self.children = [SkinElement(x) for x in self.raw_children]
+			self.raw_children = None
+		return self.children
+
+	def __iter__(self):
+		return iter(self.getchildren())
+
+	def findall(self, tag):
+		return [x for x in self.getchildren() if x.tag == tag]
+
+	def get(self, key, default = None):
+		return self.attrib.get(key, default)
+
+	def items(self):
+		return self.attrib.items()
+
+	def clear(self):
+		self.attrib = {}
+		self.text = None
+		self.raw_children = None
+		self.children = [ ]
+
+def elementToData(elem):
+	return (elem.tag, dict(elem.attrib), elem.text, [elementToData(x) for x in elem])
+
+class SkinCache:
+	VERSION = 1
+
+	def __init__(self, filename):
+		self.filename = filename
+		self.files = {}		# xml filename -> ((mtime, size), data)
+		self.resolved = {}	# (scope, base, path_prefix) -> resolved filename
+		self.resolve_key = None
+		self.used = set()
+		self.dirty = False
+		self.hits = self.misses = 0
+		try:
+			f = open(filename, "rb")
+			version, self.files, self.resolve_key, self.resolved = marshal.load(f)
+			f.close()
+			if version != self.VERSION:
+				raise ValueError
+		except (IOError, EOFError, ValueError, TypeError):
+			self.files = {}
+			self.resolved = {}
+			self.resolve_key = None
+
+	def parse(self, filename):
+		st = os.stat(filename)
+		stamp = (int(st.st_mtime), st.st_size)
+		self.used.add(filename)
+		entry = self.files.get(filename)
+		if entry is not None and entry[0] == stamp:
+			self.hits += 1
+			return SkinElement(entry[1])
+		self.misses += 1
+		file = open(filename, 'r')
+		root = xml.etree.cElementTree.parse(file).getroot()
+		file.close()
+		self.files[filename] = (stamp, elementToData(root))
+		# the skin changed, so may have the files it refers to
+		self.resolved = {}
+		self.dirty = True
+		return root
+
+	def setResolveKey(self, key):
+		if key != self.resolve_key:
+			self.resolve_key = key
+			self.resolved = {}
+			self.dirty = True
+
+	def resolvePixmap(self, value, path_prefix):
+		key = (SCOPE_ACTIVE_LCDSKIN, value, path_prefix)
+		pngfile = self.resolved.get(key)
+		if pngfile is None:
+			pngfile = resolveFilename(SCOPE_ACTIVE_SKIN, value, path_prefix=path_prefix)
+			if fileExists(resolveFilename(SCOPE_ACTIVE_LCDSKIN, value, path_prefix=path_prefix)):
+				pngfile = resolveFilename(SCOPE_ACTIVE_LCDSKIN, value, path_prefix=path_prefix)
+			if fileExists(pngfile):
+				self.resolved[key] = pngfile
+				self.dirty = True
+		return pngfile
+
+	def resolveFont(self, filename, path_prefix):
+		key = (SCOPE_FONTS, filename, path_prefix)
+		resolved_font = self.resolved.get(key)
+		if resolved_font is None:
+			resolved_font = resolveFilename(SCOPE_FONTS, filename, path_prefix=path_prefix)
+			if not fileExists(resolved_font): #when font is not available look at current skin path
+				resolved_font = resolveFilename(SCOPE_ACTIVE_SKIN, filename)
+				if fileExists(resolveFilename(SCOPE_CURRENT_SKIN, filename)):
+					resolved_font = resolveFilename(SCOPE_CURRENT_SKIN, filename)
+				elif fileExists(resolveFilename(SCOPE_ACTIVE_LCDSKIN, filename)):
+					resolved_font = resolveFilename(SCOPE_ACTIVE_LCDSKIN, filename)
+			if fileExists(resolved_font):
+				self.resolved[key] = resolved_font
+				self.dirty = True
+		return resolved_font
+
+	def save(self):
+		if not self.dirty:
+			return
+		# forget skins which were not loaded this time
+		for filename in self.files.keys():
+			if filename not in self.used:
+				del self.files[filename]
+		try:
+			f = open(self.filename + ".writing", "wb")
+			marshal.dump((self.VERSION, self.files, self.resolve_key, self.resolved), f)
+			f.close()
+			os.rename(self.filename + ".writing", self.filename)
+			self.dirty = False
+		except (IOError, OSError, ValueError), err:
+			print "[SKIN] unable to write skin cache:", err
+
+def directoryStamps(dirs):
+	# mtimes of dirs and their subdirectories, which change when a file is
+	# added, removed or replaced in there
+	stamps = [ ]
+	for path in sorted(dirs):
+		try:
+			stamps.append((path, int(os.stat(path).st_mtime)))
+			for name in sorted(os.listdir(path)):
+				sub = os.path.join(path, name)
+				if os.path.isdir(sub):
+					stamps.append((sub, int(os.stat(sub).st_mtime)))
+		except OSError:
+			stamps.append((path, None))
+	return tuple(stamps)
+
+profile("LoadSkinCache")
+skin_cache = SkinCache(resolveFilename(SCOPE_CONFIG, "skin.cache"))
+
+# embedded skins of screen classes, parsed once per session
+embedded_skins = {}
+
 dom_skins = [ ]
 
 def addSkin(name, scope = SCOPE_SKIN):
@@ -47,9 +202,7 @@ def addSkin(name, scope = SCOPE_SKIN):
 	filename = resolveFilename(scope, name)
 	if fileExists(filename):
 		mpath = os.path.dirname(filename) + "/"
-		file = open(filename, 'r')
-		dom_skins.append((mpath, xml.etree.cElementTree.parse(file).getroot()))
-		file.close()
+		dom_skins.append((mpath, skin_cache.parse(filename)))
 		return True
 	return False
 
@@ -130,6 +283,9 @@ except Exception, err:
 	del skin
 
 addSkin('skin_default.xml')
+skin_cache.setResolveKey((config.skin.primary_skin.getValue(), config.skin.display_skin.getValue(),
+	directoryStamps(set([mpath for (mpath, dom) in dom_skins if mpath != resolveFilename(SCOPE_CONFIG)] + [resolveFilename(SCOPE_FONTS)]))))
+print "[SKIN] %d skin files from cache, %d parsed" % (skin_cache.hits, skin_cache.misses)
 profile("LoadSkinDefaultDone")
 
 def parseCoordinate(s, e, size=0, font=None):
@@ -224,10 +380,7 @@ def collectAttributes(skinAttributes, node, context, skin_path_prefix=None, igno
 	for attrib, value in node.items():
 		if attrib not in ignore:
 			if attrib in filenames:
-				pngfile = resolveFilename(SCOPE_ACTIVE_SKIN, value, path_prefix=skin_path_prefix)
-				if fileExists(resolveFilename(SCOPE_ACTIVE_LCDSKIN, value, path_prefix=skin_path_prefix)):
-					pngfile = resolveFilename(SCOPE_ACTIVE_LCDSKIN, value, path_prefix=skin_path_prefix)
-				value = pngfile
+				value = skin_cache.resolvePixmap(value, skin_path_prefix)
 			# Bit of a hack this, really. When a window has a flag (e.g. wfNoBorder)
 			# it needs to be set at least before the size is set, in order for the
 			# window dimensions to be calculated correctly in all situations.
@@ -256,12 +409,12 @@ def morphRcImagePath(value):
 	return value
 
 def loadPixmap(path, desktop):
-	cached = False
+	cached = None
 	option = path.find("#")
 	if option != -1:
 		options = path[option+1:].split(',')
 		path = path[:option]
-		cached = "cached" in options
+		cached = "cached" in options or None
 	ptr = LoadPixmap(morphRcImagePath(path), desktop, cached)
 	if ptr is None:
 		raise SkinError("pixmap file %s not found!" % (path))
@@ -509,13 +662,7 @@ def loadSingleSkinData(desktop, skin, path_prefix):
 				render = int(render)
 			else:
 				render = 0
-			resolved_font = resolveFilename(SCOPE_FONTS, filename, path_prefix=path_prefix)
-			if not fileExists(resolved_font): #when font is not available look at current skin path
-				resolved_font = resolveFilename(SCOPE_ACTIVE_SKIN, filename)
-				if fileExists(resolveFilename(SCOPE_CURRENT_SKIN, filename)):
-					resolved_font = resolveFilename(SCOPE_CURRENT_SKIN, filename)
-				elif fileExists(resolveFilename(SCOPE_ACTIVE_LCDSKIN, filename)):
-					resolved_font = resolveFilename(SCOPE_ACTIVE_LCDSKIN, filename)
+			resolved_font = skin_cache.resolveFont(filename, path_prefix)
 			addFont(resolved_font, name, scale, is_replacement, render)
 			#print "Font: ", resolved_font, name, scale, is_replacement
 		for alias in c.findall("alias"):
@@ -633,8 +780,7 @@ def loadSkin(name, scope = SCOPE_SKIN):
 	filename = resolveFilename(scope, name)
 	if fileExists(filename):
 		path = os.path.dirname(filename) + "/"
-		file = open(filename, 'r')
-		for elem in xml.etree.cElementTree.parse(file).getroot():
+		for elem in skin_cache.parse(filename):
 			if elem.tag == 'screen':
 				name = elem.attrib.get('name', None)
 				if name:
@@ -651,7 +797,6 @@ def loadSkin(name, scope = SCOPE_SKIN):
 					elem.clear()
 			else:
 				elem.clear()
-		file.close()
 
 def loadSkinData(desktop):
 	# Kinda hackish, but this is called once by mytest.py
@@ -681,6 +826,8 @@ def loadSkinData(desktop):
 				elem.clear()
 	# no longer needed, we know where the screens are now.
 	del dom_skins
+	profile("SaveSkinCache")
+	skin_cache.save()
 
 class additionalWidget:
 	pass
@@ -796,7 +943,9 @@ def readSkin(screen, skin, names, desktop):
 		print "[SKIN] Parsing embedded skin", name
 		if (isinstance(skin, tuple)):
 			for s in skin:
-				candidate = xml.etree.cElementTree.fromstring(s)
+				candidate = embedded_skins.get(s)
+				if candidate is None:
+					candidate = embedded_skins[s] = xml.etree.cElementTree.fromstring(s)
 				if candidate.tag == 'screen':
 					sid = candidate.attrib.get('id', None)
 					if (not sid) or (int(sid) == display_skin_id):
@@ -805,7 +954,9 @@ def readSkin(screen, skin, names, desktop):
 			else:
 				print "[SKIN] Hey, no suitable screen!"
 		else:
-			myscreen = xml.etree.cElementTree.fromstring(skin)
+			myscreen = embedded_skins.get(skin)
+			if myscreen is None:
+				myscreen = embedded_skins[skin] = xml.etree.cElementTree.fromstring(skin)
 		if myscreen:
 			screen.parsedSkin = myscreen
 	if myscreen is None:
@@ -976,12 +1127,17 @@ def readSkin(screen, skin, names, desktop):
 			"panel": process_panel
 	}
 
+	from Components.Converter.TemplatedMultiContent import getTemplateCacheStats
+	templates_before = getTemplateCacheStats()
 	try:
 		context.x = 0 # reset offsets, all components are relative to screen
 		context.y = 0 # coordinates.
 		process_screen(myscreen, context)
 	except Exception, e:
 		print "[Skin] SKIN ERROR in %s:" % name, e
+	templates_after = getTemplateCacheStats()
+	if templates_after[1] != templates_before[1]:
+		print "[Skin] %s: %d template evaluations avoided, %.1f ms saved" % (name, templates_after[1] - templates_before[1], (templates_after[2] - templates_before[2]) * 1000)
 
 	from Components.GUIComponent import GUIComponent
 	nonvisited_components = [x for x in set(screen.keys()) - visited_components if isinstance(x, GUIComponent)]
@@ -0,0 +1,129 @@
+import sys
+import time
+import types
+
+# feeds synthetic timer sets into the conflict check and compares a fresh
+# engine per check (as before) against one engine reused between checks.
+# every third service can not be tuned (FAILED_SERVICES), so its tuner type
+# is looked up through the service information, which the engine caches.
+#
+# run with PYTHONPATH=.:..:../lib/python/ python benchmark_timersanitycheck.py
+#
+# the conflict check only needs a few names of enigma, so this does not use
+# the enigma.py of the tests (which sets up the whole config).
+
+FAILED_SERVICES = 3
+info_lookups = [ 0 ]
+
+class FakeServiceInfo:
+	def getInfoObject(self, ref, what):
+		info_lookups[0] += 1
+		return {"tuner_type": "DVB-S"}
+
+class FakeServiceCenter:
+	@staticmethod
+	def getInstance():
+		return FakeServiceCenter()
+
+	def info(self, ref):
+		return FakeServiceInfo()
+
+	def list(self, ref):
+		return None
+
+enigma = types.ModuleType("enigma")
+enigma.eTimer = enigma.eActionMap = enigma.getBestPlayableServiceReference = None
+enigma.eServiceCenter = FakeServiceCenter
+enigma.eServiceReference = type("eServiceReference", (object,), {"idInvalid": -1, "isGroup": 4})
+enigma.iServiceInformation = type("iServiceInformation", (object,), {"sTransponderData": 0})
+enigma.eEnv = type("eEnv", (object,), {"resolve": staticmethod(lambda path: path.replace("${sysconfdir}", "/etc").replace("${datadir}", "/usr/share").replace("${libdir}", "/usr/lib"))})
+sys.modules["enigma"] = enigma
+
+import NavigationInstance
+from Components.TimerSanityCheck import TimerSanityCheck, TimerConflictEngine
+
+class FakeRef:
+	flags = 0
+
+	def __init__(self, num):
+		self.num = num
+		self.ref = "1:0:1:%X:1:1:C00000:0:0:0:" % num
+
+	def valid(self):
+		return True
+
+	def toString(self):
+		return self.ref
+
+class FakeServiceReference:
+	def __init__(self, num):
+		self.ref = FakeRef(num)
+
+class FakeTimer:
+	state = 0
+	disabled = False
+
+	def __init__(self, num, begin, end, repeated = 0):
+		self.service_ref = FakeServiceReference(num % 50)
+		self.begin = begin
+		self.end = end
+		self.repeated = repeated
+
+class FakeFrontendInfo:
+	def getFrontendData(self):
+		return {"tuner_type": "DVB-S"}
+
+class FakeRecordService:
+	def __init__(self, ref):
+		self.ref = ref
+
+	def start(self, simulate = False):
+		# no tuner for a share of the services
+		return self.ref.ref.num % FAILED_SERVICES == 0 and -1 or 0
+
+	def frontendInfo(self):
+		return FakeFrontendInfo()
+
+class FakeNavigation:
+	def recordService(self, ref, simulate = False):
+		return FakeRecordService(ref)
+
+	def stopRecordService(self, service):
+		pass
+
+NavigationInstance.instance = FakeNavigation()
+
+def createTimers(count, base = 1300000000):
+	timers = [ ]
+	for x in range(count):
+		begin = base + x * 5400
+		repeated = x % 10 == 0 and 0x1f or 0
+		timers.append(FakeTimer(x, begin, begin + 3600, repeated))
+	return timers
+
+class NullOutput:
+	def write(self, text):
+		pass
+
+def run(timers, engine = None, rounds = 20):
+	# the conflicts of the failed services are reported on stdout
+	stdout, sys.stdout = sys.stdout, NullOutput()
+	try:
+		start = time.time()
+		for x in range(rounds):
+			# simulate the timer editor changing one timer between checks
+			changed = timers[x % len(timers)]
+			changed.end += 60
+			TimerSanityCheck(timers, changed, engine or TimerConflictEngine()).check()
+		return (time.time() - start) / rounds
+	finally:
+		sys.stdout = stdout
+
+for count in (10, 100, 500, 1000):
+	timers = createTimers(count)
+	info_lookups[0] = 0
+	cold = run(timers)
+	cold_lookups = info_lookups[0]
+	info_lookups[0] = 0
+	warm = run(timers, TimerConflictEngine())
+	print "%5d timers: %8.2f ms per check without cache (%d tuner type lookups), %8.2f ms with reused engine (%d)" % (count, cold * 1000, cold_lookups, warm * 1000, info_lookups[0])
@@ -0,0 +1,102 @@
+# tests Components.SoftcamWebClient against a local stub of the softcam web
+# interfaces (digest authentication like OScam, basic like CCcam).
+#
+# PYTHONPATH=.:..:../lib/python/ python test_softcamwebclient.py
+
+import sys
+from hashlib import md5
+from urllib2 import parse_http_list, parse_keqv_list
+from twisted.internet import reactor, defer
+from twisted.web import server, resource
+
+from Components.SoftcamWebClient import SoftcamWebClient
+
+USERNAME = "user"
+PASSWORD = "secret"
+REALM = "Forbidden"
+NONCE = "0123456789abcdef"
+
+class StubWebIf(resource.Resource):
+	isLeaf = True
+
+	def __init__(self):
+		resource.Resource.__init__(self)
+		self.requests = [ ]	# (path, authorization scheme or None)
+
+	def render_GET(self, request):
+		authorization = request.getHeader("authorization") or ""
+		scheme = authorization.split(' ', 1)[0].lower() or None
+		self.requests.append((request.path, scheme))
+		if request.path == "/cccam":
+			if authorization == "Basic " + ("%s:%s" % (USERNAME, PASSWORD)).encode("base64").strip():
+				return "<html>CCcam</html>"
+		elif scheme == "digest" and self.checkDigest(authorization[7:], request.uri):
+			return "<oscam>%s</oscam>" % request.path
+		request.setResponseCode(401)
+		request.setHeader("WWW-Authenticate", 'Digest realm="%s", qop="auth", nonce="%s"' % (REALM, NONCE))
+		return "unauthorized"
+
+	def checkDigest(self, header, uri):
+		fields = parse_keqv_list(parse_http_list(header))
+		ha1 = md5("%s:%s:%s" % (USERNAME, REALM, PASSWORD)).hexdigest()
+		ha2 = md5("GET:%s" % uri).hexdigest()
+		response = md5(":".join((ha1, NONCE, fields.get("nc", ""), fields.get("cnonce", ""), "auth", ha2))).hexdigest()
+		return fields.get("response") == response
+
+failures = [ ]
+
+def check(name, condition):
+	print "%-60s %s" % (name, condition and "ok" or "FAILED")
+	if not condition:
+		failures.append(name)
+
+@defer.inlineCallbacks
+def run(port, ccport, stub):
+	client = SoftcamWebClient(timeout = 5)
+	base = "http://127.0.0.1:%d" % port
+
+	# two screens asking for the same page at once
+	results = yield defer.gatherResults([
+		client.getPage(base + "/oscam", USERNAME, PASSWORD, ttl = 10),
+		client.getPage(base + "/oscam", USERNAME, PASSWORD, ttl = 10)])
+	check("coalesced requests get the page", results == ["<oscam>/oscam</oscam>"] * 2)
+	check("no credentials before the challenge", stub.requests == [("/oscam", None), ("/oscam", "digest")])
+
+	del stub.requests[:]
+	result = yield client.getPage(base + "/oscam", USERNAME, PASSWORD, ttl = 10)
+	check("cached page within the ttl", result == "<oscam>/oscam</oscam>" and not stub.requests)
+
+	result = yield client.getPage(base + "/oscam", USERNAME, PASSWORD, parser = len, ttl = 10)
+	check("parsed model", result == len("<oscam>/oscam</oscam>"))
+
+	del stub.requests[:]
+	result = yield client.getPage(base + "/oscam/status", USERNAME, PASSWORD)
+	check("known challenge answered without 401", stub.requests == [("/oscam/status", "digest")])
+
+	# CCcam listens on another port
+	del stub.requests[:]
+	result = yield client.getPage("http://%s:%s@127.0.0.1:%d/cccam" % (USERNAME, PASSWORD, ccport), basic = True)
+	check("basic authentication sent up front", result == "<html>CCcam</html>" and stub.requests == [("/cccam", "basic")])
+
+	try:
+		yield client.getPage(base + "/oscam", USERNAME, "wrong")
+		check("wrong password fails", False)
+	except Exception:
+		check("wrong password fails", True)
+
+def main():
+	stub = StubWebIf()
+	listener = reactor.listenTCP(0, server.Site(stub), interface = "127.0.0.1")
+	cclistener = reactor.listenTCP(0, server.Site(stub), interface = "127.0.0.1")
+	def done(result):
+		reactor.stop()
+		return result
+	d = defer.maybeDeferred(run, listener.getHost().port, cclistener.getHost().port, stub)
+	d.addErrback(lambda failure: failures.append(failure.getTraceback()))
+	d.addBoth(done)
+	reactor.run()
+	if failures:
+		print "failed:", failures
+		sys.exit(1)
+
+main()
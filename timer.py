@@ -1,4 +1,4 @@
-from bisect import insort
+from bisect import insort, bisect_left, bisect_right
 from time import time, localtime, mktime
 from enigma import eTimer, eActionMap
 import datetime
@@ -147,6 +147,15 @@ class Timer:
 		self.timer_list = [ ]
 		self.processed_timers = [ ]
 
+		# timer_list is kept ordered by the cached activation keys in
+		# timer_keys, so (re)scheduling one entry is a bisect instead of
+		# calling getNextActivation() for every comparison.
+		self.timer_keys = [ ]
+		self.keyed_list = self.timer_list
+		self.key_seq = 0
+		# counts the changes of timer_list, for indexes kept by subclasses
+		self.timer_generation = 0
+
 		self.timer = eTimer()
 		self.timer.callback.append(self.calcNextActivation)
 		self.lastActivation = time()
@@ -154,6 +163,42 @@ class Timer:
 		self.calcNextActivation()
 		self.on_state_change = [ ]
 
+	def getTimerKeys(self):
+		if self.timer_list is not self.keyed_list or len(self.timer_list) != len(self.timer_keys):
+			# timer_list was replaced or changed behind our back, rebuild the keys
+			keys = [ ]
+			for x in self.timer_list:
+				self.key_seq += 1
+				x.activation_key = (x.getNextActivation(), self.key_seq)
+				keys.append(x.activation_key)
+			# stable, so equal entries keep their order
+			order = sorted(range(len(keys)), key = lambda i: keys[i][0])
+			self.timer_list[:] = [self.timer_list[i] for i in order]
+			self.timer_keys = [keys[i] for i in order]
+			self.keyed_list = self.timer_list
+			self.timer_generation += 1
+		return self.timer_keys
+
+	def insertTimerEntry(self, entry):
+		keys = self.getTimerKeys()
+		self.key_seq += 1
+		entry.activation_key = (entry.getNextActivation(), self.key_seq)
+		pos = bisect_right(keys, entry.activation_key)
+		keys.insert(pos, entry.activation_key)
+		self.timer_list.insert(pos, entry)
+		self.timer_generation += 1
+
+	def removeTimerEntry(self, entry):
+		keys = self.getTimerKeys()
+		key = getattr(entry, "activation_key", None)
+		pos = key is not None and bisect_left(keys, key) or 0
+		if pos >= len(keys) or self.timer_list[pos] is not entry:
+			# not where its key says, raises ValueError if not queued at all
+			pos = self.timer_list.index(entry)
+		del keys[pos]
+		del self.timer_list[pos]
+		self.timer_generation += 1
+
 	def stateChanged(self, entry):
 		for f in self.on_state_change:
 			f(entry)
@@ -175,7 +220,7 @@ class Timer:
 			insort(self.processed_timers, entry)
 			entry.state = TimerEntry.StateEnded
 		else:
-			insort(self.timer_list, entry)
+			self.insertTimerEntry(entry)
 			if not noRecalc:
 				self.calcNextActivation()
 
@@ -222,7 +267,7 @@ class Timer:
 		min = int(now) + self.MaxWaitTime
 
 		# calculate next activation point
-		if self.timer_list:
+		if self.getTimerKeys():
 			w = self.timer_list[0].getNextActivation()
 			if w < min:
 				min = w
@@ -239,7 +284,7 @@ class Timer:
 			self.processed_timers.remove(timer)
 		else:
 			try:
-				self.timer_list.remove(timer)
+				self.removeTimerEntry(timer)
 			except:
 				print "[timer] Failed to remove, not in list"
 				return
@@ -254,7 +299,7 @@ class Timer:
 		self.addTimerEntry(timer)
 
 	def doActivate(self, w):
-		self.timer_list.remove(w)
+		self.removeTimerEntry(w)
 
 		# when activating a timer which has already passed,
 		# simply abort the timer. don't run trough all the stages.
@@ -270,7 +315,7 @@ class Timer:
 		# did this timer reached the last state?
 		if w.state < TimerEntry.StateEnded:
 			# no, sort it into active list
-			insort(self.timer_list, w)
+			self.insertTimerEntry(w)
 		else:
 			# yes. Process repeated, and re-add.
 			if w.repeated:
@@ -285,5 +330,5 @@ class Timer:
 	def processActivation(self):
 		t = int(time()) + 1
 		# we keep on processing the first entry until it goes into the future.
-		while self.timer_list and self.timer_list[0].getNextActivation() < t:
+		while self.getTimerKeys() and self.timer_list[0].getNextActivation() < t:
 			self.doActivate(self.timer_list[0])